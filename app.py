@@ -1,22 +1,69 @@
-from flask import Flask, send_from_directory, Response, render_template, redirect, jsonify, request
+from flask import Flask, send_from_directory, Response, render_template, redirect, jsonify, request, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
-from intense_experience import intense_experience_bp
-from config import NIGHT_SERVICE_ID, DAY_SERVICE_ID
+import time
+from intense_experience import intense_experience_bp, make_mews_request, reset_mews_session
+from warmup import start_warm_up
+from config import NIGHT_SERVICE_ID, DAY_SERVICE_ID, METRICS_TOKEN
+from metrics import HTTP_REQUEST_DURATION, PROMETHEUS_CONTENT_TYPE, render_metrics, write_snapshot, metrics_authorized
+from tracing import start_span, end_span, SPAN_KIND_SERVER, reinit_after_fork as reinit_tracing_after_fork
+from logging_setup import reinit_after_fork as reinit_logging_after_fork
+from profiling import should_profile, start_request_profile, stop_request_profile
+from availability_versions import reinit_after_fork as reinit_availability_versions_after_fork
+from bootstrap import get_bootstrap_json, prefetch_calendar_availability
+from prefetch import reinit_after_fork as reinit_prefetch_after_fork
+from image_cache import reinit_after_fork as reinit_image_cache_after_fork
+from price_calendar import reinit_after_fork as reinit_price_calendar_after_fork
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = Flask(__name__)
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Root span of the request trace (continues the caller's trace when a traceparent header is sent)
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    g.request_span = start_span(
+        f"{request.method} {route}", kind=SPAN_KIND_SERVER, traceparent=request.headers.get('traceparent'),
+        **{"http.method": request.method, "http.route": route}
+    )
+    # On-demand sampling profile (admin header or PROFILING_SAMPLE_RATE, see profiling.py)
+    if should_profile(request.headers):
+        g.request_profile = start_request_profile(request.method, route, request.args, request.get_json(silent=True))
+
+def record_request_latency(response):
+    # Label by URL rule (not raw path) to keep the number of series bounded
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, route=route, method=request.method, status=response.status_code)
+        # Share this worker's values with the other workers' /metrics (throttled, see metrics.py)
+        write_snapshot()
+    request_span = g.get('request_span')
+    if request_span is not None:
+        request_span[0].set_attribute("http.status_code", response.status_code)
+        response.headers['X-Trace-Id'] = request_span[0].trace_id
+    request_profile = g.get('request_profile')
+    if request_profile is not None:
+        response.headers['X-Profile'] = request_profile[0].name
+    return response
+
+def finish_request(error=None):
+    request_profile = g.pop('request_profile', None)
+    if request_profile is not None:
+        stop_request_profile(*request_profile)
+    request_span = g.pop('request_span', None)
+    if request_span is not None:
+        end_span(*request_span, error=error)
+
+def metrics():
+    """Prometheus scrape endpoint, summed over the gunicorn workers (see metrics.py)"""
+    if not METRICS_TOKEN:
+        return jsonify({"error": "Not found", "status": "error"}), 404
+    if not metrics_authorized(request.headers):
+        return jsonify({"error": "Unauthorized", "status": "error"}), 401
+    return Response(render_metrics(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
 
-# Enable CORS for all routes
-CORS(app)
-
-# Register blueprints
-app.register_blueprint(intense_experience_bp)
-
-@app.route('/')
 def index():
     # Parse URL parameters for different entry points
     suite_id = request.args.get('suite_id')
@@ -31,8 +78,16 @@ def index():
         query_string = '&'.join([f'{k}={v}' for k, v in params.items()])
         return redirect(f'/?{query_string}')
 
-    # Pass parameters to template for JavaScript access
-    return render_template('index.html', suite_id=suite_id, service_id=service_id)
+    # Pass parameters to template for JavaScript access, with the startup API responses
+    # (config, services, suites, limits) embedded so the widget renders without calling them,
+    # and the first calendar view when it can be computed within INDEX_PREFETCH_BUDGET_MS
+    return render_template(
+        'index.html',
+        suite_id=suite_id,
+        service_id=service_id,
+        bootstrap_json=get_bootstrap_json(make_mews_request),
+        prefetched_availability=prefetch_calendar_availability(make_mews_request, service_id, suite_id)
+    )
 
     # Example URL parameters for different entry points:
 
@@ -83,7 +138,60 @@ def index():
     # Espace NAIADE Journée (PROD): ?service_id=7664a134-ac16-464c-80c0-b2b5006f292d&suite_id=2cb64c65-5472-454a-abca-b2b50146249b
     
 
+def create_app(warm_up=True):
+    """
+    Build the Flask app (gunicorn entry point: wsgi.py).
+
+    Args:
+        warm_up: start the warm-up thread now; gunicorn.conf.py passes False through wsgi.py and
+            starts it in each worker after the fork instead (threads do not survive a fork)
+
+    Returns:
+        Flask: the configured app
+    """
+    app = Flask(__name__)
+
+    # Enable CORS for all routes
+    CORS(app)
+
+    # Register blueprints
+    app.register_blueprint(intense_experience_bp)
+
+    # Request latency, trace root span and on-demand profiling
+    app.before_request(start_request_timer)
+    app.after_request(record_request_latency)
+    app.teardown_request(finish_request)
+
+    app.add_url_rule('/metrics', view_func=metrics)
+    app.add_url_rule('/', view_func=index)
+
+    if warm_up:
+        # Precompute slot tables, prime catalog caches and open Mews connections before taking traffic
+        # (readiness is reported on /intense_experience-api/ready)
+        start_warm_up(make_mews_request)
+    return app
+
+
+def reinit_after_fork():
+    """
+    Restore per-process state in a worker forked from a preloaded master (gunicorn post_fork).
+
+    The forked worker keeps the master's memory (config, slot tables) but not its threads, and
+    must not share its sockets: open a fresh Mews connection pool, restart the log and trace
+    export threads, give the worker its own availability views, prefetch thread and image and
+    price fetch locks, then run the warm-up for this worker.
+    """
+    reset_mews_session()
+    reinit_availability_versions_after_fork()
+    reinit_prefetch_after_fork()
+    reinit_image_cache_after_fork()
+    reinit_price_calendar_after_fork()
+    reinit_logging_after_fork()
+    reinit_tracing_after_fork()
+    start_warm_up(make_mews_request)
+
+
 if __name__ == '__main__':
-    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=8000)
+    create_app().run(debug=True, use_reloader=False, host='0.0.0.0', port=8000)
     
 #dummy comment for deploy testing
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Availability deltas for the bulk calendar routes, so a calendar only downloads the dates that changed.
+
+Every bulk response carries "digests", {date_str: digest of the date's availability}. Sending the
+digests the client holds back as "since" returns only the dates whose availability differs from
+them (plus the digests of all requested dates); dates the worker computed less than
+AVAILABILITY_DELTA_TTL_SECONDS ago are not recomputed, so repeated views and background refreshes
+cost almost nothing upstream.
+
+How it works:
+- A digest only depends on the content of a date (BLAKE2b of its serialised value), so every
+  worker process understands the digests issued by any other, before or after a restart: with
+  several gunicorn workers and no sticky routing a delta request still only returns changed dates.
+- Each request shape (engine, service, suite, booking type, response format) is a "view" holding,
+  in each worker, the last computed value of every date and when it was computed. A worker that
+  has no recent value for a date computes it, then compares it with the client's digest; the
+  recomputation saving is per worker, the bandwidth saving is not.
+- create_reservation calls invalidate_dates() for the dates a new booking touches, so the next
+  delta request served by that worker recomputes them immediately. Other workers, and bookings
+  made through other channels, show up once their cached dates expire.
+
+Responses of these routes depend on the client's "since", so they are served without ETag
+revalidation (json_response(..., etag=False)): an unchanged view already costs a near-empty body.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from config import AVAILABILITY_DELTA_TTL_SECONDS, AVAILABILITY_VERSION_MAX_VIEWS
+from local_time import epoch_to_local, parse_iso_epoch
+from metrics import CACHE_LOOKUPS
+from responses import dumps
+from tracing import set_attributes
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+# {view_key: {"meta": {response keys besides availability}, "dates": {date_str: _DateEntry}}}, least recently used first
+_VIEWS = OrderedDict()
+
+
+class _DateEntry:
+    __slots__ = ("digest", "value", "computed_at", "day")
+
+    def __init__(self, digest, value, computed_at, day):
+        self.digest = digest
+        self.value = value
+        self.computed_at = computed_at
+        self.day = day
+
+
+def view_key(engine, data, response_format=None):
+    """Key of a request shape: requests with the same key share their cached dates."""
+    return (engine, data.get('service_id'), data.get('suite_id'), data.get('booking_type'), response_format)
+
+
+def digest_of(value):
+    """Content digest of one date's availability (the same in every process)."""
+    return hashlib.blake2b(dumps(value), digest_size=8).hexdigest()
+
+
+def calendar_day(date_str):
+    """Calendar date of a bulk request date key (ISO string at UTC midnight)."""
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _record(key, result, now):
+    """
+    Store a successful engine result in its view.
+
+    Returns:
+        dict: {date_str: digest} of the computed dates
+    """
+    digests = {date_str: digest_of(value) for date_str, value in result["availability"].items()}
+    with _LOCK:
+        view = _VIEWS.get(key)
+        if view is None:
+            view = _VIEWS[key] = {"meta": {}, "dates": {}}
+            while len(_VIEWS) > AVAILABILITY_VERSION_MAX_VIEWS:
+                _VIEWS.popitem(last=False)
+        else:
+            _VIEWS.move_to_end(key)
+        view["meta"] = {k: v for k, v in result.items() if k not in ("availability", "stays")}
+        for date_str, value in result["availability"].items():
+            view["dates"][date_str] = _DateEntry(digests[date_str], value, now, calendar_day(date_str))
+    return digests
+
+
+def versioned_availability(key, data, compute):
+    """
+    Run a bulk availability engine, answering with only the changed dates when the client has digests.
+
+    Args:
+        key: view_key() of the request
+        data: request body; data["since"] is {date_str: digest} of the client's copy (optional)
+        compute: function(data) running the engine, returns a response dict or (error_dict, status)
+
+    Returns:
+        dict: the engine response with "digests" ({date_str: digest}); with "since",
+            "availability" only holds the dates whose digest differs from the client's and
+            "delta" is True
+        tuple: (error_dict, status) from the engine
+    """
+    since = data.get('since')
+    dates = data.get('dates') or []
+    now = time.monotonic()
+
+    if not isinstance(since, dict) or not since:
+        # Full response (first load): compute everything, as without deltas
+        result = compute(data)
+        if isinstance(result, tuple):
+            return result
+        digests = _record(key, result, now)
+        set_attributes({"availability.delta": False})
+        return {**result, "digests": digests}
+
+    with _LOCK:
+        view = _VIEWS.get(key)
+        if view is not None:
+            _VIEWS.move_to_end(key)
+        stale = [date_str for date_str in dates
+                 if view is None or date_str not in view["dates"]
+                 or now - view["dates"][date_str].computed_at >= AVAILABILITY_DELTA_TTL_SECONDS]
+        meta = dict(view["meta"]) if view is not None else {}
+
+    CACHE_LOOKUPS.inc(len(dates) - len(stale), cache="availability", result="hit")
+    CACHE_LOOKUPS.inc(len(stale), cache="availability", result="miss")
+
+    if stale:
+        # stale can have gaps (invalidate_dates, TTLs); the engines chunk runs of consecutive days
+        result = compute({**data, 'dates': stale})
+        if isinstance(result, tuple):
+            return result
+        meta = {k: v for k, v in result.items() if k not in ("availability", "stays")}
+        _record(key, result, now)
+
+    with _LOCK:
+        view = _VIEWS.get(key, {"dates": {}})
+        entries = {date_str: view["dates"][date_str] for date_str in dates if date_str in view["dates"]}
+    changed = {date_str: entry.value for date_str, entry in entries.items() if since.get(date_str) != entry.digest}
+
+    set_attributes({"availability.delta": True, "availability.recomputed_dates": len(stale), "availability.changed_dates": len(changed)})
+    logger.debug("Availability delta: %d of %d dates recomputed, %d changed", len(stale), len(dates), len(changed))
+    return {**meta, "availability": changed, "digests": {date_str: entry.digest for date_str, entry in entries.items()}, "delta": True}
+
+
+def booking_days(start_utc, end_utc):
+    """
+    Local days whose availability a booking from start_utc to end_utc can change: from the day
+    before the start (its night ends on the arrival day) to the day of the end.
+
+    Returns:
+        tuple: (first_day, last_day) dates, or None when the timestamps cannot be parsed
+    """
+    try:
+        return (epoch_to_local(parse_iso_epoch(start_utc))[0] - timedelta(days=1),
+                epoch_to_local(parse_iso_epoch(end_utc))[0])
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def invalidate_dates(start_utc, end_utc):
+    """Force the next delta request to recompute the dates (booking_days) a booking touches, in every view."""
+    days = booking_days(start_utc, end_utc)
+    if days is None:
+        return
+    first_day, last_day = days
+
+    invalidated = 0
+    with _LOCK:
+        for view in _VIEWS.values():
+            for entry in view["dates"].values():
+                if entry.day is not None and first_day <= entry.day <= last_day:
+                    entry.computed_at = float("-inf")
+                    invalidated += 1
+    logger.debug("Invalidated %d cached availability dates between %s and %s", invalidated, first_day, last_day)
+
+
+def reinit_after_fork():
+    """Fresh lock in a forked worker; digests stay valid, the master's cached dates are dropped."""
+    global _LOCK
+    _LOCK = threading.Lock()
+    _VIEWS.clear()
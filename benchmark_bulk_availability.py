@@ -0,0 +1,402 @@
+"""
+Offline benchmark for the bulk availability engines (check_bulk_availability_journee / _nuitee).
+
+Both engines are driven with an in-memory make_mews_request_func stub, so no network is involved:
+the "fetch" stages only measure the stub filtering its synthetic data.
+
+Scale parameters (each accepts a comma-separated list, the benchmark runs the full grid):
+- --dates: number of calendar dates requested (1-365)
+- --suites: suite categories per service (1-50); the configured suites come first so the
+  AND rule, special minimum durations and resource mapping are exercised
+- --reservations: synthetic reservations spread over the requested range (0-50000)
+- --blocks: active resource blocks over the requested range (0-500)
+- --modes: "selected" (suite_id set) and/or "aggregated" (suite_id=None)
+
+For every scenario it reports wall time (min/median/max over --repeat runs after one warm-up run),
+per-stage time from the engines' stage listeners (summed over chunk threads, so it can exceed wall
+time) and peak Python memory (tracemalloc, measured in a separate run to keep timings clean).
+
+With --cassette, the synthetic data is replaced by a recorded cassette (mews_cassette.py): the engines
+run over the captured dates with the recorded reservation and block densities.
+
+Usage:
+    python benchmark_bulk_availability.py --dates 30,365 --suites 15,50 --reservations 0,5000,50000 \\
+        --blocks 0,500 --output benchmark_results.json
+    python benchmark_bulk_availability.py --quick --compare benchmark_results.json
+    python benchmark_bulk_availability.py --cassette busy_weekend.jsonl.gz --dates 4,30
+"""
+import argparse
+import itertools
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+
+from bulk_availability import (
+    check_bulk_availability_journee,
+    check_bulk_availability_nuitee,
+    add_stage_listener,
+    remove_stage_listener
+)
+from catalog_cache import clear_catalog_cache, fetch_resource_categories
+from config import (
+    DAY_SERVICE_ID,
+    NIGHT_SERVICE_ID,
+    SUITE_ID_MAPPING,
+    SUITE_ID_MAPPING_REVERSE,
+    SUITE_TO_RESOURCE_ID,
+    SPECIAL_MIN_DURATION_SUITES,
+    BUILDING_RESOURCE_ID,
+    BUILDING_CATEGORY_ID
+)
+from local_time import local_to_epoch, epoch_to_local, epoch_to_utc_iso, parse_iso_epoch
+from mews_cassette import CassettePlayer
+
+logger = logging.getLogger(__name__)
+
+ENGINES = {
+    "journee": (check_bulk_availability_journee, DAY_SERVICE_ID),
+    "nuitee": (check_bulk_availability_nuitee, NIGHT_SERVICE_ID),
+}
+
+# Longest synthetic reservation / block, used to bound the stub's range queries
+MAX_RESERVATION_SECONDS = 48 * 3600
+MAX_BLOCK_SECONDS = 72 * 3600
+
+
+def build_suite_ids(service_id, count, rng):
+    """Configured suites of the service first, then synthetic category IDs up to count."""
+    if service_id == NIGHT_SERVICE_ID:
+        configured = sorted(SUITE_ID_MAPPING_REVERSE)
+    else:
+        configured = sorted(set(SUITE_ID_MAPPING) | set(SPECIAL_MIN_DURATION_SUITES)
+                            | {sid for sid in SUITE_TO_RESOURCE_ID if sid not in SUITE_ID_MAPPING_REVERSE})
+    suite_ids = configured[:count]
+    while len(suite_ids) < count:
+        suite_ids.append(str(uuid.UUID(int=rng.getrandbits(128))))
+    return suite_ids
+
+
+class InMemoryMews:
+    """make_mews_request_func stub answering from synthetic, pre-sorted data."""
+
+    def __init__(self, first_day, days, suites_per_service, reservation_count, block_count, seed=7):
+        rng = random.Random(seed)
+        self.categories = []
+        for service_id in (DAY_SERVICE_ID, NIGHT_SERVICE_ID):
+            for suite_id in build_suite_ids(service_id, suites_per_service, rng):
+                self.categories.append({"Id": suite_id, "ServiceId": service_id, "IsActive": True,
+                                        "Type": "Suite", "Names": {"fr-FR": f"Suite {suite_id[:8]}"}})
+        if BUILDING_CATEGORY_ID:
+            self.categories.append({"Id": BUILDING_CATEGORY_ID, "ServiceId": DAY_SERVICE_ID, "IsActive": True,
+                                    "Type": "Other", "Names": {"fr-FR": "Batiment"}})
+
+        range_start = local_to_epoch(first_day)
+        range_seconds = days * 86400
+        category_ids = [c["Id"] for c in self.categories]
+
+        reservations = []
+        for index in range(reservation_count):
+            category_id = rng.choice(category_ids)
+            start = range_start + rng.randrange(range_seconds // 3600) * 3600
+            if category_id in SUITE_ID_MAPPING_REVERSE:
+                duration = rng.choice([15, 39]) * 3600
+            else:
+                duration = rng.randint(2, 6) * 3600
+            reservations.append((start, start + duration, {
+                "Id": str(index),
+                "RequestedCategoryId": category_id,
+                "StartUtc": epoch_to_utc_iso(start),
+                "EndUtc": epoch_to_utc_iso(start + duration),
+                "State": "Confirmed"
+            }))
+        reservations.sort(key=lambda item: item[0])
+        self.reservation_starts = [item[0] for item in reservations]
+        self.reservations = reservations
+
+        resource_ids = sorted(set(SUITE_TO_RESOURCE_ID.values())) or ["synthetic-resource"]
+        if BUILDING_RESOURCE_ID:
+            resource_ids.append(BUILDING_RESOURCE_ID)
+        blocks = []
+        for _ in range(block_count):
+            start = range_start + rng.randrange(range_seconds // 3600) * 3600
+            end = start + rng.choice([2, 8, 24, 72]) * 3600
+            blocks.append((start, end, {"AssignedResourceId": rng.choice(resource_ids), "IsActive": True,
+                                        "StartUtc": epoch_to_utc_iso(start), "EndUtc": epoch_to_utc_iso(end)}))
+        blocks.sort(key=lambda item: item[0])
+        self.block_starts = [item[0] for item in blocks]
+        self.blocks = blocks
+        self.calls = {}
+
+    @staticmethod
+    def _colliding(items, starts, start_ts, end_ts, max_length):
+        first = bisect_left(starts, start_ts - max_length)
+        last = bisect_right(starts, end_ts)
+        return [item[2] for item in items[first:last] if item[0] < end_ts and item[1] > start_ts]
+
+    def __call__(self, endpoint, payload):
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if endpoint == "resourceCategories/getAll":
+            service_ids = payload.get("ServiceIds") or []
+            return {"ResourceCategories": [c for c in self.categories if c["ServiceId"] in service_ids]}
+        if endpoint == "reservations/getAll":
+            return {"Reservations": self._colliding(
+                self.reservations, self.reservation_starts,
+                parse_iso_epoch(payload["StartUtc"]), parse_iso_epoch(payload["EndUtc"]), MAX_RESERVATION_SECONDS)}
+        if endpoint == "resourceBlocks/getAll":
+            return {"ResourceBlocks": self._colliding(
+                self.blocks, self.block_starts,
+                parse_iso_epoch(payload["CollidingUtc"]["StartUtc"]),
+                parse_iso_epoch(payload["CollidingUtc"]["EndUtc"]), MAX_BLOCK_SECONDS)}
+        return None
+
+
+class StageRecorder:
+    """Stage listener summing {stage: seconds} across the setup and every chunk of one run."""
+
+    def __init__(self):
+        self.times = {}
+        # Chunks report from the engines' worker threads
+        self.lock = threading.Lock()
+
+    def __call__(self, engine, stage_times):
+        with self.lock:
+            for stage, seconds in stage_times.items():
+                self.times[stage] = self.times.get(stage, 0.0) + seconds
+
+
+def run_scenario(engine, dates_count, suites_count, reservation_count, block_count, mode, repeat, first_day):
+    """Run one scenario and return its result dict."""
+    engine_func, service_id = ENGINES[engine]
+    stub = InMemoryMews(first_day, dates_count + 2, suites_count, reservation_count, block_count)
+    dates = [(first_day + timedelta(days=i)).strftime('%Y-%m-%dT00:00:00.000Z') for i in range(dates_count)]
+    suite_ids = [c["Id"] for c in stub.categories if c["ServiceId"] == service_id]
+    data = {
+        "service_id": service_id,
+        "dates": dates,
+        "suite_id": suite_ids[0] if mode == "selected" else None,
+        "booking_type": "night"
+    }
+
+    measurement = measure_engine(engine_func, stub, data, repeat)
+    return {
+        "engine": engine,
+        "mode": mode,
+        "dates": dates_count,
+        "suites_per_service": suites_count,
+        "reservations": reservation_count,
+        "blocks": block_count,
+        **measurement,
+        "upstream_calls_per_run": {endpoint: count // (repeat + 2) for endpoint, count in stub.calls.items()}
+    }
+
+
+def measure_engine(engine_func, request_func, data, repeat):
+    """
+    Time one engine call: a warm-up run, repeat timed runs with stage listeners, one tracemalloc run.
+
+    Returns:
+        dict: wall_seconds, stage_seconds, peak_memory_bytes and dates_returned
+    """
+    def run_once():
+        # The catalog cache is keyed on the payload, not on the stub: never reuse another scenario's suites
+        clear_catalog_cache()
+        return engine_func(request_func, dict(data))
+
+    result = run_once()  # warm-up (slot tables, interned categories)
+    if isinstance(result, tuple):
+        raise RuntimeError(f"Engine returned an error: {result[0]}")
+
+    wall_times = []
+    stage_runs = []
+    for _ in range(repeat):
+        recorder = StageRecorder()
+        add_stage_listener(recorder)
+        try:
+            started = time.perf_counter()
+            run_once()
+            wall_times.append(time.perf_counter() - started)
+        finally:
+            remove_stage_listener(recorder)
+        stage_runs.append(recorder.times)
+
+    # Separate run for memory: tracemalloc slows allocation-heavy code down considerably
+    tracemalloc.start()
+    try:
+        run_once()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stages = sorted({stage for run in stage_runs for stage in run})
+    return {
+        "wall_seconds": {
+            "min": round(min(wall_times), 6),
+            "median": round(statistics.median(wall_times), 6),
+            "max": round(max(wall_times), 6)
+        },
+        "stage_seconds": {
+            stage: round(statistics.median(run.get(stage, 0.0) for run in stage_runs), 6) for stage in stages
+        },
+        "peak_memory_bytes": peak_memory,
+        "dates_returned": len(result.get("availability", {}))
+    }
+
+
+def run_cassette_scenario(player, engine, dates_count, mode, repeat):
+    """
+    Run one engine over the dates captured in a cassette (see mews_cassette.py).
+
+    Reservations and resource blocks are answered from the pooled recorded records for whatever
+    range the engine asks, so the captured densities are replayed for any date set.
+    """
+    engine_func, service_id = ENGINES[engine]
+    request_func = player.as_request_func(range_only=True)
+    recorded_range = player.recorded_range()
+    if recorded_range is None:
+        raise SystemExit("The cassette holds no reservations/getAll responses")
+
+    first_day, _, _ = epoch_to_local(recorded_range[0])
+    last_day, _, _ = epoch_to_local(recorded_range[1])
+    dates_count = min(dates_count, (last_day - first_day).days + 1)
+    dates = [(first_day + timedelta(days=i)).strftime('%Y-%m-%dT00:00:00.000Z') for i in range(dates_count)]
+
+    categories = (fetch_resource_categories(request_func, [service_id]) or {}).get("ResourceCategories", [])
+    suite_ids = [c["Id"] for c in categories if c.get("IsActive") and c.get("Type") in ("Suite", "Room")]
+    if mode == "selected" and not suite_ids:
+        raise SystemExit(f"The cassette holds no {engine} suite categories")
+    data = {
+        "service_id": service_id,
+        "dates": dates,
+        "suite_id": suite_ids[0] if mode == "selected" else None,
+        "booking_type": "night"
+    }
+
+    window_start = local_to_epoch(first_day)
+    window_end = local_to_epoch(first_day, 24 * (dates_count + 1))
+    window = {"StartUtc": epoch_to_utc_iso(window_start), "EndUtc": epoch_to_utc_iso(window_end)}
+    reservations = request_func("reservations/getAll", dict(window))["Reservations"]
+    blocks = request_func("resourceBlocks/getAll", {"CollidingUtc": window})["ResourceBlocks"]
+
+    return {
+        "engine": engine,
+        "mode": mode,
+        "dates": dates_count,
+        "suites_per_service": len(suite_ids),
+        "reservations": len(reservations),
+        "blocks": len(blocks),
+        "cassette": player.path,
+        "first_date": first_day.isoformat(),
+        **measure_engine(engine_func, request_func, data, repeat)
+    }
+
+
+def scenario_key(result):
+    return (result["engine"], result["mode"], result["dates"], result["suites_per_service"],
+            result["reservations"], result["blocks"])
+
+
+def compare_results(results, baseline_path):
+    """Print the median wall time ratio against a previous results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {scenario_key(r): r for r in json.load(f)["results"]}
+    print(f"\nComparison with {baseline_path} (median wall time, new / old):")
+    for result in results:
+        previous = baseline.get(scenario_key(result))
+        if not previous:
+            continue
+        old = previous["wall_seconds"]["median"]
+        new = result["wall_seconds"]["median"]
+        ratio = new / old if old else float("inf")
+        print(f"  {format_scenario(result)}: {old * 1000:.1f}ms -> {new * 1000:.1f}ms (x{ratio:.2f})")
+
+
+def format_scenario(result):
+    return (f"{result['engine']:7} {result['mode']:10} dates={result['dates']:<3} suites={result['suites_per_service']:<2} "
+            f"reservations={result['reservations']:<5} blocks={result['blocks']:<3}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bulk availability engines with an in-memory Mews stub")
+    parser.add_argument("--engines", default="journee,nuitee")
+    parser.add_argument("--modes", default="selected,aggregated")
+    parser.add_argument("--dates", type=parse_int_list, default=[30, 365])
+    parser.add_argument("--suites", type=parse_int_list, default=[15, 50])
+    parser.add_argument("--reservations", type=parse_int_list, default=[0, 5000, 50000])
+    parser.add_argument("--blocks", type=parse_int_list, default=[0, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="small grid for a smoke run")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="previous results file to compare against")
+    parser.add_argument("--cassette", default=None,
+                        help="replay captured Mews data (mews_cassette.py) instead of the synthetic grid")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.dates, args.suites, args.reservations, args.blocks, args.repeat = [30], [15], [0, 2000], [0, 50], 2
+
+    # Engine logging is per chunk; keep it out of the measurements
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("bulk_availability").setLevel(logging.WARNING)
+
+    # Start tomorrow so every date lies inside the precomputed offset and slot tables
+    first_day = date.today() + timedelta(days=1)
+    results = []
+    if args.cassette:
+        player = CassettePlayer(args.cassette)
+        scenarios = [lambda engine=engine, mode=mode, dates_count=dates_count:
+                     run_cassette_scenario(player, engine, dates_count, mode, args.repeat)
+                     for engine, mode, dates_count in itertools.product(
+                         args.engines.split(","), args.modes.split(","), args.dates)]
+    else:
+        scenarios = [lambda params=params: run_scenario(*params, args.repeat, first_day)
+                     for params in itertools.product(args.engines.split(","), args.dates, args.suites,
+                                                     args.reservations, args.blocks, args.modes.split(","))]
+    for scenario in scenarios:
+        result = scenario()
+        results.append(result)
+        stages = ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in result["stage_seconds"].items())
+        print(f"{format_scenario(result)} wall={result['wall_seconds']['median'] * 1000:.1f}ms "
+              f"peak={result['peak_memory_bytes'] / 1e6:.1f}MB [{stages}]")
+
+    output = {
+        "meta": {
+            "created_utc": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nSaved {len(results)} scenarios to {args.output}")
+
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Startup data embedded in index.html, so the widget renders without its configuration round trips.
+
+On load the components used to fetch /frontend-config (three times), /services, /suites,
+/booking-limits and /suite-id-mapping before showing anything. index() now renders the bodies of
+all these GET routes into the page as window.__IE_BOOTSTRAP__ = {url: body}, and the components
+read them through window.ieGetJson(url) (templates/index.html), which only calls the API for URLs
+missing from the bootstrap.
+
+For deep links (?service_id=...&suite_id=...) the page also carries the availability of the
+dates the calendar shows first (window.__IE_AVAILABILITY__, see prefetch_calendar_availability),
+computed within INDEX_PREFETCH_BUDGET_MS; without it the calendar calls the bulk route as before.
+
+The bodies come from the same build_*_response functions as the routes. The serialised blob is
+kept in memory until the catalog changes (catalog_generation()) or CATALOG_CACHE_TTL_SECONDS pass,
+after which the next page load refreshes the catalog and rebuilds it. Config values are module
+constants, so a config change means a restart, which starts with an empty cache.
+"""
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+
+from markupsafe import Markup
+
+from availability_versions import view_key, versioned_availability
+from bulk_availability import BELGIAN_TZ, check_bulk_availability_journee, check_bulk_availability_nuitee
+from catalog_cache import catalog_generation
+from config import (
+    DAY_SERVICE_ID,
+    NIGHT_SERVICE_ID,
+    CATALOG_CACHE_TTL_SECONDS,
+    INDEX_PREFETCH_BUDGET_MS,
+    INDEX_PREFETCH_MAX_CONCURRENT
+)
+from intense_experience import (
+    build_frontend_config_response,
+    build_services_response,
+    build_suites_response,
+    build_suite_id_mapping_response,
+    build_booking_limits_response
+)
+from metrics import CACHE_LOOKUPS
+from prefetch import calendar_grid_dates, cached_compute, schedule_adjacent_months
+from responses import dumps
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/intense_experience-api"
+
+# (catalog_generation, expires_at_monotonic, Markup)
+_BOOTSTRAP = None
+_BOOTSTRAP_LOCK = threading.Lock()
+
+# Page loads computing availability at the same time; others render without it
+_PREFETCH_SLOTS = threading.BoundedSemaphore(INDEX_PREFETCH_MAX_CONCURRENT)
+_PREFETCH_EXECUTOR = None
+
+
+def build_bootstrap(make_mews_request_func):
+    """
+    Collect the bodies of the startup GET routes, keyed by the URL the components request.
+
+    Returns:
+        tuple: ({url: body}, complete) - routes that failed are left out (the page then calls
+            them itself) and complete is False
+    """
+    entries = {
+        f"{API_PREFIX}/frontend-config": build_frontend_config_response(),
+        f"{API_PREFIX}/suite-id-mapping": build_suite_id_mapping_response(),
+        f"{API_PREFIX}/booking-limits": build_booking_limits_response()
+    }
+    complete = True
+
+    services = build_services_response(make_mews_request_func)
+    if isinstance(services, tuple):
+        complete = False
+    else:
+        entries[f"{API_PREFIX}/services"] = services
+
+    for service_id in (DAY_SERVICE_ID, NIGHT_SERVICE_ID):
+        suites = build_suites_response(make_mews_request_func, service_id)
+        if isinstance(suites, tuple):
+            complete = False
+            continue
+        entries[f"{API_PREFIX}/suites?service_id={service_id}"] = suites
+        # TimeSelector asks for the limits of the selected suite
+        for suite in suites["suites"]:
+            entries[f"{API_PREFIX}/booking-limits?suite_id={suite['Id']}"] = build_booking_limits_response(suite['Id'])
+
+    return entries, complete
+
+
+def script_json(data):
+    """JSON safe to place inside a <script> element (no "</script>", "<!--" or line separators)."""
+    text = dumps(data).decode("utf-8")
+    for char, escaped in (("<", "\\u003c"), (">", "\\u003e"), ("&", "\\u0026"), ("\u2028", "\\u2028"), ("\u2029", "\\u2029")):
+        text = text.replace(char, escaped)
+    return Markup(text)
+
+
+def get_bootstrap_json(make_mews_request_func):
+    """
+    The bootstrap blob for index.html, rebuilt when the catalog changed or the cached one expired.
+
+    Returns:
+        Markup: JSON object literal {url: body}
+    """
+    global _BOOTSTRAP
+    now = time.monotonic()
+    # Read before building: a catalog change during the build makes the next page load rebuild again
+    generation = catalog_generation()
+
+    cached = _BOOTSTRAP
+    if cached is not None and cached[0] == generation and cached[1] > now:
+        CACHE_LOOKUPS.inc(cache="bootstrap", result="hit")
+        return cached[2]
+    CACHE_LOOKUPS.inc(cache="bootstrap", result="miss")
+
+    with _BOOTSTRAP_LOCK:
+        # Another request may have rebuilt it while we waited
+        cached = _BOOTSTRAP
+        if cached is not None and cached[0] == generation and cached[1] > now:
+            return cached[2]
+
+        entries, complete = build_bootstrap(make_mews_request_func)
+        blob = script_json(entries)
+        if complete:
+            _BOOTSTRAP = (generation, now + CATALOG_CACHE_TTL_SECONDS, blob)
+        else:
+            # Not cached: the next page load retries the failed catalog calls
+            logger.warning("Bootstrap built without some catalog routes, the page will call them itself")
+        return blob
+
+
+# =============================================================================
+# FIRST CALENDAR VIEW
+# =============================================================================
+
+def calendar_dates(today):
+    """Dates CalendarSelector.vue requests on mount: the grids of this month and the next one, from today on."""
+    first_of_month = today.replace(day=1)
+    return calendar_grid_dates((first_of_month, (first_of_month + timedelta(days=32)).replace(day=1)), today)
+
+
+def _get_prefetch_executor():
+    global _PREFETCH_EXECUTOR
+    if _PREFETCH_EXECUTOR is None:
+        # Created on first use: a preloaded gunicorn master never starts its threads
+        _PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=INDEX_PREFETCH_MAX_CONCURRENT, thread_name_prefix="index-prefetch")
+    return _PREFETCH_EXECUTOR
+
+
+def prefetch_calendar_availability(make_mews_request_func, service_id, suite_id=None):
+    """
+    Availability of the first calendar view, for embedding in index.html.
+
+    Runs the same bulk request as the calendar (journée versioned in bitmask format, nuitée with
+    its stays table) and waits at most INDEX_PREFETCH_BUDGET_MS. A journée computation that runs
+    over the budget finishes in the background (its dates are then cached for the calendar's
+    next delta requests).
+
+    Args:
+        service_id: journée or nuitée service from the URL
+        suite_id: preselected suite from the URL (optional)
+
+    Returns:
+        Markup: JSON {"endpoint", "request", "response"} matching the calendar's first bulk
+            request, or None (disabled, busy, over budget or failed)
+    """
+    if INDEX_PREFETCH_BUDGET_MS <= 0 or service_id not in (DAY_SERVICE_ID, NIGHT_SERVICE_ID):
+        return None
+    if not _PREFETCH_SLOTS.acquire(blocking=False):
+        logger.debug("Skipping availability prefetch: %d already running", INDEX_PREFETCH_MAX_CONCURRENT)
+        return None
+
+    night = service_id == NIGHT_SERVICE_ID
+    data = {
+        "service_id": service_id,
+        "dates": calendar_dates(datetime.now(BELGIAN_TZ).date()),
+        "booking_type": "night" if night else "day",
+        "suite_id": suite_id or None
+    }
+    if night:
+        endpoint = f"{API_PREFIX}/bulk-availability-nuitee"
+        # Like the calendar's request: stays span several dates and are always computed in full
+        data["include_stays"] = True
+        run = functools.partial(check_bulk_availability_nuitee, make_mews_request_func, data)
+    else:
+        endpoint = f"{API_PREFIX}/bulk-availability-journee?format=bitmask"
+        key = view_key("journee", data, 'bitmask')
+        compute = cached_compute(key, lambda body: check_bulk_availability_journee(make_mews_request_func, body, bitmask=True))
+        run = functools.partial(versioned_availability, key, data, compute)
+
+    try:
+        # copy_context keeps the engine's spans in the page request's trace
+        future = _get_prefetch_executor().submit(contextvars.copy_context().run, run)
+    except RuntimeError:
+        _PREFETCH_SLOTS.release()
+        return None
+    future.add_done_callback(lambda f: _PREFETCH_SLOTS.release())
+
+    try:
+        response = future.result(timeout=INDEX_PREFETCH_BUDGET_MS / 1000)
+    except FutureTimeoutError:
+        logger.info("Availability prefetch for %s over its %d ms budget, the calendar will fetch it", endpoint, INDEX_PREFETCH_BUDGET_MS)
+        return None
+    except Exception as e:
+        logger.warning(f"Availability prefetch failed: {e}")
+        return None
+
+    if isinstance(response, tuple):
+        # Engine error (unknown suite, Mews down): the calendar's own request reports it
+        return None
+    if not night:
+        # The visitor's next click is likely a month navigation (prefetch.py)
+        schedule_adjacent_months(key, "journee", data, compute, datetime.now(BELGIAN_TZ).date())
+    return script_json({"endpoint": endpoint, "request": data, "response": response})
@@ -1,12 +1,20 @@
+import contextvars
 import logging
+import threading
 import unicodedata
+from time import perf_counter
+from array import array
 from datetime import datetime, timedelta, time
 import pytz
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from catalog_cache import fetch_resource_categories
+from local_time import local_to_epoch, epoch_to_utc_iso, parse_iso_epoch
+from tracing import span, traced, is_recording, set_attributes
+from profiling import profiled_thread
+from metrics import BULK_CHUNKS, BULK_CHUNK_DURATION, BULK_QUEUE_DEPTH, BULK_CHUNKS_IN_FLIGHT, CACHE_LOOKUPS
 
 # Import all configuration from shared config file
 from config import (
-    ENTERPRISE_ID,
     DAY_SERVICE_ID,
     NIGHT_SERVICE_ID,
     CLEANING_BUFFER_HOURS,
@@ -19,11 +27,14 @@ from config import (
     DEPARTURE_TIMES,
     NIGHT_CHECK_IN_HOUR,
     NIGHT_CHECK_OUT_HOUR, 
+    NIGHT_MAX_NIGHTS,
+    EARLY_CHECK_IN_HOUR,
     SUITE_ID_MAPPING,
     SUITE_ID_MAPPING_REVERSE,
     SUITE_TO_RESOURCE_ID,
     BUILDING_RESOURCE_ID,
-    BUILDING_CATEGORY_ID
+    BUILDING_CATEGORY_ID,
+    BOOKING_HORIZON_DAYS
 )
 
 # Configure logging
@@ -31,11 +42,189 @@ logger = logging.getLogger(__name__)
 # Reuse timezone object in hot paths
 BELGIAN_TZ = pytz.timezone(TIMEZONE)
 
-# Global cache for precomputed time slots per date - avoids repeated datetime creation
+# Global cache for precomputed time slots per date - avoids repeated epoch computation
+# {date: {min_hours: (start epochs array, end epochs array)}}, bounded to GLOBAL_SLOTS_MAX_DAYS dates
 GLOBAL_SLOTS = {}
+GLOBAL_SLOTS_MAX_DAYS = BOOKING_HORIZON_DAYS + 62
+_GLOBAL_SLOTS_LOCK = threading.Lock()
 
 # Pre-generate valid slots per minimum-hour rule (module-level cache)
 _VALID_SLOTS_BY_MIN_HOURS = {}
+# Bit of each valid slot in the bitmask slot table, per minimum-hour rule
+_SLOT_BITS_BY_MIN_HOURS = {}
+
+# Cleaning buffer in seconds, applied to epoch timestamps in hot loops
+CLEANING_BUFFER_SECONDS = CLEANING_BUFFER_HOURS * 3600
+
+# Interned category IDs: reservation records carry a small int instead of the category ID string
+NO_CATEGORY = -1
+_CATEGORY_INDEX = {}
+_CATEGORY_INDEX_LOCK = threading.Lock()
+
+# Per-stage timing listeners (benchmark_bulk_availability.py); empty in production so timing is skipped
+_STAGE_LISTENERS = []
+
+
+def category_index(category_id):
+    """Return the interned index for a category ID (NO_CATEGORY for a missing ID)."""
+    if not category_id:
+        return NO_CATEGORY
+    index = _CATEGORY_INDEX.get(category_id)
+    if index is None:
+        with _CATEGORY_INDEX_LOCK:
+            index = _CATEGORY_INDEX.setdefault(category_id, len(_CATEGORY_INDEX))
+    return index
+
+
+class ReservationRecord:
+    """
+    Compact reservation used by the availability checks, built once at parse time.
+
+    Attributes:
+        category: interned index of RequestedCategoryId (see category_index)
+        start: start as epoch seconds (no cleaning buffer applied)
+        end: end as epoch seconds (no cleaning buffer applied)
+        state: Mews reservation state
+        source_index: position of the reservation in the Mews response
+    """
+    __slots__ = ("category", "start", "end", "state", "source_index")
+
+    def __init__(self, category, start, end, state, source_index):
+        self.category = category
+        self.start = start
+        self.end = end
+        self.state = state
+        self.source_index = source_index
+
+    def conflicts_with(self, start_ts, end_ts):
+        """True if [start_ts, end_ts) overlaps this reservation extended by the cleaning buffer on both sides."""
+        return not (end_ts + CLEANING_BUFFER_SECONDS <= self.start or start_ts - CLEANING_BUFFER_SECONDS >= self.end)
+
+
+def add_stage_listener(listener):
+    """
+    Register a stage timing listener.
+
+    listener(engine, stage_times) is called with engine "journee" or "nuitee" and
+    {stage: seconds} once for the engine setup (fetch_catalog, fetch_blocks) and once per
+    processed chunk (fetch_reservations, parse, bucket, slot_checks, block_checks).
+    """
+    _STAGE_LISTENERS.append(listener)
+
+
+def remove_stage_listener(listener):
+    """Unregister a listener added with add_stage_listener."""
+    if listener in _STAGE_LISTENERS:
+        _STAGE_LISTENERS.remove(listener)
+
+
+class _StageClock:
+    """
+    Charges elapsed time to named stages; does nothing unless a stage listener is registered or
+    the current trace span is recorded (the stage times then become span attributes, see tracing.py).
+    """
+    __slots__ = ("enabled", "times", "_last")
+
+    def __init__(self):
+        self.enabled = bool(_STAGE_LISTENERS) or is_recording()
+        self.times = {}
+        self._last = perf_counter() if self.enabled else 0.0
+
+    def lap(self, stage):
+        """Charge the time elapsed since the previous lap to stage."""
+        if self.enabled:
+            now = perf_counter()
+            self.times[stage] = self.times.get(stage, 0.0) + now - self._last
+            self._last = now
+
+    def report(self, engine):
+        if self.enabled:
+            for listener in list(_STAGE_LISTENERS):
+                listener(engine, self.times)
+            set_attributes({f"stage.{stage}_ms": round(seconds * 1000, 3) for stage, seconds in self.times.items()})
+
+
+def split_into_chunks(sorted_dates, chunk_size_days):
+    """
+    Group sorted ISO dates into chunks of at most chunk_size_days consecutive days.
+
+    Every gap between two dates starts a new chunk, so one reservations/getAll call per chunk
+    covers exactly its dates even when the caller sends a sparse list (e.g. the dates left to
+    compute after a cache or version lookup).
+
+    Returns:
+        list: [(chunk_index, chunk_dates)]
+    """
+    chunks = []
+    previous_day = None
+    for date_str in sorted_dates:
+        day = datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
+        if not chunks or len(chunks[-1][1]) >= chunk_size_days or (day - previous_day).days != 1:
+            chunks.append((len(chunks), []))
+        chunks[-1][1].append(date_str)
+        previous_day = day
+    return chunks
+
+
+def _submit_chunks(executor, engine, process_chunk, chunks):
+    """
+    Submit every chunk to the executor, metering queue depth, chunk counts and durations (metrics.py).
+
+    Each chunk runs in a copy of the caller's context so per-request context variables
+    (e.g. the upstream call listener) follow the work into the pool threads.
+
+    Returns:
+        dict: {future: (chunk_index, chunk_dates)}
+    """
+    def run_chunk(chunk_index, chunk_dates):
+        BULK_QUEUE_DEPTH.dec(engine=engine)
+        BULK_CHUNKS_IN_FLIGHT.inc(engine=engine)
+        started = perf_counter()
+        outcome = "exception"
+        try:
+            with span(f"{engine}.chunk", **{"chunk.index": chunk_index, "chunk.first_date": chunk_dates[0][:10], "chunk.days": len(chunk_dates)}), \
+                    profiled_thread(f"{engine}-chunks"):
+                result = process_chunk(chunk_index, chunk_dates)
+            # Both engines return an empty availability map when the Mews fetch failed
+            availability = result[0] if isinstance(result, tuple) else result
+            outcome = "ok" if availability else "failed"
+            return result
+        finally:
+            BULK_CHUNKS_IN_FLIGHT.dec(engine=engine)
+            BULK_CHUNK_DURATION.observe(perf_counter() - started, engine=engine)
+            BULK_CHUNKS.inc(engine=engine, outcome=outcome)
+
+    future_to_chunk = {}
+    for chunk_index, chunk_dates in chunks:
+        BULK_QUEUE_DEPTH.inc(engine=engine)
+        future = executor.submit(contextvars.copy_context().run, run_chunk, chunk_index, chunk_dates)
+        future_to_chunk[future] = (chunk_index, chunk_dates)
+    return future_to_chunk
+
+
+def parse_reservations(reservations):
+    """
+    Convert Mews reservations into ReservationRecord objects.
+
+    Reservations without StartUtc/EndUtc are skipped.
+
+    Returns:
+        list: ReservationRecord objects, in response order
+    """
+    records = []
+    for index, reservation in enumerate(reservations):
+        start_raw = reservation.get('StartUtc')
+        end_raw = reservation.get('EndUtc')
+        if not start_raw or not end_raw:
+            continue
+        records.append(ReservationRecord(
+            category_index(reservation.get('RequestedCategoryId')),
+            parse_iso_epoch(start_raw),
+            parse_iso_epoch(end_raw),
+            reservation.get('State'),
+            index
+        ))
+    return records
 
 def _get_valid_slots(min_hours):
     """Get valid arrival/departure slot combinations for given minimum hours."""
@@ -56,6 +245,24 @@ def _get_valid_slots(min_hours):
     return slots
 
 
+def get_slot_table():
+    """
+    Slot table of the bitmask response format: every valid slot of the shortest minimum duration,
+    a superset (in the same order) of the slots of any suite. Bit i of a mask is slot i of this table
+    (ARRIVAL_TIMES x DEPARTURE_TIMES stays far below 53 slots, so masks are exact JavaScript numbers).
+    """
+    return _get_valid_slots(min(DAY_MIN_HOURS, SPECIAL_MIN_HOURS))
+
+
+def _get_slot_bits(min_hours):
+    """For each slot of _get_valid_slots(min_hours), its bit (1 << position) in get_slot_table()."""
+    bits = _SLOT_BITS_BY_MIN_HOURS.get(min_hours)
+    if bits is None:
+        position = {slot: index for index, slot in enumerate(get_slot_table())}
+        bits = _SLOT_BITS_BY_MIN_HOURS[min_hours] = tuple(1 << position[slot] for slot in _get_valid_slots(min_hours))
+    return bits
+
+
 def get_precomputed_slots(date_obj):
     """
     Get precomputed time slots for a given date from global cache.
@@ -65,24 +272,31 @@ def get_precomputed_slots(date_obj):
         date_obj: date object for the day to compute slots for
         
     Returns:
-        dict: {min_hours: [(slot_start, slot_end, arrival_str, departure_str, duration), ...]}
+        dict: {min_hours: (slot_starts, slot_ends)} - arrays of epoch seconds, index-aligned
+        with _get_valid_slots(min_hours)
     """
-    if date_obj in GLOBAL_SLOTS:
-        return GLOBAL_SLOTS[date_obj]
+    cached = GLOBAL_SLOTS.get(date_obj)
+    if cached is not None:
+        CACHE_LOOKUPS.inc(cache="slots", result="hit")
+        return cached
+    CACHE_LOOKUPS.inc(cache="slots", result="miss")
 
     result = {}
     for min_h in (DAY_MIN_HOURS, SPECIAL_MIN_HOURS):
-        result[min_h] = [
-            (
-                BELGIAN_TZ.localize(datetime.combine(date_obj, time.fromisoformat(arr))),
-                BELGIAN_TZ.localize(datetime.combine(date_obj, time.fromisoformat(dep))),
-                arr,
-                dep,
-                dur
-            )
-            for arr, dep, dur in _get_valid_slots(min_h)
-        ]
-    GLOBAL_SLOTS[date_obj] = result
+        slot_starts = array('q')
+        slot_ends = array('q')
+        for arr, dep, dur in _get_valid_slots(min_h):
+            arr_time = time.fromisoformat(arr)
+            dep_time = time.fromisoformat(dep)
+            slot_starts.append(local_to_epoch(date_obj, arr_time.hour, arr_time.minute))
+            slot_ends.append(local_to_epoch(date_obj, dep_time.hour, dep_time.minute))
+        result[min_h] = (slot_starts, slot_ends)
+
+    with _GLOBAL_SLOTS_LOCK:
+        # Evict the oldest dates once the bound is reached (dicts keep insertion order)
+        while len(GLOBAL_SLOTS) >= GLOBAL_SLOTS_MAX_DAYS:
+            del GLOBAL_SLOTS[next(iter(GLOBAL_SLOTS))]
+        GLOBAL_SLOTS[date_obj] = result
     return result
 
 
@@ -105,6 +319,7 @@ def get_resource_ids_for_suites(suite_ids):
     return resource_ids
 
 
+@traced("get_resource_blocks")
 def get_resource_blocks(make_mews_request_func, start_utc, end_utc):
     """
     Fetch resource blocks for a given time range.
@@ -128,10 +343,59 @@ def get_resource_blocks(make_mews_request_func, start_utc, end_utc):
     
     # Filter to only active blocks
     active_blocks = [block for block in result["ResourceBlocks"] if block.get("IsActive")]
-    logger.info(f"Found {len(active_blocks)} active resource blocks in range {start_utc} to {end_utc}")
+    logger.info("Found %d active resource blocks in range %s to %s", len(active_blocks), start_utc, end_utc)
     return active_blocks
 
 
+def parse_resource_blocks(resource_blocks):
+    """
+    Parse resource blocks once into (resource_id, start_epoch, end_epoch, is_building_block) tuples.
+
+    Args:
+        resource_blocks: list of resource block objects (as returned by get_resource_blocks)
+
+    Returns:
+        list: parsed blocks for check_resource_block_conflict_ts
+    """
+    parsed_blocks = []
+    for block in resource_blocks:
+        block_resource_id = block.get("AssignedResourceId")
+        parsed_blocks.append((
+            block_resource_id,
+            parse_iso_epoch(block.get("StartUtc", "")),
+            parse_iso_epoch(block.get("EndUtc", "")),
+            # Building-level blocks affect ALL suites
+            bool(BUILDING_RESOURCE_ID and block_resource_id == BUILDING_RESOURCE_ID)
+        ))
+    return parsed_blocks
+
+
+def check_resource_block_conflict_ts(slot_start_ts, slot_end_ts, resource_ids, parsed_blocks):
+    """
+    Epoch-based variant of check_resource_block_conflict for hot loops.
+
+    Args:
+        slot_start_ts: slot start as epoch seconds
+        slot_end_ts: slot end as epoch seconds
+        resource_ids: list of resource IDs to check against
+        parsed_blocks: blocks from parse_resource_blocks
+
+    Returns:
+        bool: True if there's a conflict, False otherwise
+    """
+    for block_resource_id, block_start_ts, block_end_ts, is_building_block in parsed_blocks:
+        # Skip blocks not assigned to our resources (unless it's a building block)
+        if not is_building_block and (not resource_ids or block_resource_id not in resource_ids):
+            continue
+
+        # Check for overlap (slot vs block - no buffer applied to blocks)
+        # Overlap exists if: NOT (slot_end <= block_start OR slot_start >= block_end)
+        if not (slot_end_ts <= block_start_ts or slot_start_ts >= block_end_ts):
+            return True
+
+    return False
+
+
 def check_resource_block_conflict(slot_start, slot_end, resource_ids, resource_blocks, timezone_str=TIMEZONE):
     """
     Check if a time slot conflicts with any resource block for the given resources.
@@ -142,43 +406,80 @@ def check_resource_block_conflict(slot_start, slot_end, resource_ids, resource_b
         slot_end: datetime object (timezone-aware) for slot end
         resource_ids: list of resource IDs to check against
         resource_blocks: list of resource block objects
-        timezone_str: timezone string for conversions
+        timezone_str: kept for backward compatibility (comparison is done on absolute instants)
     
     Returns:
         bool: True if there's a conflict, False otherwise
     """
     if not resource_blocks:
         return False
-    
-    belgian_tz = pytz.timezone(timezone_str)
-    
-    for block in resource_blocks:
-        block_resource_id = block.get("AssignedResourceId")
-        
-        # Check if this is a building-level block (affects ALL suites)
-        is_building_block = BUILDING_RESOURCE_ID and block_resource_id == BUILDING_RESOURCE_ID
-        
-        # Skip blocks not assigned to our resources (unless it's a building block)
-        if not is_building_block and (not resource_ids or block_resource_id not in resource_ids):
-            continue
-        
-        # Parse block times
-        block_start_utc = datetime.fromisoformat(block.get("StartUtc", "").replace("Z", "+00:00"))
-        block_end_utc = datetime.fromisoformat(block.get("EndUtc", "").replace("Z", "+00:00"))
-        
-        # Convert to local timezone for comparison
-        block_start = block_start_utc.astimezone(belgian_tz)
-        block_end = block_end_utc.astimezone(belgian_tz)
-        
-        # Check for overlap (slot vs block - no buffer applied to blocks)
-        # Overlap exists if: NOT (slot_end <= block_start OR slot_start >= block_end)
-        if not (slot_end <= block_start or slot_start >= block_end):
-            return True
-    
-    return False
 
-def check_bulk_availability_journee(make_mews_request_func, data):
-    """Check availability for day bookings (journée) - considers reservations from both day and night services - shows date as unavailable if no valid time slots remain"""
+    return check_resource_block_conflict_ts(
+        int(slot_start.timestamp()),
+        int(slot_end.timestamp()),
+        resource_ids,
+        parse_resource_blocks(resource_blocks)
+    )
+
+def compute_stay_availability(sorted_dates, suite_ids, night_available, daytime_available, max_nights=NIGHT_MAX_NIGHTS):
+    """
+    For every start date and every stay length 1..max_nights, list the suites free for the whole stay.
+
+    A stay of n nights starting on date i needs the nights of dates i..i+n-1 free, plus the daytime
+    (check-out to check-in) of dates i+1..i+n-1 since the guest keeps the suite in between.
+    Per-suite prefix sums over blocked nights/daytimes make every (start, length) check O(1).
+    Dates missing from the availability maps (e.g. failed chunk) count as blocked.
+
+    Args:
+        sorted_dates: sorted list of ISO date strings
+        suite_ids: list of suite IDs to consider
+        night_available: {date_str: set of suite IDs free for the night starting that date}
+        daytime_available: {date_str: set of suite IDs free between check-out and check-in that date}
+        max_nights: longest stay to report
+
+    Returns:
+        dict: {date_str: {"1": [suite_ids], "2": [suite_ids], ...}} - lengths that run past the
+        requested dates (or over a gap in them) are omitted
+    """
+    date_objs = [datetime.fromisoformat(date_str.replace('Z', '+00:00')).date() for date_str in sorted_dates]
+
+    # prefix[k] = number of blocked nights (or daytimes) among the first k dates
+    night_prefix = {}
+    daytime_prefix = {}
+    for suite_id in suite_ids:
+        nights_blocked = [0]
+        daytimes_blocked = [0]
+        for date_str in sorted_dates:
+            nights_blocked.append(nights_blocked[-1] + (suite_id not in night_available.get(date_str, ())))
+            daytimes_blocked.append(daytimes_blocked[-1] + (suite_id not in daytime_available.get(date_str, ())))
+        night_prefix[suite_id] = nights_blocked
+        daytime_prefix[suite_id] = daytimes_blocked
+
+    stays = {}
+    for start_index, date_str in enumerate(sorted_dates):
+        stays_by_length = {}
+        for nights in range(1, max_nights + 1):
+            last_index = start_index + nights - 1
+            # Stop when the stay runs past the requested dates or over a gap between them
+            if last_index >= len(sorted_dates) or (date_objs[last_index] - date_objs[start_index]).days != nights - 1:
+                break
+            stays_by_length[str(nights)] = [
+                suite_id for suite_id in suite_ids
+                if night_prefix[suite_id][last_index + 1] == night_prefix[suite_id][start_index]
+                and daytime_prefix[suite_id][last_index + 1] == daytime_prefix[suite_id][start_index + 1]
+            ]
+        stays[date_str] = stays_by_length
+    return stays
+
+
+@traced("bulk_availability.journee")
+def check_bulk_availability_journee(make_mews_request_func, data, bitmask=False):
+    """
+    Check availability for day bookings (journée) - considers reservations from both day and night services - shows date as unavailable if no valid time slots remain
+
+    With bitmask=True each suite's slots are one integer instead of a list of slot dicts: bit i is
+    set when slot i of the response's "slot_table" (get_slot_table()) is available.
+    """
     service_id = data.get('service_id')
     dates = data.get('dates')  # List of ISO date strings
     selected_suite_id = data.get('suite_id')  # Optional: used to determine minimum duration and for early-exit optimization
@@ -187,15 +488,11 @@ def check_bulk_availability_journee(make_mews_request_func, data):
         logger.error("Missing required parameters")
         return {"error": "Missing required parameters", "status": "error"}, 400
 
-    # Get all suite categories for both day and night services
-    payload = {
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "ServiceIds": [DAY_SERVICE_ID, NIGHT_SERVICE_ID],
-        "IncludeDefault": False,
-        "Limitation": {"Count": 100}
-    }
+    setup_clock = _StageClock()
 
-    suites_result = make_mews_request_func("resourceCategories/getAll", payload)
+    # Get all suite categories for both day and night services
+    suites_result = fetch_resource_categories(make_mews_request_func, [DAY_SERVICE_ID, NIGHT_SERVICE_ID])
+    setup_clock.lap("fetch_catalog")
     if not suites_result or "ResourceCategories" not in suites_result:
         logger.error("Failed to fetch suites")
         return {"error": "Failed to fetch suites", "status": "error"}, 500
@@ -245,7 +542,10 @@ def check_bulk_availability_journee(make_mews_request_func, data):
         for suite_id in suite_ids
     }
 
-    logger.info(f"Found {len(suite_ids)} active suites (selected_suite_id: {selected_suite_id})")
+    logger.info("Found %d active suites (selected_suite_id: %s)", len(suite_ids), selected_suite_id)
+
+    # Interned building category (reservations with it block ALL suites)
+    building_category = category_index(BUILDING_CATEGORY_ID) if BUILDING_CATEGORY_ID else None
 
     # Sort dates
     sorted_dates = sorted(set(dates))
@@ -259,9 +559,11 @@ def check_bulk_availability_journee(make_mews_request_func, data):
         # Add generous buffer to catch multi-day blocks that start before or end after our range
         blocks_start = (range_start - timedelta(days=2)).isoformat()
         blocks_end = (range_end + timedelta(days=2)).isoformat()
-        resource_blocks = get_resource_blocks(make_mews_request_func, blocks_start, blocks_end)
+        resource_blocks = parse_resource_blocks(get_resource_blocks(make_mews_request_func, blocks_start, blocks_end))
     else:
         resource_blocks = []
+    setup_clock.lap("fetch_blocks")
+    setup_clock.report("journee")
 
     # Process dates in chunks
     CHUNK_SIZE_DAYS = 4
@@ -270,13 +572,16 @@ def check_bulk_availability_journee(make_mews_request_func, data):
 
     def process_chunk(chunk_index, chunk_dates):
         """Process a single chunk of dates for day bookings"""
+        clock = _StageClock()
+        timing = clock.enabled
         chunk_start = datetime.fromisoformat(chunk_dates[0].replace('Z', '+00:00'))
         chunk_end = datetime.fromisoformat(chunk_dates[-1].replace('Z', '+00:00'))
         chunk_end = chunk_end + timedelta(days=1)
 
         chunk_hours = (chunk_end - chunk_start).total_seconds() / 3600
         if chunk_hours > MAX_HOURS_PER_CHUNK:
-            chunk_end = chunk_start + timedelta(hours=MAX_HOURS_PER_CHUNK)
+            # split_into_chunks() never builds such a chunk; cutting it would report the later dates free
+            raise ValueError(f"Chunk of {chunk_hours} hours exceeds the {MAX_HOURS_PER_CHUNK} hour limit")
 
         # For day bookings: add buffer after
         buffered_start = chunk_start.isoformat()
@@ -290,42 +595,34 @@ def check_bulk_availability_journee(make_mews_request_func, data):
         }
 
         result = make_mews_request_func("reservations/getAll", payload)
+        clock.lap("fetch_reservations")
         if result is None:
-            logger.error(f"Failed to get reservations for chunk starting {chunk_start.date()}")
+            logger.error("Failed to get reservations for chunk starting %s", chunk_start.date())
             return {}
 
         chunk_availability = {}
 
         # Get reservations (empty list if no reservations found)
         reservations = result.get("Reservations", [])
-        logger.info(f"Found {len(reservations)} reservations in chunk {chunk_index + 1}")
-        # Group reservations by suite once per chunk to avoid scanning all reservations per slot
+        logger.debug("Found %d reservations in chunk %d", len(reservations), chunk_index + 1)
+        records = parse_reservations(reservations)
+        clock.lap("parse")
+
+        # Group reservation records by suite once per chunk to avoid scanning all reservations per slot
         # Also extract building reservations separately (they block ALL suites)
         reservations_by_suite = {}
         building_reservations = []
-        for reservation in reservations:
-            suite_id = reservation.get('RequestedCategoryId')
-            if not suite_id:
-                continue
-            start_raw = reservation.get('StartUtc', '')
-            end_raw = reservation.get('EndUtc', '')
-            if not start_raw or not end_raw:
+        for record in records:
+            if record.category == NO_CATEGORY:
                 continue
-            res_start_utc = datetime.fromisoformat(start_raw.replace('Z', '+00:00'))
-            res_end_utc = datetime.fromisoformat(end_raw.replace('Z', '+00:00'))
-            res_data = {
-                "start": res_start_utc.astimezone(BELGIAN_TZ),
-                "end": res_end_utc.astimezone(BELGIAN_TZ),
-            }
-            
             # Check if this is a building reservation (blocks all suites)
-            if BUILDING_CATEGORY_ID and suite_id == BUILDING_CATEGORY_ID:
-                building_reservations.append(res_data)
+            if record.category == building_category:
+                building_reservations.append(record)
             else:
-                reservations_by_suite.setdefault(suite_id, []).append(res_data)
+                reservations_by_suite.setdefault(record.category, []).append(record)
         
         if building_reservations:
-            logger.info(f"Found {len(building_reservations)} building reservations in chunk {chunk_index + 1}")
+            logger.debug("Found %d building reservations in chunk %d", len(building_reservations), chunk_index + 1)
 
         # Check each date (process all dates, even if no reservations)
         for date_str in chunk_dates:
@@ -336,36 +633,20 @@ def check_bulk_availability_journee(make_mews_request_func, data):
 
             # Pre-filter reservations by date: only keep reservations that could affect this date
             # A reservation affects this date if its buffered time overlaps with the day's time range
-            day_start = BELGIAN_TZ.localize(datetime.combine(date_obj, datetime.min.time()))
-            day_end = BELGIAN_TZ.localize(datetime.combine(date_obj, datetime.max.time()))
-            
+            day_start_ts = local_to_epoch(date_obj, 0)
+            day_end_ts = local_to_epoch(date_obj, 24)
+
             reservations_by_suite_for_date = {}
-            for suite_id, suite_reservations in reservations_by_suite.items():
-                filtered_reservations = []
-                for res in suite_reservations:
-                    # Pre-compute buffered times
-                    res_start_buffered = res["start"] - timedelta(hours=CLEANING_BUFFER_HOURS)
-                    res_end_buffered = res["end"] + timedelta(hours=CLEANING_BUFFER_HOURS)
-                    # Check if buffered reservation overlaps with this date
-                    if res_end_buffered > day_start and res_start_buffered < day_end:
-                        # Store as timestamps (INTs) for ~3-5x faster comparisons
-                        filtered_reservations.append({
-                            "start_ts": int(res_start_buffered.timestamp()),
-                            "end_ts": int(res_end_buffered.timestamp()),
-                        })
+            for category, suite_reservations in reservations_by_suite.items():
+                filtered_reservations = [record for record in suite_reservations if record.conflicts_with(day_start_ts, day_end_ts)]
                 if filtered_reservations:
-                    reservations_by_suite_for_date[suite_id] = filtered_reservations
-            
+                    reservations_by_suite_for_date[category] = filtered_reservations
+
             # Pre-filter building reservations for this date (they block ALL suites)
-            building_reservations_for_date = []
-            for res in building_reservations:
-                res_start_buffered = res["start"] - timedelta(hours=CLEANING_BUFFER_HOURS)
-                res_end_buffered = res["end"] + timedelta(hours=CLEANING_BUFFER_HOURS)
-                if res_end_buffered > day_start and res_start_buffered < day_end:
-                    building_reservations_for_date.append({
-                        "start_ts": int(res_start_buffered.timestamp()),
-                        "end_ts": int(res_end_buffered.timestamp()),
-                    })
+            building_reservations_for_date = [
+                record for record in building_reservations if record.conflicts_with(day_start_ts, day_end_ts)
+            ]
+            clock.lap("bucket")
 
             # For each suite, check which time slots are available
             suite_availability = {}
@@ -404,21 +685,30 @@ def check_bulk_availability_journee(make_mews_request_func, data):
                 # Collect relevant reservations for the suite(s) involved (pre-filtered by date)
                 suite_reservations_for_date = []
                 for sid in suite_ids_to_check:
-                    suite_reservations_for_date.extend(reservations_by_suite_for_date.get(sid, []))
+                    suite_reservations_for_date.extend(reservations_by_suite_for_date.get(category_index(sid), []))
+
+                # Get resource IDs for all suite categories we need to check (cached)
+                resource_ids_to_check = []
+                for sid in suite_ids_to_check:
+                    resource_ids_to_check.extend(resource_ids_cache.get(sid, []))
 
                 # Generate all possible time slot combinations
                 available_slots = []
+                slot_mask = 0
+                slot_bits = _get_slot_bits(min_hours)
+                slot_starts, slot_ends = precomputed_slots[min_hours]
 
-                for slot_start, slot_end, arrival_time, departure_time, duration in precomputed_slots[min_hours]:
-                    # Convert slot times to timestamps once per slot (not per reservation)
-                    slot_start_ts = int(slot_start.timestamp())
-                    slot_end_ts = int(slot_end.timestamp())
+                for slot_index, (arrival_time, departure_time, duration) in enumerate(_get_valid_slots(min_hours)):
+                    # Slot bounds are precomputed epoch seconds
+                    # Widen the slot by the cleaning buffer instead of buffering every reservation
+                    slot_start_ts = slot_starts[slot_index] - CLEANING_BUFFER_SECONDS
+                    slot_end_ts = slot_ends[slot_index] + CLEANING_BUFFER_SECONDS
 
                     is_available = True
                     
                     # First check for building reservation conflicts (blocks ALL suites)
                     for building_res in building_reservations_for_date:
-                        if not (slot_end_ts <= building_res["start_ts"] or slot_start_ts >= building_res["end_ts"]):
+                        if not (slot_end_ts <= building_res.start or slot_start_ts >= building_res.end):
                             is_available = False
                             break
                     
@@ -426,31 +716,33 @@ def check_bulk_availability_journee(make_mews_request_func, data):
                     if is_available:
                         for reservation in suite_reservations_for_date:
                             # Check for overlap using integer timestamps (~3-5x faster than datetime comparison)
-                            if not (slot_end_ts <= reservation["start_ts"] or slot_start_ts >= reservation["end_ts"]):
+                            if not (slot_end_ts <= reservation.start or slot_start_ts >= reservation.end):
                                 is_available = False
                                 break
 
                     # Also check for resource block conflicts (if still available after reservation check)
                     if is_available:
-                        # Get resource IDs for all suite categories we need to check (cached)
-                        resource_ids_to_check = []
-                        for sid in suite_ids_to_check:
-                            resource_ids_to_check.extend(resource_ids_cache.get(sid, []))
-                        
-                        if check_resource_block_conflict(slot_start, slot_end, resource_ids_to_check, resource_blocks):
+                        if timing:
+                            clock.lap("slot_checks")
+                        if check_resource_block_conflict_ts(slot_starts[slot_index], slot_ends[slot_index], resource_ids_to_check, resource_blocks):
                             is_available = False
+                        if timing:
+                            clock.lap("block_checks")
 
                     if is_available:
-                        available_slots.append({
-                            'arrival': arrival_time,
-                            'departure': departure_time,
-                            'duration': duration
-                        })
+                        if bitmask:
+                            slot_mask |= slot_bits[slot_index]
+                        else:
+                            available_slots.append({
+                                'arrival': arrival_time,
+                                'departure': departure_time,
+                                'duration': duration
+                            })
 
-                suite_availability[suite_id] = available_slots
+                suite_availability[suite_id] = slot_mask if bitmask else available_slots
                 
-                # Track if we found any available slot
-                if len(available_slots) > 0:
+                # Track if we found any available slot (empty list or 0 mask means none)
+                if suite_availability[suite_id]:
                     has_available_slot = True
                     
                     # Check if selected suite (and its night mapping) is now confirmed available
@@ -465,7 +757,7 @@ def check_bulk_availability_journee(make_mews_request_func, data):
                             selected_suite_available = True
                     elif selected_suite_id and suite_id == selected_night_suite_id:
                         # Just checked night suite - verify if selected suite was also available
-                        if selected_suite_id in suite_availability and len(suite_availability[selected_suite_id]) > 0:
+                        if selected_suite_id in suite_availability and suite_availability[selected_suite_id]:
                             selected_suite_available = True
 
             # Apply AND logic for mapped suites: if either suite in a pair has 0 availability, both must have 0
@@ -475,33 +767,28 @@ def check_bulk_availability_journee(make_mews_request_func, data):
                 
                 if mapped_suite_id and mapped_suite_id in suite_availability:
                     # If either suite has 0 availability, set both to 0
-                    if len(suite_availability[suite_id]) == 0 or len(suite_availability[mapped_suite_id]) == 0:
-                        suite_availability[suite_id] = []
-                        suite_availability[mapped_suite_id] = []
+                    if not suite_availability[suite_id] or not suite_availability[mapped_suite_id]:
+                        suite_availability[suite_id] = 0 if bitmask else []
+                        suite_availability[mapped_suite_id] = 0 if bitmask else []
 
             # Recompute has_available_slot after AND logic application
-            has_available_slot = any(len(slots) > 0 for slots in suite_availability.values())
+            has_available_slot = any(suite_availability.values())
 
             chunk_availability[date_str] = {
                 "available": has_available_slot,
                 "suite_availability": suite_availability
             }
+            clock.lap("slot_checks")
 
+        clock.report("journee")
         return chunk_availability
 
-    # Create chunks
-    chunks = []
-    for i in range(0, len(sorted_dates), CHUNK_SIZE_DAYS):
-        chunk_dates = sorted_dates[i:i + CHUNK_SIZE_DAYS]
-        if chunk_dates:
-            chunks.append((i // CHUNK_SIZE_DAYS, chunk_dates))
+    # Create chunks (consecutive days only)
+    chunks = split_into_chunks(sorted_dates, CHUNK_SIZE_DAYS)
 
     # Process chunks in parallel
-    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
-        future_to_chunk = {
-            executor.submit(process_chunk, chunk_index, chunk_dates): (chunk_index, chunk_dates)
-            for chunk_index, chunk_dates in chunks
-        }
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="bulk-journee") as executor:
+        future_to_chunk = _submit_chunks(executor, "journee", process_chunk, chunks)
 
         for future in as_completed(future_to_chunk):
             chunk_index, chunk_dates = future_to_chunk[future]
@@ -509,22 +796,33 @@ def check_bulk_availability_journee(make_mews_request_func, data):
                 chunk_availability = future.result()
                 availability_results.update(chunk_availability)
             except Exception as exc:
-                logger.error(f"Chunk {chunk_index + 1} generated an exception: {exc}")
+                logger.error("Chunk %d generated an exception: %s", chunk_index + 1, exc)
 
-    logger.info(f"Bulk availability check (journée) completed - processed {len(availability_results)} dates")
+    logger.info("Bulk availability check (journée) completed - processed %d dates", len(availability_results))
 
-    return {
+    response = {
         "availability": availability_results,
         "status": "success"
     }
 
+    if bitmask:
+        response["format"] = "bitmask"
+        response["slot_table"] = [
+            {"arrival": arrival, "departure": departure, "duration": duration}
+            for arrival, departure, duration in get_slot_table()
+        ]
+
+    return response
+
 
+@traced("bulk_availability.nuitee")
 def check_bulk_availability_nuitee(make_mews_request_func, data):
     """Check availability for multiple dates displayed in calendar, chunked into 4-day periods"""
     service_id = data.get('service_id')
     dates = data.get('dates')  # List of ISO date strings
     booking_type = data.get('booking_type', 'day')  # 'day' or 'night'
     suite_id = data.get('suite_id')  # Optional: filter by specific suite
+    include_stays = bool(data.get('include_stays'))  # Optional: also return multi-night stays per start date
 
     if not all([service_id, dates]) or len(dates) == 0:
         logger.error("Missing required parameters")
@@ -532,18 +830,14 @@ def check_bulk_availability_nuitee(make_mews_request_func, data):
 
     # Only apply bulk availability logic for NUITEE service
     if service_id != NIGHT_SERVICE_ID:
-        logger.info(f"Bulk availability not supported for service {service_id}, only for NUITEE ({NIGHT_SERVICE_ID})")
+        logger.info("Bulk availability not supported for service %s, only for NUITEE (%s)", service_id, NIGHT_SERVICE_ID)
         return {"error": "Bulk availability only supported for night bookings", "status": "error"}, 400
 
-    # Get all suite categories for this service
-    payload = {
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "ServiceIds": [service_id],
-        "IncludeDefault": False,
-        "Limitation": {"Count": 100}
-    }
+    setup_clock = _StageClock()
 
-    suites_result = make_mews_request_func("resourceCategories/getAll", payload)
+    # Get all suite categories for this service
+    suites_result = fetch_resource_categories(make_mews_request_func, [service_id])
+    setup_clock.lap("fetch_catalog")
     if not suites_result or "ResourceCategories" not in suites_result:
         logger.error("Failed to fetch suites")
         return {"error": "Failed to fetch suites", "status": "error"}, 500
@@ -556,16 +850,22 @@ def check_bulk_availability_nuitee(make_mews_request_func, data):
     if suite_id:
         all_suites = [suite for suite in all_suites if suite["Id"] == suite_id]
         if not all_suites:
-            logger.warning(f"Selected suite {suite_id} not found in available suites")
+            logger.warning("Selected suite %s not found in available suites", suite_id)
             return {"error": f"Selected suite {suite_id} not available", "status": "error"}, 400
 
     suite_ids = [suite["Id"] for suite in all_suites]
+    # Reservation records carry interned category indexes
+    suite_id_by_category = {category_index(sid): sid for sid in suite_ids}
+    building_category = category_index(BUILDING_CATEGORY_ID) if BUILDING_CATEGORY_ID else None
+    # Cache resource IDs per suite to avoid recomputing in the hot loop
+    resource_ids_cache = {sid: get_resource_ids_for_suites([sid]) for sid in suite_ids}
 
-    logger.info(f"Found {len(suite_ids)} active suites")
+    logger.info("Found %d active suites", len(suite_ids))
 
     # Sort dates to ensure proper chunking
     sorted_dates = sorted(set(dates))  # Remove duplicates and sort
     availability_results = {}
+    suite_windows = {}  # {date_str: (night_available_suite_ids, daytime_available_suite_ids)}, only with include_stays
 
     # Fetch resource blocks for the entire date range
     # Use a wide buffer (2 days before/after) to catch multi-day blocks that might extend into our range
@@ -575,9 +875,11 @@ def check_bulk_availability_nuitee(make_mews_request_func, data):
         # Add generous buffer to catch multi-day blocks that start before or end after our range
         blocks_start = (range_start - timedelta(days=2)).isoformat()
         blocks_end = (range_end + timedelta(days=2)).isoformat()
-        resource_blocks = get_resource_blocks(make_mews_request_func, blocks_start, blocks_end)
+        resource_blocks = parse_resource_blocks(get_resource_blocks(make_mews_request_func, blocks_start, blocks_end))
     else:
         resource_blocks = []
+    setup_clock.lap("fetch_blocks")
+    setup_clock.report("nuitee")
 
     # Process dates in chunks with parallel execution to speed up fetching
     CHUNK_SIZE_DAYS = 4  # Mews API limitation: max 4 days per chunk
@@ -585,7 +887,10 @@ def check_bulk_availability_nuitee(make_mews_request_func, data):
     MAX_CONCURRENT_REQUESTS = 2
     
     def process_chunk(chunk_index, chunk_dates):
-        """Process a single chunk of dates - returns availability data for all dates in chunk"""
+        """Process a single chunk of dates - returns availability data for all dates in chunk,
+        plus the per-suite night/daytime availability used for multi-night stays"""
+        clock = _StageClock()
+        timing = clock.enabled
         chunk_start = datetime.fromisoformat(chunk_dates[0].replace('Z', '+00:00'))
         chunk_end = datetime.fromisoformat(chunk_dates[-1].replace('Z', '+00:00'))
 
@@ -595,8 +900,8 @@ def check_bulk_availability_nuitee(make_mews_request_func, data):
         # Calculate total hours for this chunk
         chunk_hours = (chunk_end - chunk_start).total_seconds() / 3600
         if chunk_hours > MAX_HOURS_PER_CHUNK:
-            logger.warning(f"Chunk hours ({chunk_hours}) exceeds limit ({MAX_HOURS_PER_CHUNK}), truncating")
-            chunk_end = chunk_start + timedelta(hours=MAX_HOURS_PER_CHUNK)
+            # split_into_chunks() never builds such a chunk; cutting it would report the later dates free
+            raise ValueError(f"Chunk of {chunk_hours} hours exceeds the {MAX_HOURS_PER_CHUNK} hour limit")
 
         # Add cleaning buffers based on booking type
         if booking_type == 'night':
@@ -615,137 +920,112 @@ def check_bulk_availability_nuitee(make_mews_request_func, data):
         }
 
         result = make_mews_request_func("reservations/getAll", payload)
+        clock.lap("fetch_reservations")
         if result is None:
-            logger.error(f"Failed to get reservations for chunk starting {chunk_start.date()}")
-            return {}
+            logger.error("Failed to get reservations for chunk starting %s", chunk_start.date())
+            return {}, {}
 
         chunk_availability = {}
+        chunk_suite_windows = {}
 
         if "Reservations" in result:
             reservations = result["Reservations"]
 
-            # Group reservations by date with timezone-aware comparisons
-            belgian_tz = pytz.timezone(TIMEZONE)
-            
-            # Pre-compute timezone conversions for all reservations (outside the date loop)
-            reservation_times = {}
-            for reservation in reservations:
-                res_id = id(reservation)
-                res_start_utc = datetime.fromisoformat(reservation.get('StartUtc', '').replace('Z', '+00:00'))
-                res_end_utc = datetime.fromisoformat(reservation.get('EndUtc', '').replace('Z', '+00:00'))
-                # Convert to Brussels timezone for comparison with date boundaries
-                reservation_times[res_id] = {
-                    'start': res_start_utc.astimezone(belgian_tz),
-                    'end': res_end_utc.astimezone(belgian_tz)
-                }
-            
-            reservations_by_date = {}
-            for date_str in chunk_dates:
-                date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
-                reservations_by_date[date_str] = []
-
-                # Create date boundaries in Belgian timezone for accurate comparison
-                date_start = belgian_tz.localize(datetime.combine(date_obj, datetime.min.time()))
-                date_end = belgian_tz.localize(datetime.combine(date_obj + timedelta(days=1), datetime.min.time()))
-
-                # Filter reservations that overlap with this specific date
-                for reservation in reservations:
-                    res_times = reservation_times[id(reservation)]
-                    res_start = res_times['start']
-                    res_end = res_times['end']
-
-                    # Check if reservation overlaps with this date (timezone-aware)
-                    # A reservation overlaps if it starts before the date ends AND ends after the date starts
-                    if res_start <= date_end and res_end >= date_start:
-                        reservations_by_date[date_str].append(reservation)
-
-            def reservation_to_local_range(reservation):
-                """Convert reservation start/end to Brussels timezone."""
-                start_raw = reservation.get('StartUtc')
-                end_raw = reservation.get('EndUtc')
-                if not start_raw or not end_raw:
-                    return None, None
-
-                res_start = datetime.fromisoformat(start_raw.replace('Z', '+00:00'))
-                res_end = datetime.fromisoformat(end_raw.replace('Z', '+00:00'))
-
-                return res_start.astimezone(belgian_tz), res_end.astimezone(belgian_tz)
+            # Parse every reservation once (outside the date loop) into compact records
+            records = parse_reservations(reservations)
+            records.sort(key=lambda record: record.start)
+            clock.lap("parse")
+
+            # Date boundaries in Belgian timezone as epoch seconds, ascending since chunk_dates is sorted
+            date_objs = [datetime.fromisoformat(date_str.replace('Z', '+00:00')).date() for date_str in chunk_dates]
+            date_starts = [local_to_epoch(date_obj, 0) for date_obj in date_objs]
+            date_ends = [local_to_epoch(date_obj, 24) for date_obj in date_objs]
+
+            # Single sweep over reservations sorted by start: the first date a reservation can touch
+            # only moves forward, and from there it covers consecutive dates until it ends.
+            # A reservation overlaps a date if it starts before the date ends AND ends after the date starts
+            reservations_by_date = {date_str: [] for date_str in chunk_dates}
+            first_date_index = 0
+            for record in records:
+                while first_date_index < len(chunk_dates) and date_ends[first_date_index] < record.start:
+                    first_date_index += 1
+                date_index = first_date_index
+                while date_index < len(chunk_dates) and date_starts[date_index] <= record.end:
+                    reservations_by_date[chunk_dates[date_index]].append(record)
+                    date_index += 1
 
             def is_slot_available_for_suite(slot_start, slot_end, suite_reservations, suite_id_for_blocks=None, building_reservations=None):
-                """Check if a suite has no reservation conflicts, no building conflicts, and no resource block conflicts for the provided slot."""
-                # Convert slot times to timestamps once (not per reservation)
-                slot_start_ts = int(slot_start.timestamp())
-                slot_end_ts = int(slot_end.timestamp())
+                """Check if a suite has no reservation conflicts, no building conflicts, and no resource block conflicts
+                for the provided slot (epoch seconds)."""
+                # Widen the slot by the cleaning buffer instead of buffering every reservation
+                slot_start_ts = slot_start - CLEANING_BUFFER_SECONDS
+                slot_end_ts = slot_end + CLEANING_BUFFER_SECONDS
                 
                 # First check building reservation conflicts (block ALL suites)
                 if building_reservations:
                     for building_res in building_reservations:
-                        if not (slot_end_ts <= building_res["start_ts"] or slot_start_ts >= building_res["end_ts"]):
+                        if not (slot_end_ts <= building_res.start or slot_start_ts >= building_res.end):
                             return False
                 
                 # Then check suite-specific reservation conflicts using integer timestamps (~3-5x faster)
                 for reservation in suite_reservations:
-                    # Use pre-computed buffered timestamps
-                    if not (slot_end_ts <= reservation["start_ts"] or slot_start_ts >= reservation["end_ts"]):
+                    if not (slot_end_ts <= reservation.start or slot_start_ts >= reservation.end):
                         return False
                 
                 # Then check resource block conflicts
                 if suite_id_for_blocks:
-                    resource_ids_to_check = get_resource_ids_for_suites([suite_id_for_blocks])
-                    if check_resource_block_conflict(slot_start, slot_end, resource_ids_to_check, resource_blocks):
+                    if timing:
+                        clock.lap("slot_checks")
+                    blocked = check_resource_block_conflict_ts(slot_start, slot_end, resource_ids_cache[suite_id_for_blocks], resource_blocks)
+                    if timing:
+                        clock.lap("block_checks")
+                    if blocked:
                         return False
                 
                 return True
 
             # Check availability for each date in this chunk with morning/night granularity
-            for date_str in chunk_dates:
+            for date_str, date_obj in zip(chunk_dates, date_objs):
                 date_reservations = reservations_by_date[date_str]
 
                 # Map reservations per suite with localized times for accurate comparisons
                 # Also extract building reservations separately (they block ALL suites)
                 suite_reservations_map = {suite_id: [] for suite_id in suite_ids}
                 building_reservations_for_date = []
-                for reservation in date_reservations:
-                    res_suite_id = reservation.get('RequestedCategoryId')
-                    res_start_local, res_end_local = reservation_to_local_range(reservation)
-                    if not res_start_local or not res_end_local:
-                        continue
-                    # Pre-compute buffered timestamps for ~3-5x faster comparisons
-                    res_start_buffered = res_start_local - timedelta(hours=CLEANING_BUFFER_HOURS)
-                    res_end_buffered = res_end_local + timedelta(hours=CLEANING_BUFFER_HOURS)
-                    res_data = {
-                        "start": res_start_local,
-                        "end": res_end_local,
-                        "start_ts": int(res_start_buffered.timestamp()),
-                        "end_ts": int(res_end_buffered.timestamp())
-                    }
-                    
+                for record in date_reservations:
                     # Check if this is a building reservation (blocks all suites)
-                    if BUILDING_CATEGORY_ID and res_suite_id == BUILDING_CATEGORY_ID:
-                        building_reservations_for_date.append(res_data)
-                    elif res_suite_id in suite_reservations_map:
-                        suite_reservations_map[res_suite_id].append(res_data)
+                    if record.category == building_category:
+                        building_reservations_for_date.append(record)
+                    elif record.category in suite_id_by_category:
+                        suite_reservations_map[suite_id_by_category[record.category]].append(record)
 
                 booked_suites = {suite_id for suite_id, res in suite_reservations_map.items() if res}
                 
                 if building_reservations_for_date:
-                    logger.debug(f"Found {len(building_reservations_for_date)} building reservations for {date_str}")
+                    logger.debug("Found %d building reservations for %s", len(building_reservations_for_date), date_str)
+                clock.lap("bucket")
 
-                date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
-                morning_start = belgian_tz.localize(datetime.combine(date_obj, datetime.min.time()))
-                morning_end = morning_start + timedelta(hours=NIGHT_CHECK_OUT_HOUR)
-                night_start = morning_start + timedelta(hours=NIGHT_CHECK_IN_HOUR)
-                next_day_start = belgian_tz.localize(datetime.combine(date_obj + timedelta(days=1), datetime.min.time()))
-                night_end = next_day_start + timedelta(hours=NIGHT_CHECK_OUT_HOUR)
+                # Morning/night windows as epoch seconds of local wall-clock hours (DST-aware)
+                morning_start = local_to_epoch(date_obj, 0)
+                morning_end = local_to_epoch(date_obj, NIGHT_CHECK_OUT_HOUR)
+                night_start = local_to_epoch(date_obj, NIGHT_CHECK_IN_HOUR)
+                night_end = local_to_epoch(date_obj, 24 + NIGHT_CHECK_OUT_HOUR)
 
                 morning_available_suite_ids = set()
                 night_available_suite_ids = set()
+                daytime_available_suite_ids = set()
 
                 for suite_id, suite_reservations in suite_reservations_map.items():
                     if is_slot_available_for_suite(morning_start, morning_end, suite_reservations, suite_id, building_reservations_for_date):
                         morning_available_suite_ids.add(suite_id)
                     if is_slot_available_for_suite(night_start, night_end, suite_reservations, suite_id, building_reservations_for_date):
                         night_available_suite_ids.add(suite_id)
+                    # Daytime between check-out and check-in, only needed to chain nights into stays
+                    if include_stays and is_slot_available_for_suite(morning_end, night_start, suite_reservations, suite_id, building_reservations_for_date):
+                        daytime_available_suite_ids.add(suite_id)
+
+                if include_stays:
+                    chunk_suite_windows[date_str] = (night_available_suite_ids, daytime_available_suite_ids)
 
                 available_morning = len(morning_available_suite_ids) > 0
                 available_night = len(night_available_suite_ids) > 0
@@ -758,34 +1038,174 @@ def check_bulk_availability_nuitee(make_mews_request_func, data):
                     "available_suites": len(night_available_suite_ids),
                     "booked_suite_ids": list(booked_suites)
                 }
+                clock.lap("slot_checks")
 
-        return chunk_availability
+        clock.report("nuitee")
+        return chunk_availability, chunk_suite_windows
 
-    # Create chunks
-    chunks = []
-    for i in range(0, len(sorted_dates), CHUNK_SIZE_DAYS):
-        chunk_dates = sorted_dates[i:i + CHUNK_SIZE_DAYS]
-        if chunk_dates:
-            chunks.append((i // CHUNK_SIZE_DAYS, chunk_dates))
+    # Create chunks (consecutive days only)
+    chunks = split_into_chunks(sorted_dates, CHUNK_SIZE_DAYS)
 
     # Process chunks in parallel
-    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
-        future_to_chunk = {
-            executor.submit(process_chunk, chunk_index, chunk_dates): (chunk_index, chunk_dates)
-            for chunk_index, chunk_dates in chunks
-        }
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="bulk-nuitee") as executor:
+        future_to_chunk = _submit_chunks(executor, "nuitee", process_chunk, chunks)
 
         for future in as_completed(future_to_chunk):
             chunk_index, chunk_dates = future_to_chunk[future]
             try:
-                chunk_availability = future.result()
+                chunk_availability, chunk_suite_windows = future.result()
                 availability_results.update(chunk_availability)
+                suite_windows.update(chunk_suite_windows)
             except Exception as exc:
-                logger.error(f"Chunk {chunk_index + 1} generated an exception: {exc}")
+                logger.error("Chunk %d generated an exception: %s", chunk_index + 1, exc)
+
+    logger.info("Bulk availability check (nuitée) completed - processed %d dates", len(availability_results))
+
+    response = {
+        "availability": availability_results,
+        "status": "success"
+    }
+
+    if include_stays:
+        # One lookup table for range selection: {start_date: {nights: [suite_ids]}}
+        response["stays"] = compute_stay_availability(
+            sorted_dates,
+            suite_ids,
+            {date_str: windows[0] for date_str, windows in suite_windows.items()},
+            {date_str: windows[1] for date_str, windows in suite_windows.items()},
+            NIGHT_MAX_NIGHTS
+        )
+
+    return response
+
+
+@traced("bulk_availability.time_options")
+def check_bulk_time_options(make_mews_request_func, data):
+    """
+    Early check-in / late check-out availability for every date, for every nuitée suite with a
+    journée twin (SUITE_ID_MAPPING_REVERSE).
+
+    Bulk variant of /check-time-options-availability with the same rules: on its check-in date a
+    nuitée suite can be taken early if the journée twin is free during the hour before
+    EARLY_CHECK_IN_HOUR, and on its check-out date it can be left late if the twin is free from
+    12:00 to 13:00 (reservations with cleaning buffer, then resource blocks). Journée reservations
+    are fetched once per 4-day chunk (the reservations/getAll interval limit), resource blocks once.
+
+    Args:
+        data: {"dates": [ISO date strings], "suite_id": nuitée suite (optional)}
+
+    Returns:
+        dict: {"availability": {date_str: {nuitee_suite_id: {"early_checkin_available",
+            "late_checkout_available"}}}, "journee_suite_ids": {nuitee_suite_id: journee_suite_id}},
+            or (error_dict, status) - a 500 when any chunk could not be checked
+    """
+    dates = data.get('dates')
+    suite_id = data.get('suite_id')
+
+    if not dates:
+        logger.error("Missing required parameters")
+        return {"error": "Missing required parameters", "status": "error"}, 400
+
+    twins = dict(SUITE_ID_MAPPING_REVERSE)
+    if suite_id:
+        if suite_id not in twins:
+            # Same fallback as the single-stay route: without a journée twin the options are always available
+            logger.warning("No journée suite mapping found for nuitée suite %s", suite_id)
+        twins = {suite_id: twins[suite_id]} if suite_id in twins else {}
+
+    sorted_dates = sorted(set(dates))
+    journee_category_by_suite = {night_id: category_index(day_id) for night_id, day_id in twins.items()}
+    resource_ids_by_suite = {night_id: get_resource_ids_for_suites([day_id]) for night_id, day_id in twins.items()}
+
+    def windows(date_str):
+        """(early check-in window, late check-out window) of a date as epoch (start, end) pairs"""
+        day = datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
+        return ((local_to_epoch(day, max(EARLY_CHECK_IN_HOUR - 1, 0)), local_to_epoch(day, EARLY_CHECK_IN_HOUR)),
+                (local_to_epoch(day, 12), local_to_epoch(day, 13)))
+
+    date_windows = {date_str: windows(date_str) for date_str in sorted_dates}
+
+    def span_of(date_strs):
+        """Epoch range covering the windows of the dates, widened by the cleaning buffer"""
+        starts_ends = [bound for date_str in date_strs for window in date_windows[date_str] for bound in window]
+        return min(starts_ends) - CLEANING_BUFFER_SECONDS, max(starts_ends) + CLEANING_BUFFER_SECONDS
+
+    range_start, range_end = span_of(sorted_dates)
+
+    resource_blocks = []
+    if twins:
+        resource_blocks = parse_resource_blocks(get_resource_blocks(
+            make_mews_request_func, epoch_to_utc_iso(range_start), epoch_to_utc_iso(range_end)
+        ))
+
+    CHUNK_SIZE_DAYS = 4  # Mews API limitation: max 4 days per chunk
+    MAX_CONCURRENT_REQUESTS = 2
+
+    def process_chunk(chunk_index, chunk_dates):
+        """Time option availability of the dates of a chunk (empty when the Mews fetch failed)"""
+        chunk_start, chunk_end = span_of(chunk_dates)
+        payload = {
+            "Client": "Intense Experience Booking",
+            "StartUtc": epoch_to_utc_iso(chunk_start),
+            "EndUtc": epoch_to_utc_iso(chunk_end),
+            "ServiceIds": [DAY_SERVICE_ID]  # Only journée bookings block the options
+        }
+        result = make_mews_request_func("reservations/getAll", payload)
+        if result is None:
+            logger.error("Failed to get reservations for time options chunk starting %s", chunk_dates[0][:10])
+            return None
+
+        records_by_category = {}
+        for record in parse_reservations(result.get("Reservations", [])):
+            records_by_category.setdefault(record.category, []).append(record)
+
+        def is_free(night_id, window):
+            if any(record.conflicts_with(*window) for record in records_by_category.get(journee_category_by_suite[night_id], ())):
+                return False
+            resource_ids = resource_ids_by_suite[night_id]
+            return not (resource_ids and check_resource_block_conflict_ts(window[0], window[1], resource_ids, resource_blocks))
+
+        chunk_availability = {}
+        for date_str in chunk_dates:
+            early, late = date_windows[date_str]
+            chunk_availability[date_str] = {
+                night_id: {
+                    "early_checkin_available": is_free(night_id, early),
+                    "late_checkout_available": is_free(night_id, late)
+                }
+                for night_id in twins
+            }
+        return chunk_availability
+
+    availability_results = {}
+    failed_chunks = 0
+    if twins:
+        chunks = split_into_chunks(sorted_dates, CHUNK_SIZE_DAYS)
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="bulk-time-options") as executor:
+            future_to_chunk = _submit_chunks(executor, "time_options", process_chunk, chunks)
+            for future in as_completed(future_to_chunk):
+                chunk_index, chunk_dates = future_to_chunk[future]
+                try:
+                    chunk_availability = future.result()
+                except Exception as exc:
+                    logger.error("Chunk %d generated an exception: %s", chunk_index + 1, exc)
+                    chunk_availability = None
+                if chunk_availability is None:
+                    failed_chunks += 1
+                else:
+                    availability_results.update(chunk_availability)
+    else:
+        availability_results = {date_str: {} for date_str in sorted_dates}
+
+    if failed_chunks:
+        # Unlike the calendar engines, never answer with dates missing: options must not be sold unchecked
+        logger.error("Bulk time options check failed for %d chunks", failed_chunks)
+        return {"error": "Failed to check time options availability", "status": "error"}, 500
 
-    logger.info(f"Bulk availability check (nuitée) completed - processed {len(availability_results)} dates")
+    logger.info("Bulk time options check completed - processed %d dates for %d suites", len(availability_results), len(twins))
 
     return {
         "availability": availability_results,
+        "journee_suite_ids": twins,
         "status": "success"
     }
@@ -0,0 +1,128 @@
+"""
+In-memory cache for Mews catalog lookups.
+
+Services, resource categories, products, rates and age categories almost never change,
+yet every widget load used to fetch them again from Mews. These helpers build the exact
+payloads the routes and bulk engines use and keep the responses for a short TTL.
+"""
+import json
+import logging
+import threading
+import time
+
+from config import (
+    ENTERPRISE_ID,
+    DAY_SERVICE_ID,
+    NIGHT_SERVICE_ID,
+    CATALOG_CACHE_TTL_SECONDS
+)
+from metrics import CACHE_LOOKUPS
+from tracing import set_attributes
+
+logger = logging.getLogger(__name__)
+
+# {cache_key: (expires_at_monotonic, response)}
+_CATALOG_CACHE = {}
+_CATALOG_LOCK = threading.Lock()
+# Incremented whenever a fetched response differs from the one it replaces (see catalog_generation)
+_CATALOG_GENERATION = 0
+
+
+def get_catalog(make_mews_request_func, endpoint, payload, ttl=CATALOG_CACHE_TTL_SECONDS):
+    """
+    Return a cached Mews response for a catalog endpoint, fetching it when missing or expired.
+
+    Failed requests (None) are never cached so the next call retries.
+    """
+    # Key is computed before the request since make_mews_request adds the tokens to the payload
+    cache_key = f"{endpoint}:{json.dumps(payload, sort_keys=True)}"
+    now = time.monotonic()
+
+    with _CATALOG_LOCK:
+        entry = _CATALOG_CACHE.get(cache_key)
+    if entry and entry[0] > now:
+        CACHE_LOOKUPS.inc(cache="catalog", result="hit")
+        set_attributes({f"catalog.{endpoint}": "hit"})
+        return entry[1]
+    CACHE_LOOKUPS.inc(cache="catalog", result="miss")
+    set_attributes({f"catalog.{endpoint}": "miss"})
+
+    global _CATALOG_GENERATION
+    result = make_mews_request_func(endpoint, dict(payload))
+    if result is not None:
+        with _CATALOG_LOCK:
+            previous = _CATALOG_CACHE.get(cache_key)
+            if previous is None or previous[1] != result:
+                _CATALOG_GENERATION += 1
+            _CATALOG_CACHE[cache_key] = (now + ttl, result)
+    return result
+
+
+def catalog_generation():
+    """Number that changes whenever a catalog response changes: data derived from the catalog is stale when it differs."""
+    return _CATALOG_GENERATION
+
+
+def clear_catalog_cache():
+    """Drop every cached catalog response."""
+    with _CATALOG_LOCK:
+        _CATALOG_CACHE.clear()
+
+
+def fetch_services(make_mews_request_func):
+    """Get all services (services/getAll)."""
+    return get_catalog(make_mews_request_func, "services/getAll", {})
+
+
+def fetch_resource_categories(make_mews_request_func, service_ids):
+    """Get resource categories for the given services (resourceCategories/getAll)."""
+    payload = {
+        "EnterpriseIds": [ENTERPRISE_ID],
+        "ServiceIds": list(service_ids),
+        "IncludeDefault": False,
+        "Limitation": {"Count": 100}
+    }
+    return get_catalog(make_mews_request_func, "resourceCategories/getAll", payload)
+
+
+def fetch_products(make_mews_request_func):
+    """Get products for both services (products/getAll)."""
+    payload = {
+        "ServiceIds": [DAY_SERVICE_ID, NIGHT_SERVICE_ID],
+        "EnterpriseIds": [ENTERPRISE_ID],
+        "IncludeDefault": False,
+        "Limitation": {"Count": 100}
+    }
+    return get_catalog(make_mews_request_func, "products/getAll", payload)
+
+
+def fetch_rates(make_mews_request_func):
+    """Get all rates (rates/getAll)."""
+    payload = {
+        "EnterpriseIds": [ENTERPRISE_ID],
+        "IncludeDefault": False,
+        "Limitation": {"Count": 100}
+    }
+    return get_catalog(make_mews_request_func, "rates/getAll", payload)
+
+
+def fetch_age_categories(make_mews_request_func):
+    """Get all age categories (ageCategories/getAll)."""
+    payload = {
+        "EnterpriseIds": [ENTERPRISE_ID],
+        "IncludeDefault": False,
+        "Limitation": {"Count": 100}
+    }
+    return get_catalog(make_mews_request_func, "ageCategories/getAll", payload)
+
+
+# Every catalog lookup the app performs as (name, fetcher), used by the warm-up routine
+CATALOG_LOOKUPS = [
+    ("services", fetch_services),
+    ("resource categories (journée)", lambda f: fetch_resource_categories(f, [DAY_SERVICE_ID])),
+    ("resource categories (nuitée)", lambda f: fetch_resource_categories(f, [NIGHT_SERVICE_ID])),
+    ("resource categories (both)", lambda f: fetch_resource_categories(f, [DAY_SERVICE_ID, NIGHT_SERVICE_ID])),
+    ("products", fetch_products),
+    ("rates", fetch_rates),
+    ("age categories", fetch_age_categories),
+]
@@ -2,6 +2,7 @@
 Shared configuration file for Intense Experience booking system.
 This is the single source of truth for all constants and parameters.
 """
+import os
 
 # Demo environment flag
 is_demo = False
@@ -286,3 +287,167 @@ else:
         "7cb2802a-6404-41b2-80a3-b2b50146ae6f": "5b60745c-e2ca-4ce7-9261-b1e30088bceb",  # EUPHORYA Journée
     }
 
+
+# =============================================================================
+# CACHING AND WARM-UP (shared by both environments)
+# =============================================================================
+
+# How long catalog lookups (services, resource categories, products, rates,
+# age categories) are served from memory before Mews is asked again
+CATALOG_CACHE_TTL_SECONDS = 300
+
+# Number of days ahead the calendar can be browsed; slot tables are precomputed for this horizon
+BOOKING_HORIZON_DAYS = 365
+
+# Size of the pooled HTTP connection set kept open towards the Mews API
+MEWS_POOL_MAXSIZE = 32
+
+# =============================================================================
+# LOCAL TESTING
+# =============================================================================
+
+# Point the app at another Connector API, e.g. the local fake_mews_server.py:
+# MEWS_API_BASE_URL=http://127.0.0.1:5055/api/connector/v1
+MEWS_API_BASE_URL = os.getenv("MEWS_API_BASE_URL", MEWS_API_BASE_URL)
+
+# Record/replay of Mews calls (mews_cassette.py): "record", "replay" or empty for live calls.
+# Cassettes recorded in production contain reservation and customer data: never commit them
+MEWS_CASSETTE_MODE = os.getenv("MEWS_CASSETTE_MODE", "")
+# Each recording process writes MEWS_CASSETTE_PATH with its PID inserted (mews_cassette.<pid>.jsonl.gz)
+MEWS_CASSETTE_PATH = os.getenv("MEWS_CASSETTE_PATH", "mews_cassette.jsonl.gz")
+# Set to "original" to replay with the recorded Mews latency instead of answering immediately
+MEWS_CASSETTE_REPLAY_TIMING = os.getenv("MEWS_CASSETTE_REPLAY_TIMING", "") == "original"
+
+# =============================================================================
+# TRACING (tracing.py)
+# =============================================================================
+
+# Where finished spans go: "file" (OTLP/JSON lines in TRACING_EXPORT_PATH), "otlp" (POST to
+# TRACING_COLLECTOR_URL) or empty to only stamp trace IDs on the logs
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_EXPORT_PATH = os.getenv("TRACING_EXPORT_PATH", "traces.jsonl")
+TRACING_COLLECTOR_URL = os.getenv("TRACING_COLLECTOR_URL", "http://127.0.0.1:4318/v1/traces")
+# Share of new traces that are recorded and exported (incoming traceparent flags take precedence)
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+
+# =============================================================================
+# PROFILING (profiling.py)
+# =============================================================================
+
+# Requests sent with "X-Profile: <token>" are profiled; empty disables the header
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+# Share of all requests profiled without the header (0 = only on demand)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+# Safety limits: longest sampled request and profiles running at the same time per worker
+PROFILING_MAX_SECONDS = 60
+PROFILING_MAX_CONCURRENT = 2
+
+# =============================================================================
+# METRICS (metrics.py)
+# =============================================================================
+
+# GET /metrics requires "Authorization: Bearer <token>"; empty disables the route (404)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Directory where each worker process writes its metric values for /metrics to add them up
+# (gunicorn.conf.py sets one per bind); empty serves the answering process's values only
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+# Shortest interval between two writes of a worker's values to METRICS_MULTIPROC_DIR
+METRICS_SNAPSHOT_INTERVAL_SECONDS = 1.0
+
+# =============================================================================
+# LOGGING (logging_setup.py)
+# =============================================================================
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-logger overrides, e.g. "bulk_availability=WARNING,urllib3=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "urllib3=WARNING")
+# "text" or "json" (one object per line, for log shipping)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Keep 1 in N INFO/DEBUG records per logging call for noisy loggers, e.g. "bulk_availability=10"
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+
+# =============================================================================
+# RESPONSES (responses.py)
+# =============================================================================
+
+# JSON bodies at least this large are gzip/brotli compressed when the client accepts it
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+
+# =============================================================================
+# AVAILABILITY VERSIONS (availability_versions.py)
+# =============================================================================
+
+# Dates computed less than this long ago are served from memory to requests sending "since" digests
+AVAILABILITY_DELTA_TTL_SECONDS = int(os.getenv("AVAILABILITY_DELTA_TTL_SECONDS", "60"))
+# Request shapes (service, suite, booking type, format) kept per worker, least recently used dropped first
+AVAILABILITY_VERSION_MAX_VIEWS = 256
+
+# =============================================================================
+# PAGE BOOTSTRAP (bootstrap.py)
+# =============================================================================
+
+# Time index() may spend computing the first calendar view for the page (0 disables the prefetch)
+INDEX_PREFETCH_BUDGET_MS = int(os.getenv("INDEX_PREFETCH_BUDGET_MS", "600"))
+# Page loads computing availability at the same time per worker; further ones render without it
+INDEX_PREFETCH_MAX_CONCURRENT = 4
+
+# =============================================================================
+# ADJACENT MONTH PREFETCH (prefetch.py)
+# =============================================================================
+
+# How long prefetched (and just computed) calendar dates answer bulk requests
+PREFETCH_TTL_SECONDS = int(os.getenv("PREFETCH_TTL_SECONDS", "30"))
+# Queued background computations per worker (0 disables the prefetch)
+PREFETCH_MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", "8"))
+# Prefetch Mews calls in flight at once, only while no request is calling Mews
+PREFETCH_MAX_UPSTREAM_IN_FLIGHT = 2
+# Longest wait for idle upstream capacity before a job is skipped (or a started job abandoned)
+PREFETCH_UPSTREAM_WAIT_SECONDS = 10
+PREFETCH_CACHE_MAX_DATES = 5000
+
+# =============================================================================
+# IMAGE URLS (image_cache.py)
+# =============================================================================
+
+# How long resolved image URLs and category image assignments are kept (shorter when a URL expires sooner)
+IMAGE_URL_CACHE_TTL_SECONDS = int(os.getenv("IMAGE_URL_CACHE_TTL_SECONDS", "21600"))
+# Expiring URLs are dropped this long before their expiry, so a served URL still loads in the browser
+IMAGE_URL_EXPIRY_MARGIN_SECONDS = 300
+# Size the widget cards display; requests may ask for another size
+IMAGE_DEFAULT_WIDTH = 400
+IMAGE_DEFAULT_HEIGHT = 300
+IMAGE_DEFAULT_RESIZE_MODE = "Fit"
+# (width, height, resize mode) accepted by /images/resolve: every size is a separate cache entry
+IMAGE_ALLOWED_SIZES = ((IMAGE_DEFAULT_WIDTH, IMAGE_DEFAULT_HEIGHT, IMAGE_DEFAULT_RESIZE_MODE),)
+# Entries kept per image cache (URLs, category assignments), least recently used dropped first
+IMAGE_CACHE_MAX_ENTRIES = 5000
+# Longest wait for a URL another request is already fetching from Mews
+IMAGE_FETCH_WAIT_SECONDS = 15
+
+# =============================================================================
+# PRICE CALENDAR (price_calendar.py)
+# =============================================================================
+
+# How long the per-day price matrix of a rate is used before rates/getPricing is asked again
+PRICE_CALENDAR_TTL_SECONDS = int(os.getenv("PRICE_CALENDAR_TTL_SECONDS", "900"))
+# Days per rates/getPricing call: nightly rate (one time unit per day), hourly journée rates
+# (24 per day; 4 days keep each call at about the 96 hours used for every other Mews interval)
+PRICE_CALENDAR_NIGHT_CHUNK_DAYS = 31
+PRICE_CALENDAR_HOUR_CHUNK_DAYS = 4
+# Days from today primed by the warm-up for the hourly rates (the nightly rate covers the horizon)
+PRICE_CALENDAR_PRIME_HOUR_DAYS = 62
+# rates/getPricing calls in flight at once when several chunks are needed
+PRICE_CALENDAR_MAX_CONCURRENT = 4
+
+# =============================================================================
+# ALTERNATIVES SEARCH (/alternatives)
+# =============================================================================
+
+# Days searched on each side of the requested stay; with nuitées of NIGHT_MAX_NIGHTS the window
+# must stay within the 96 hours one reservations/getAll call accepts
+ALTERNATIVES_WINDOW_DAYS = 1
+# Alternatives returned when the request does not say, and at most
+ALTERNATIVES_DEFAULT_LIMIT = 5
+ALTERNATIVES_MAX_LIMIT = 20
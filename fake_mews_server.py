@@ -0,0 +1,663 @@
+"""
+Local stand-in for the Mews Connector API, for benchmarks and load tests.
+
+Serves the Connector endpoints this app calls (POST /api/connector/v1/<endpoint>) from memory:
+- Catalog data (services, resource categories, resources, rates, products, age categories, customers)
+  is seeded from mews_api_data.json, completed with synthetic categories for the suite IDs of config.py
+  so both the demo and the production configuration find their suites.
+- Reservations and resource blocks come from the seed file plus a synthetic generator
+  (journée slots, nuitée stays, building closures) over a configurable date range.
+- reservations/add, customers/add and paymentRequests/* mutate the in-memory state.
+
+Latency and failures are injected per request:
+- latency distributions: "none", "fixed:<ms>", "uniform:<min_ms>:<max_ms>", "lognormal:<median_ms>:<sigma>"
+  (a default plus optional per-endpoint overrides)
+- a share of requests answered 429 with Retry-After, and a share that hang for timeout_seconds then 504
+
+Usage:
+    python fake_mews_server.py --port 5055 --days 120 --latency lognormal:150:0.5 --rate-429 0.02
+    export MEWS_API_BASE_URL=http://127.0.0.1:5055/api/connector/v1
+
+Runtime control: GET /_fake/stats (request counts per endpoint), POST /_fake/config (change injection
+settings, same keys as FakeMewsConfig), POST /_fake/reset (reseed the state).
+
+Also a trace collector stand-in for tracing.py: POST /v1/traces accepts OTLP/JSON exports
+(TRACING_EXPORTER=otlp, TRACING_COLLECTOR_URL=http://127.0.0.1:5055/v1/traces) and
+GET /_fake/traces?trace_id=<id> lists the received spans.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from datetime import date, timedelta
+
+from flask import Flask, jsonify, request
+
+from config import (
+    ENTERPRISE_ID,
+    DAY_SERVICE_ID,
+    NIGHT_SERVICE_ID,
+    RATE_ID_NUITEE,
+    RATE_ID_JOURNEE_SEMAINE,
+    RATE_ID_JOURNEE_WEEKEND,
+    AGE_CATEGORY_ADULT_DAY,
+    AGE_CATEGORY_ADULT_NIGHT,
+    DAY_MIN_HOURS,
+    DAY_MAX_HOURS,
+    NIGHT_MAX_NIGHTS,
+    DEFAULT_CURRENCY,
+    SPECIAL_MIN_DURATION_SUITES,
+    SPECIAL_MIN_HOURS,
+    ARRIVAL_TIMES,
+    DEPARTURE_TIMES,
+    NIGHT_CHECK_IN_HOUR,
+    NIGHT_CHECK_OUT_HOUR,
+    SUITE_ID_MAPPING,
+    SUITE_ID_MAPPING_REVERSE,
+    BUILDING_RESOURCE_ID,
+    BUILDING_CATEGORY_ID,
+    SUITE_TO_RESOURCE_ID
+)
+from local_time import local_to_epoch, epoch_to_local, epoch_to_utc_iso, parse_iso_epoch
+
+logger = logging.getLogger(__name__)
+
+SEED_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mews_api_data.json")
+API_PREFIX = "/api/connector/v1"
+# Spans kept by the /v1/traces collector stand-in
+MAX_STORED_SPANS = 20000
+
+
+class FakeMewsConfig:
+    """Latency and failure injection settings (all mutable at runtime through /_fake/config)."""
+
+    def __init__(self, latency="none", endpoint_latency=None, rate_429=0.0, rate_timeout=0.0,
+                 timeout_seconds=30.0, retry_after_seconds=1, seed=None):
+        self.latency = latency
+        # {endpoint: latency spec} overriding the default for specific endpoints
+        self.endpoint_latency = dict(endpoint_latency or {})
+        self.rate_429 = rate_429
+        self.rate_timeout = rate_timeout
+        self.timeout_seconds = timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def update(self, values):
+        """Apply a dict of settings (unknown keys are ignored)."""
+        with self.lock:
+            for key in ("latency", "endpoint_latency", "rate_429", "rate_timeout",
+                        "timeout_seconds", "retry_after_seconds"):
+                if key in values:
+                    setattr(self, key, values[key])
+
+    def as_dict(self):
+        return {
+            "latency": self.latency,
+            "endpoint_latency": self.endpoint_latency,
+            "rate_429": self.rate_429,
+            "rate_timeout": self.rate_timeout,
+            "timeout_seconds": self.timeout_seconds,
+            "retry_after_seconds": self.retry_after_seconds
+        }
+
+    def draw(self, endpoint):
+        """
+        Decide what happens to one request.
+
+        Returns:
+            tuple: (outcome, latency_seconds) with outcome in "ok", "429", "timeout"
+        """
+        with self.lock:
+            spec = self.endpoint_latency.get(endpoint, self.latency)
+            latency = sample_latency(spec, self.random)
+            roll = self.random.random()
+            if roll < self.rate_429:
+                return "429", latency
+            if roll < self.rate_429 + self.rate_timeout:
+                return "timeout", self.timeout_seconds
+            return "ok", latency
+
+
+def sample_latency(spec, rng):
+    """
+    Draw one latency (seconds) from a distribution spec.
+
+    Args:
+        spec: "none", "fixed:<ms>", "uniform:<min_ms>:<max_ms>" or "lognormal:<median_ms>:<sigma>"
+        rng: random.Random instance
+
+    Returns:
+        float: latency in seconds
+    """
+    if not spec or spec == "none":
+        return 0.0
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return params[0] / 1000
+    if kind == "uniform":
+        return rng.uniform(params[0], params[1]) / 1000
+    if kind == "lognormal":
+        return rng.lognormvariate(math.log(params[0]), params[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _category_name(category_id):
+    """Readable synthetic name for a configured suite category."""
+    if category_id == BUILDING_CATEGORY_ID:
+        return "Batiment"
+    service = "Nuitée" if category_id in SUITE_ID_MAPPING_REVERSE else "Journée"
+    return f"Suite {category_id[:8]} {service}"
+
+
+def _synthetic_category(category_id, service_id, category_type="Suite"):
+    return {
+        "Id": category_id,
+        "EnterpriseId": ENTERPRISE_ID,
+        "ServiceId": service_id,
+        "IsActive": True,
+        "Type": category_type,
+        "Classification": "Other",
+        "Names": {"fr-FR": _category_name(category_id)},
+        "ShortNames": {},
+        "Descriptions": {},
+        "Ordering": 0,
+        "Capacity": 2,
+        "ExtraCapacity": 0
+    }
+
+
+class FakeMewsState:
+    """In-memory Mews data, guarded by a lock since the server is threaded."""
+
+    def __init__(self, seed=42, start_date=None, days=90, day_bookings_per_suite=1.5,
+                 night_occupancy=0.5, building_closure_rate=0.01, blocks_per_week=1.0,
+                 seed_data_path=SEED_DATA_PATH):
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.request_counts = {}
+
+        seed_data = {}
+        if seed_data_path and os.path.exists(seed_data_path):
+            with open(seed_data_path, encoding="utf-8") as f:
+                seed_data = json.load(f).get("full_data", {})
+
+        self.services = list(seed_data.get("services", []))
+        self.resource_categories = list(seed_data.get("resource_categories", []))
+        self.resources = list(seed_data.get("resources", []))
+        self.rates = list(seed_data.get("rates", []))
+        self.products = list(seed_data.get("products", []))
+        self.age_categories = list(seed_data.get("age_categories", []))
+        self.customers = list(seed_data.get("customers", []))
+        self.reservations = []
+        self.resource_blocks = []
+        self.payment_requests = []
+        # Parallel (start_ts, end_ts) list so range queries do not parse ISO strings
+        self._reservation_bounds = []
+
+        self._complete_catalog()
+        for reservation in seed_data.get("reservations", []):
+            self._insert_reservation(reservation)
+
+        start_date = start_date or date.today()
+        self.generate_reservations(start_date, days, day_bookings_per_suite, night_occupancy, building_closure_rate)
+        self.generate_resource_blocks(start_date, days, blocks_per_week)
+
+    def reset(self, **options):
+        """
+        Replace the data with a freshly generated state (same options as the constructor).
+
+        The new data is built outside the lock, then swapped in while holding it; the lock object
+        itself is kept so request threads waiting on it still serialize with the swap.
+        """
+        new_state = FakeMewsState(**options)
+        with self.lock:
+            for name, value in vars(new_state).items():
+                if name != "lock":
+                    setattr(self, name, value)
+
+    # -------------------------------------------------------------------------
+    # Seeding
+    # -------------------------------------------------------------------------
+
+    def _complete_catalog(self):
+        """Add the services, categories, rates and age categories config.py expects but the seed file lacks."""
+        known_services = {s.get("Id") for s in self.services}
+        for service_id, name in ((DAY_SERVICE_ID, "JOURNEE"), (NIGHT_SERVICE_ID, "NUITEE")):
+            if service_id not in known_services:
+                self.services.append({
+                    "Id": service_id, "EnterpriseId": ENTERPRISE_ID, "IsActive": True,
+                    "Type": "Reservable", "Name": name, "Names": {"fr-FR": name}
+                })
+
+        known_categories = {c.get("Id") for c in self.resource_categories}
+        day_suites = set(SUITE_ID_MAPPING) | set(SPECIAL_MIN_DURATION_SUITES)
+        day_suites |= {sid for sid in SUITE_TO_RESOURCE_ID if sid not in SUITE_ID_MAPPING_REVERSE}
+        for suite_id in sorted(day_suites):
+            if suite_id not in known_categories:
+                self.resource_categories.append(_synthetic_category(suite_id, DAY_SERVICE_ID))
+        for suite_id in sorted(SUITE_ID_MAPPING_REVERSE):
+            if suite_id not in known_categories:
+                self.resource_categories.append(_synthetic_category(suite_id, NIGHT_SERVICE_ID))
+        if BUILDING_CATEGORY_ID and BUILDING_CATEGORY_ID not in known_categories:
+            self.resource_categories.append(_synthetic_category(BUILDING_CATEGORY_ID, DAY_SERVICE_ID, "Other"))
+
+        known_rates = {r.get("Id") for r in self.rates}
+        for rate_id, service_id, name in ((RATE_ID_NUITEE, NIGHT_SERVICE_ID, "Tarif Suites nuitée"),
+                                          (RATE_ID_JOURNEE_SEMAINE, DAY_SERVICE_ID, "TARIF JOURNEE EN SEMAINE"),
+                                          (RATE_ID_JOURNEE_WEEKEND, DAY_SERVICE_ID, "TARIF JOURNEE LE WEEKEND")):
+            if rate_id not in known_rates:
+                self.rates.append({"Id": rate_id, "ServiceId": service_id, "IsActive": True,
+                                   "IsEnabled": True, "IsPublic": True, "Name": name, "Names": {"fr-FR": name}})
+
+        known_age_categories = {a.get("Id") for a in self.age_categories}
+        for age_category_id, service_id in ((AGE_CATEGORY_ADULT_DAY, DAY_SERVICE_ID),
+                                            (AGE_CATEGORY_ADULT_NIGHT, NIGHT_SERVICE_ID)):
+            if age_category_id not in known_age_categories:
+                self.age_categories.append({"Id": age_category_id, "ServiceId": service_id, "IsActive": True,
+                                            "Classification": "Adult", "Names": {"fr-FR": "Adulte"}})
+
+    def _day_suite_ids(self):
+        return [c["Id"] for c in self.resource_categories
+                if c.get("ServiceId") == DAY_SERVICE_ID and c.get("IsActive") and c["Id"] != BUILDING_CATEGORY_ID]
+
+    def _night_suite_ids(self):
+        return [c["Id"] for c in self.resource_categories
+                if c.get("ServiceId") == NIGHT_SERVICE_ID and c.get("IsActive")]
+
+    def _make_reservation(self, service_id, category_id, start_ts, end_ts, state="Confirmed", **extra):
+        reservation = {
+            "Id": str(uuid.UUID(int=self.random.getrandbits(128))),
+            "ServiceId": service_id,
+            "State": state,
+            "Origin": "Connector",
+            "StartUtc": epoch_to_utc_iso(start_ts),
+            "EndUtc": epoch_to_utc_iso(end_ts),
+            "RequestedCategoryId": category_id,
+            "AssignedResourceId": SUITE_TO_RESOURCE_ID.get(category_id),
+            "PersonCounts": [],
+            "CreatedUtc": epoch_to_utc_iso(time.time())
+        }
+        reservation.update(extra)
+        return reservation
+
+    def _insert_reservation(self, reservation):
+        self.reservations.append(reservation)
+        self._reservation_bounds.append((parse_iso_epoch(reservation["StartUtc"]), parse_iso_epoch(reservation["EndUtc"])))
+
+    def generate_reservations(self, start_date, days, day_bookings_per_suite=1.5, night_occupancy=0.5,
+                              building_closure_rate=0.01):
+        """
+        Generate synthetic reservations over [start_date, start_date + days).
+
+        Args:
+            day_bookings_per_suite: average journée bookings per suite per day (non-overlapping, 1h buffer)
+            night_occupancy: probability a nuitée suite is booked for a given night
+            building_closure_rate: probability the whole building is booked for a given day
+        """
+        rng = self.random
+        arrival_hours = [int(t.split(':')[0]) for t in ARRIVAL_TIMES]
+        last_departure_hour = max(int(t.split(':')[0]) for t in DEPARTURE_TIMES)
+        day_suites = self._day_suite_ids()
+        night_suites = self._night_suite_ids()
+
+        with self.lock:
+            for day_offset in range(days):
+                day = start_date + timedelta(days=day_offset)
+
+                if BUILDING_CATEGORY_ID and rng.random() < building_closure_rate:
+                    self._insert_reservation(self._make_reservation(
+                        DAY_SERVICE_ID, BUILDING_CATEGORY_ID, local_to_epoch(day, 0), local_to_epoch(day, 24)))
+                    continue
+
+                for suite_id in day_suites:
+                    min_hours = SPECIAL_MIN_HOURS if suite_id in SPECIAL_MIN_DURATION_SUITES else DAY_MIN_HOURS
+                    # Poisson-like count by repeated Bernoulli draws, then place sequentially in the day
+                    count = sum(1 for _ in range(4) if rng.random() < day_bookings_per_suite / 4)
+                    hour = rng.choice(arrival_hours)
+                    for _ in range(count):
+                        duration = rng.randint(min_hours, DAY_MAX_HOURS)
+                        if hour + duration > last_departure_hour:
+                            break
+                        self._insert_reservation(self._make_reservation(
+                            DAY_SERVICE_ID, suite_id, local_to_epoch(day, hour), local_to_epoch(day, hour + duration)))
+                        hour += duration + 1
+
+                for suite_id in night_suites:
+                    if rng.random() < night_occupancy:
+                        nights = rng.randint(1, NIGHT_MAX_NIGHTS)
+                        self._insert_reservation(self._make_reservation(
+                            NIGHT_SERVICE_ID, suite_id,
+                            local_to_epoch(day, NIGHT_CHECK_IN_HOUR),
+                            local_to_epoch(day, 24 * nights + NIGHT_CHECK_OUT_HOUR)))
+
+    def generate_resource_blocks(self, start_date, days, blocks_per_week=1.0):
+        """Generate synthetic maintenance blocks on suite resources (and occasionally the building)."""
+        rng = self.random
+        resource_ids = sorted(set(SUITE_TO_RESOURCE_ID.values()))
+        if BUILDING_RESOURCE_ID:
+            resource_ids.append(BUILDING_RESOURCE_ID)
+        if not resource_ids:
+            return
+        with self.lock:
+            for _ in range(int(days / 7 * blocks_per_week)):
+                day = start_date + timedelta(days=rng.randrange(days))
+                start_hour = rng.randrange(0, 20)
+                hours = rng.choice([2, 4, 8, 24, 48])
+                self.resource_blocks.append({
+                    "Id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "EnterpriseId": ENTERPRISE_ID,
+                    "AssignedResourceId": rng.choice(resource_ids),
+                    "IsActive": True,
+                    "Type": "OutOfOrder",
+                    "StartUtc": epoch_to_utc_iso(local_to_epoch(day, start_hour)),
+                    "EndUtc": epoch_to_utc_iso(local_to_epoch(day, start_hour + hours)),
+                    "Name": "Maintenance"
+                })
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def count_request(self, endpoint, outcome):
+        with self.lock:
+            counts = self.request_counts.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def reservations_colliding(self, start_ts, end_ts, service_ids=None):
+        with self.lock:
+            return [reservation for reservation, (res_start, res_end) in zip(self.reservations, self._reservation_bounds)
+                    if res_start < end_ts and res_end > start_ts
+                    and (not service_ids or reservation.get("ServiceId") in service_ids)]
+
+    def blocks_colliding(self, start_ts, end_ts):
+        with self.lock:
+            return [block for block in self.resource_blocks
+                    if parse_iso_epoch(block["StartUtc"]) < end_ts and parse_iso_epoch(block["EndUtc"]) > start_ts]
+
+
+def _stable_price(category_id, rate_id, base):
+    """Deterministic price per (category, rate) so repeated pricing calls agree."""
+    return float(base + zlib.crc32(f"{category_id}:{rate_id}".encode()) % 8 * 10)
+
+
+def _amount(value):
+    net = round(value / 1.06, 2)
+    return {"Currency": DEFAULT_CURRENCY, "NetValue": net, "GrossValue": value,
+            "TaxValues": [{"Code": "BE-L", "Value": round(value - net, 2)}]}
+
+
+def build_pricing_response(state, payload):
+    """rates/getPricing: hourly time units for journée rates, daily (local midnight) for the nuitée rate."""
+    rate_id = payload.get("RateId")
+    first_ts = parse_iso_epoch(payload["FirstTimeUnitStartUtc"])
+    last_ts = parse_iso_epoch(payload["LastTimeUnitStartUtc"])
+
+    time_units = []
+    if rate_id == RATE_ID_NUITEE:
+        day, _, _ = epoch_to_local(first_ts)
+        unit_ts = local_to_epoch(day)
+        while unit_ts <= last_ts:
+            time_units.append(unit_ts)
+            day += timedelta(days=1)
+            unit_ts = local_to_epoch(day)
+        base = 260
+        service_id = NIGHT_SERVICE_ID
+    else:
+        unit_ts = first_ts
+        while unit_ts <= last_ts:
+            time_units.append(unit_ts)
+            unit_ts += 3600
+        base = 45 if rate_id == RATE_ID_JOURNEE_SEMAINE else 55
+        service_id = DAY_SERVICE_ID
+
+    iso_units = [epoch_to_utc_iso(ts) for ts in time_units]
+    category_prices = []
+    for category in state.resource_categories:
+        if category.get("ServiceId") != service_id or category["Id"] == BUILDING_CATEGORY_ID:
+            continue
+        price = _stable_price(category["Id"], rate_id, base)
+        category_prices.append({
+            "CategoryId": category["Id"],
+            "Prices": [price] * len(time_units),
+            "AmountPrices": [_amount(price) for _ in time_units]
+        })
+    return {
+        "Currency": DEFAULT_CURRENCY,
+        "DatesUtc": iso_units,
+        "TimeUnitStartsUtc": iso_units,
+        "BasePrices": [float(base)] * len(time_units),
+        "BaseAmountPrices": [_amount(float(base)) for _ in time_units],
+        "CategoryPrices": category_prices,
+        "CategoryAdjustments": [],
+        "AgeCategoryAdjustments": [],
+        "RelativeAdjustment": 0.0,
+        "AbsoluteAdjustment": 0.0
+    }
+
+
+def _filter_by_service(items, payload):
+    service_ids = payload.get("ServiceIds")
+    if not service_ids:
+        return list(items)
+    return [item for item in items if item.get("ServiceId") in service_ids]
+
+
+def handle_endpoint(state, endpoint, payload):
+    """
+    Answer one Connector call from the in-memory state.
+
+    Returns:
+        tuple: (response_body, status_code)
+    """
+    if endpoint == "services/getAll":
+        return {"Services": state.services}, 200
+    if endpoint == "resourceCategories/getAll":
+        return {"ResourceCategories": _filter_by_service(state.resource_categories, payload)}, 200
+    if endpoint == "resources/getAll":
+        return {"Resources": state.resources}, 200
+    if endpoint == "products/getAll":
+        return {"Products": _filter_by_service(state.products, payload)}, 200
+    if endpoint == "rates/getAll":
+        return {"Rates": _filter_by_service(state.rates, payload)}, 200
+    if endpoint == "ageCategories/getAll":
+        return {"AgeCategories": _filter_by_service(state.age_categories, payload)}, 200
+
+    if endpoint == "reservations/getAll":
+        start_ts = parse_iso_epoch(payload["StartUtc"])
+        end_ts = parse_iso_epoch(payload["EndUtc"])
+        return {"Reservations": state.reservations_colliding(start_ts, end_ts, payload.get("ServiceIds"))}, 200
+
+    if endpoint == "resourceBlocks/getAll":
+        colliding = payload.get("CollidingUtc", {})
+        start_ts = parse_iso_epoch(colliding["StartUtc"])
+        end_ts = parse_iso_epoch(colliding["EndUtc"])
+        return {"ResourceBlocks": state.blocks_colliding(start_ts, end_ts)}, 200
+
+    if endpoint == "rates/getPricing":
+        return build_pricing_response(state, payload), 200
+
+    if endpoint == "resourceCategoryImageAssignments/getAll":
+        assignments = [{"Id": str(uuid.uuid5(uuid.NAMESPACE_URL, category_id)), "IsActive": True,
+                        "CategoryId": category_id,
+                        "ImageId": str(uuid.uuid5(uuid.NAMESPACE_OID, category_id))}
+                       for category_id in payload.get("ResourceCategoryIds", [])]
+        return {"ResourceCategoryImageAssignments": assignments}, 200
+
+    if endpoint == "images/getUrls":
+        urls = [{"ImageId": image["ImageId"],
+                 "Url": f"https://fake-mews.local/images/{image['ImageId']}?w={image.get('Width')}&h={image.get('Height')}"}
+                for image in payload.get("Images", [])]
+        return {"ImageUrls": urls}, 200
+
+    if endpoint == "customers/add":
+        customer = {"Id": str(uuid.uuid4()), "FirstName": payload.get("FirstName"),
+                    "LastName": payload.get("LastName"), "Email": payload.get("Email"),
+                    "Phone": payload.get("Phone"), "CreatedUtc": epoch_to_utc_iso(time.time())}
+        with state.lock:
+            state.customers.append(customer)
+        return customer, 200
+
+    if endpoint == "reservations/add":
+        service_id = payload.get("ServiceId")
+        created = []
+        with state.lock:
+            for data in payload.get("Reservations", []):
+                reservation = state._make_reservation(
+                    service_id, data.get("RequestedCategoryId"),
+                    parse_iso_epoch(data["StartUtc"]), parse_iso_epoch(data["EndUtc"]),
+                    state=data.get("State", "Confirmed"), RateId=data.get("RateId"),
+                    CustomerId=data.get("CustomerId"), PersonCounts=data.get("PersonCounts", []))
+                state._insert_reservation(reservation)
+                created.append({"Identifier": data.get("Identifier"), "Reservation": reservation})
+        return {"Reservations": created}, 200
+
+    if endpoint == "paymentRequests/add":
+        created = []
+        with state.lock:
+            for data in payload.get("PaymentRequests", []):
+                payment_request = {"Id": str(uuid.uuid4()), "EnterpriseId": ENTERPRISE_ID, "State": "Pending",
+                                   "CreatedUtc": epoch_to_utc_iso(time.time()), **data}
+                state.payment_requests.append(payment_request)
+                created.append(payment_request)
+        return {"PaymentRequests": created}, 200
+
+    if endpoint == "paymentRequests/getAll":
+        wanted = set(payload.get("PaymentRequestIds", []))
+        with state.lock:
+            found = [p for p in state.payment_requests if not wanted or p["Id"] in wanted]
+        return {"PaymentRequests": found}, 200
+
+    return {"Message": f"Unknown endpoint: {endpoint}"}, 400
+
+
+def create_fake_mews_app(state=None, fake_config=None):
+    """Build the Flask app serving the fake Connector API."""
+    state = state or FakeMewsState()
+    fake_config = fake_config or FakeMewsConfig()
+    app = Flask(__name__)
+    app.config["FAKE_MEWS_STATE"] = state
+    app.config["FAKE_MEWS_CONFIG"] = fake_config
+    # Spans received on /v1/traces, newest last
+    received_spans = deque(maxlen=MAX_STORED_SPANS)
+
+    @app.route(f'{API_PREFIX}/<path:endpoint>', methods=['POST'])
+    def connector(endpoint):
+        outcome, delay = fake_config.draw(endpoint)
+        state.count_request(endpoint, outcome)
+        if delay:
+            time.sleep(delay)
+        if outcome == "429":
+            response = jsonify({"Message": "Too many requests"})
+            response.headers["Retry-After"] = str(fake_config.retry_after_seconds)
+            return response, 429
+        if outcome == "timeout":
+            return jsonify({"Message": "Gateway timeout"}), 504
+
+        try:
+            body, status = handle_endpoint(state, endpoint, request.get_json(silent=True) or {})
+        except (KeyError, ValueError) as e:
+            body, status = {"Message": f"Invalid request: {e}"}, 400
+        return jsonify(body), status
+
+    @app.route('/_fake/stats', methods=['GET'])
+    def stats():
+        with state.lock:
+            return jsonify({
+                "requests": state.request_counts,
+                "reservations": len(state.reservations),
+                "resource_blocks": len(state.resource_blocks),
+                "config": fake_config.as_dict()
+            })
+
+    @app.route('/_fake/config', methods=['POST'])
+    def update_config():
+        fake_config.update(request.get_json(silent=True) or {})
+        return jsonify(fake_config.as_dict())
+
+    @app.route('/v1/traces', methods=['POST'])
+    def collect_traces():
+        document = request.get_json(silent=True) or {}
+        for resource_spans in document.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                received_spans.extend(scope_spans.get("spans", []))
+        return jsonify({"partialSuccess": {}})
+
+    @app.route('/_fake/traces', methods=['GET'])
+    def list_traces():
+        trace_id = request.args.get("trace_id")
+        spans = [s for s in list(received_spans) if not trace_id or s.get("traceId") == trace_id]
+        return jsonify({"spans": spans, "count": len(spans)})
+
+    @app.route('/_fake/reset', methods=['POST'])
+    def reset():
+        options = request.get_json(silent=True) or {}
+        state.reset(**options)
+        return jsonify({"reservations": len(state.reservations), "resource_blocks": len(state.resource_blocks)})
+
+    return app
+
+
+def start_fake_mews_server(host="127.0.0.1", port=0, state=None, fake_config=None):
+    """
+    Run the fake server in a background thread (for benchmarks and load replays).
+
+    Returns:
+        tuple: (server, base_url) - call server.shutdown() to stop it
+    """
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, create_fake_mews_app(state, fake_config), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="fake-mews", daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_port}{API_PREFIX}"
+    logger.info(f"Fake Mews server listening on {base_url}")
+    return server, base_url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local fake Mews Connector API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start-date", default=None, help="first generated date (YYYY-MM-DD), default today")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--day-bookings-per-suite", type=float, default=1.5)
+    parser.add_argument("--night-occupancy", type=float, default=0.5)
+    parser.add_argument("--building-closure-rate", type=float, default=0.01)
+    parser.add_argument("--blocks-per-week", type=float, default=1.0)
+    parser.add_argument("--latency", default="none", help="none | fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--endpoint-latency", default="{}", help='JSON, e.g. {"reservations/getAll": "fixed:300"}')
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-timeout", type=float, default=0.0)
+    parser.add_argument("--timeout-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fake_state = FakeMewsState(
+        seed=args.seed,
+        start_date=date.fromisoformat(args.start_date) if args.start_date else None,
+        days=args.days,
+        day_bookings_per_suite=args.day_bookings_per_suite,
+        night_occupancy=args.night_occupancy,
+        building_closure_rate=args.building_closure_rate,
+        blocks_per_week=args.blocks_per_week
+    )
+    fake_settings = FakeMewsConfig(
+        latency=args.latency,
+        endpoint_latency=json.loads(args.endpoint_latency),
+        rate_429=args.rate_429,
+        rate_timeout=args.rate_timeout,
+        timeout_seconds=args.timeout_seconds,
+        seed=args.seed
+    )
+    logger.info(f"Seeded {len(fake_state.reservations)} reservations and {len(fake_state.resource_blocks)} resource blocks")
+    create_fake_mews_app(fake_state, fake_settings).run(host=args.host, port=args.port, threaded=True)
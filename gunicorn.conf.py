@@ -0,0 +1,94 @@
+"""
+Gunicorn configuration (startup.txt: gunicorn --config gunicorn.conf.py wsgi:app).
+
+Worker model
+------------
+The app is I/O bound: almost every route waits on the Mews Connector API, and the bulk
+availability routes fan one request out into many Mews calls. Gunicorn therefore runs threaded
+workers (gthread): a few processes for CPU parallelism (the slot loops hold the GIL) and several
+request threads per process that mostly sleep on sockets.
+
+Thread pools inside a worker
+----------------------------
+The threads setting is not the whole story. Every bulk request creates its own ThreadPoolExecutor
+in bulk_availability.py for its 4-day chunks:
+- bulk-availability-journee: up to 20 chunk threads per request
+- bulk-availability-nuitee: up to 2 chunk threads per request
+So one worker can run threads x 20 chunk threads, and as many concurrent Mews calls, when all its
+request threads serve month views at once. These share the worker's MEWS_SESSION pool of
+MEWS_POOL_MAXSIZE (32) kept-alive connections. Past that, requests opens extra connections and
+closes them after use, so nothing blocks but TLS handshakes come back. The chunk threads also
+compete with the request threads for the GIL.
+
+Keep threads modest (default 4, i.e. at most 80 concurrent Mews calls per worker) and scale with
+workers rather than threads. Watch ie_bulk_executor_queue_depth and ie_bulk_chunks_in_flight on
+/metrics before raising either.
+
+Metrics
+-------
+Every worker writes its metric values to METRICS_MULTIPROC_DIR (default: ie-metrics-<port> in
+the temp directory) and /metrics adds up all workers, whichever one answers the scrape.
+on_starting empties the directory, so counters restart from zero with the master.
+/metrics needs METRICS_TOKEN (see config.py).
+
+Preload and fork
+----------------
+preload_app imports wsgi.py once in the master: config, modules and the slot tables for the
+booking horizon are built before the fork and shared copy-on-write. Threads and sockets are not
+fork-safe, so post_fork calls app.reinit_after_fork() in each worker. It opens a new Mews
+connection pool, restarts the log and trace export threads and runs the warm-up (catalog
+priming); /intense_experience-api/ready reports 503 until that is done.
+
+Graceful restarts
+-----------------
+On SIGTERM or SIGHUP (deploys, slot swaps) a worker stops accepting connections and finishes its
+in-flight requests for up to graceful_timeout seconds. This covers create-customer ->
+create-reservation -> payment-request checkouts, which are single Mews calls each.
+With preload_app a SIGHUP restarts the workers from the master's already-imported code: new code
+needs a full restart (what a deploy or slot swap does anyway).
+
+Environment overrides: PORT, WEB_CONCURRENCY (workers), GUNICORN_THREADS, GUNICORN_TIMEOUT,
+METRICS_MULTIPROC_DIR.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# wsgi.py defers the warm-up thread to post_fork when this is set
+os.environ["WARM_UP_AFTER_FORK"] = "1"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Shared by the workers for /metrics (metrics.py); set before preload imports config.py
+os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"ie-metrics-{os.environ.get('PORT', '8000')}"))
+
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+preload_app = True
+
+# gthread workers keep notifying the master while requests run, so this only catches a stuck
+# worker; slow Mews month views are not killed by it
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 60
+# Keep idle connections from the front end open across widget calls
+keepalive = 5
+
+errorlog = "-"
+loglevel = "info"
+
+
+def on_starting(server):
+    # Drop the values of the workers of a previous master
+    metrics_dir = os.environ["METRICS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.json*")):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    from app import reinit_after_fork
+    reinit_after_fork()
+    server.log.info(f"Worker {worker.pid} reinitialised after fork")
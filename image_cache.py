@@ -0,0 +1,288 @@
+"""
+Cached image URLs for the suite and option cards.
+
+SuiteSelector.vue and OptionsSelector.vue used to call /resource-category-images and
+/images/get-urls on every visit, i.e. two Mews round trips for image assignments and 400x300
+URLs that almost never change. Both are now kept in memory:
+
+- image URLs by (image id, width, height, resize mode), for IMAGE_URL_CACHE_TTL_SECONDS or until
+  IMAGE_URL_EXPIRY_MARGIN_SECONDS before the expiry carried by a signed URL, whichever is sooner
+- image assignments by resource category, for IMAGE_URL_CACHE_TTL_SECONDS
+
+Each cache holds at most IMAGE_CACHE_MAX_ENTRIES entries (least recently used dropped first, expired
+ones purged whenever new entries are stored), and /images/resolve only accepts the sizes of
+IMAGE_ALLOWED_SIZES, so client-chosen IDs and sizes cannot grow the memory without bound.
+
+Concurrent requests share their Mews calls: a key another request is already fetching is waited
+for instead of being requested again, and the keys nobody is fetching go to Mews in one batch.
+resolve_images() backs the combined /images/resolve route, which turns category or product IDs
+into final URLs in one round trip from the browser.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from urllib.parse import parse_qsl, urlsplit
+
+from catalog_cache import fetch_products
+from config import (
+    ENTERPRISE_ID,
+    IMAGE_URL_CACHE_TTL_SECONDS,
+    IMAGE_URL_EXPIRY_MARGIN_SECONDS,
+    IMAGE_FETCH_WAIT_SECONDS,
+    IMAGE_CACHE_MAX_ENTRIES
+)
+from local_time import parse_iso_epoch
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Marks a key whose fetch failed (the waiting requests fail too, nothing is cached)
+_FAILED = object()
+
+
+class _SharedCache:
+    """
+    Values by key with an expiry per entry; a key being fetched is awaited, not fetched twice.
+    At most max_entries are kept, least recently used dropped first.
+    """
+
+    def __init__(self, name, max_entries=IMAGE_CACHE_MAX_ENTRIES):
+        self.name = name
+        self.max_entries = max_entries
+        # {key: (expires_at_monotonic, value)}, least recently used first
+        self.entries = OrderedDict()
+        # {key: Future} of the keys a request is fetching
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get_many(self, keys, fetch):
+        """
+        Look up keys, fetching the missing ones in one call.
+
+        Args:
+            keys: keys wanted (duplicates are looked up once)
+            fetch: function(list of keys) returning {key: (value, expires_at_monotonic)}, or None
+                when the Mews call failed; only called with keys neither cached nor being fetched
+
+        Returns:
+            dict: {key: value} (keys Mews returned nothing for are left out), or None if a fetch
+                this lookup depends on failed
+        """
+        now = time.monotonic()
+        found, waiting, claimed = {}, {}, {}
+        with self.lock:
+            for key in dict.fromkeys(keys):
+                entry = self.entries.get(key)
+                if entry is not None and entry[0] > now:
+                    found[key] = entry[1]
+                    self.entries.move_to_end(key)
+                elif key in self.in_flight:
+                    waiting[key] = self.in_flight[key]
+                else:
+                    claimed[key] = self.in_flight[key] = Future()
+        CACHE_LOOKUPS.inc(len(found), cache=self.name, result="hit")
+        CACHE_LOOKUPS.inc(len(waiting) + len(claimed), cache=self.name, result="miss")
+
+        failed = False
+        if claimed:
+            fetched = None
+            try:
+                fetched = fetch(list(claimed))
+            finally:
+                # Always resolve the futures, or the requests waiting on them would hang
+                with self.lock:
+                    for key in claimed:
+                        self.in_flight.pop(key, None)
+                        if fetched is not None and key in fetched:
+                            value, expires_at = fetched[key]
+                            self.entries[key] = (expires_at, value)
+                            self.entries.move_to_end(key)
+                    if fetched:
+                        self._evict(time.monotonic())
+                for key, future in claimed.items():
+                    if fetched is None:
+                        future.set_result(_FAILED)
+                    else:
+                        future.set_result(fetched[key][0] if key in fetched else None)
+            if fetched is None:
+                failed = True
+            else:
+                found.update((key, fetched[key][0]) for key in claimed if key in fetched)
+
+        for key, future in waiting.items():
+            try:
+                value = future.result(timeout=IMAGE_FETCH_WAIT_SECONDS)
+            except FutureTimeoutError:
+                value = _FAILED
+            if value is _FAILED:
+                failed = True
+            elif value is not None:
+                found[key] = value
+
+        return None if failed else found
+
+    def _evict(self, now):
+        """Drop expired entries, then the least recently used ones above max_entries (lock held)."""
+        for key in [key for key, entry in self.entries.items() if entry[0] <= now]:
+            del self.entries[key]
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def reinit_after_fork(self):
+        self.lock = threading.Lock()
+        self.in_flight.clear()
+
+
+_IMAGE_URLS = _SharedCache("image_url")
+_CATEGORY_ASSIGNMENTS = _SharedCache("image_assignments")
+
+
+def url_expires_at(url, now_monotonic):
+    """
+    Monotonic time until which a URL may be served: the cache TTL, shortened for signed URLs
+    carrying their expiry (Expires/exp as epoch seconds, se as ISO time).
+    """
+    expires_at = now_monotonic + IMAGE_URL_CACHE_TTL_SECONDS
+    try:
+        params = {name.lower(): value for name, value in parse_qsl(urlsplit(url).query)}
+    except (AttributeError, TypeError, ValueError):
+        return expires_at
+    try:
+        if "expires" in params or "exp" in params:
+            expiry_epoch = float(params.get("expires") or params["exp"])
+        elif "se" in params:
+            expiry_epoch = parse_iso_epoch(params["se"])
+        else:
+            return expires_at
+    except (TypeError, ValueError):
+        return expires_at
+    remaining = expiry_epoch - time.time() - IMAGE_URL_EXPIRY_MARGIN_SECONDS
+    return min(expires_at, now_monotonic + remaining)
+
+
+def get_image_urls(make_mews_request_func, image_ids, width, height, resize_mode):
+    """
+    Image URL entries ({"ImageId", "Url"} as returned by images/getUrls) for the given images.
+
+    Returns:
+        list: one entry per requested ID, in request order (IDs without a URL are left out),
+            or None when Mews could not be reached
+    """
+    def fetch(keys):
+        payload = {
+            "Client": "Intense Experience Booking",
+            "Images": [{"ImageId": image_id, "Width": w, "Height": h, "ResizeMode": mode}
+                       for image_id, w, h, mode in keys]
+        }
+        result = make_mews_request_func("images/getUrls", payload)
+        if not result or "ImageUrls" not in result:
+            return None
+        # ImageUrls carry the image ID but not the size: the same image asked at two sizes is
+        # matched by order among the keys of that image
+        keys_by_image = {}
+        for key in keys:
+            keys_by_image.setdefault(key[0], []).append(key)
+        now = time.monotonic()
+        fetched = {}
+        for image_url in result["ImageUrls"]:
+            pending = keys_by_image.get(image_url.get("ImageId"))
+            if not pending:
+                continue
+            key = pending.pop(0)
+            if image_url.get("Url"):
+                fetched[key] = (image_url, url_expires_at(image_url["Url"], now))
+        return fetched
+
+    keys = [(image_id, width, height, resize_mode) for image_id in image_ids]
+    urls = _IMAGE_URLS.get_many(keys, fetch)
+    if urls is None:
+        return None
+    return [urls[key] for key in keys if key in urls]
+
+
+def get_category_image_assignments(make_mews_request_func, category_ids):
+    """
+    Image assignments (resourceCategoryImageAssignments/getAll) of the given resource categories.
+
+    Returns:
+        list: the assignments, grouped by category in request order, or None when Mews could not be reached
+    """
+    def fetch(keys):
+        payload = {
+            "Client": "Intense Experience Booking",
+            "ResourceCategoryIds": keys,
+            "EnterpriseIds": [ENTERPRISE_ID],
+            "Limitation": {"Count": 100}
+        }
+        result = make_mews_request_func("resourceCategoryImageAssignments/getAll", payload)
+        if not result or "ResourceCategoryImageAssignments" not in result:
+            return None
+        expires_at = time.monotonic() + IMAGE_URL_CACHE_TTL_SECONDS
+        # Categories without images are cached too (as an empty list)
+        fetched = {category_id: ([], expires_at) for category_id in keys}
+        for assignment in result["ResourceCategoryImageAssignments"]:
+            if assignment.get("CategoryId") in fetched:
+                fetched[assignment["CategoryId"]][0].append(assignment)
+        return fetched
+
+    assignments = _CATEGORY_ASSIGNMENTS.get_many(category_ids, fetch)
+    if assignments is None:
+        return None
+    return [assignment for category_id in dict.fromkeys(category_ids) for assignment in assignments.get(category_id, [])]
+
+
+def resolve_images(make_mews_request_func, category_ids, product_ids, width, height, resize_mode):
+    """
+    Final image URLs of resource categories and products, for the combined /images/resolve route.
+
+    Args:
+        category_ids: resource category (suite) IDs; their images are ordered by assignment Ordering
+        product_ids: product IDs; their images follow the product's ImageIds
+        width, height, resize_mode: size passed to images/getUrls
+
+    Returns:
+        dict: {"category_images": {id: [url, ...]}, "product_images": {id: [url, ...]}}, or None
+            when Mews could not be reached
+    """
+    image_ids_by_category = {}
+    if category_ids:
+        assignments = get_category_image_assignments(make_mews_request_func, category_ids)
+        if assignments is None:
+            return None
+        for assignment in sorted(assignments, key=lambda a: a.get("Ordering") or 0):
+            image_ids_by_category.setdefault(assignment["CategoryId"], []).append(assignment["ImageId"])
+
+    image_ids_by_product = {}
+    if product_ids:
+        products = fetch_products(make_mews_request_func)
+        if not products or "Products" not in products:
+            return None
+        wanted = set(product_ids)
+        image_ids_by_product = {product["Id"]: list(product.get("ImageIds") or [])
+                                for product in products["Products"] if product.get("Id") in wanted}
+
+    # One images/getUrls call for the categories and products together
+    image_ids = [image_id for ids in (*image_ids_by_category.values(), *image_ids_by_product.values()) for image_id in ids]
+    urls = {}
+    if image_ids:
+        entries = get_image_urls(make_mews_request_func, image_ids, width, height, resize_mode)
+        if entries is None:
+            return None
+        urls = {entry["ImageId"]: entry["Url"] for entry in entries}
+
+    def to_urls(ids_by_owner, owner_ids):
+        return {owner_id: [urls[image_id] for image_id in ids_by_owner.get(owner_id, []) if image_id in urls]
+                for owner_id in dict.fromkeys(owner_ids)}
+
+    return {
+        "category_images": to_urls(image_ids_by_category, category_ids),
+        "product_images": to_urls(image_ids_by_product, product_ids)
+    }
+
+
+def reinit_after_fork():
+    """Fresh locks in a forked worker (fetches in flight in the master never finish here)."""
+    _IMAGE_URLS.reinit_after_fork()
+    _CATEGORY_ASSIGNMENTS.reinit_after_fork()
@@ -5,6 +5,8 @@ import logging
 import requests
 from datetime import datetime, timedelta, timezone
 import uuid
+import time
+import contextvars
 import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import pytz
@@ -12,10 +14,38 @@ import unicodedata
 from bulk_availability import (
     check_bulk_availability_journee, 
     check_bulk_availability_nuitee,
+    check_bulk_time_options,
     get_resource_ids_for_suites,
     get_resource_blocks,
-    check_resource_block_conflict
+    check_resource_block_conflict,
+    check_resource_block_conflict_ts,
+    parse_resource_blocks,
+    category_index,
+    parse_reservations,
+    BELGIAN_TZ
 )
+from catalog_cache import (
+    fetch_services,
+    fetch_resource_categories,
+    fetch_products,
+    fetch_rates,
+    fetch_age_categories
+)
+from warmup import get_warm_up_status
+from mews_cassette import cassette_from_config
+from local_time import local_to_epoch, epoch_to_local, epoch_to_utc_iso, parse_iso_epoch
+from metrics import MEWS_REQUEST_DURATION, MEWS_ERRORS
+from tracing import span, traced, set_attributes, SPAN_KIND_CLIENT
+from logging_setup import configure_logging
+from responses import json_response
+from availability_versions import view_key, versioned_availability, invalidate_dates
+from image_cache import (
+    get_category_image_assignments,
+    get_image_urls as get_cached_image_urls,
+    resolve_images
+)
+from price_calendar import get_range_pricing, journee_rate_for_day, month_prices
+from prefetch import UPSTREAM_BUDGET, cached_compute, schedule_adjacent_months, invalidate_dates as invalidate_prefetched_dates
 
 # Import all configuration from shared config file
 from config import (
@@ -47,14 +77,21 @@ from config import (
     EARLY_CHECK_IN_HOUR,
     LATE_CHECK_OUT_HOUR,
     SUITE_ID_MAPPING,
-    SUITE_ID_MAPPING_REVERSE
+    SUITE_ID_MAPPING_REVERSE,
+    MEWS_POOL_MAXSIZE,
+    IMAGE_DEFAULT_WIDTH,
+    IMAGE_DEFAULT_HEIGHT,
+    IMAGE_DEFAULT_RESIZE_MODE,
+    IMAGE_ALLOWED_SIZES,
+    BUILDING_CATEGORY_ID,
+    BOOKING_HORIZON_DAYS,
+    ALTERNATIVES_WINDOW_DAYS,
+    ALTERNATIVES_DEFAULT_LIMIT,
+    ALTERNATIVES_MAX_LIMIT
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (queued JSON/text output, per-module levels, see logging_setup.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -67,30 +104,79 @@ intense_experience_bp = Blueprint('intense_experience', __name__)
 CLIENT_TOKEN = os.getenv('ClientToken')
 ACCESS_TOKEN = os.getenv('AccessToken')
 
+# Optional callable(endpoint) notified of every Mews call made in the current context
+# (set by load_replay.py to count upstream calls per simulated user session)
+MEWS_CALL_LISTENER = contextvars.ContextVar("mews_call_listener", default=None)
+
+def _new_mews_session():
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=MEWS_POOL_MAXSIZE))
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=MEWS_POOL_MAXSIZE))
+    return session
+
+# Pooled session so concurrent chunk requests reuse TLS connections to Mews
+MEWS_SESSION = _new_mews_session()
+
+def reset_mews_session():
+    """Replace the pooled session (after a fork, so workers never share the master's sockets)"""
+    global MEWS_SESSION
+    MEWS_SESSION = _new_mews_session()
+
+# Record/replay of Mews calls, selected by MEWS_CASSETTE_MODE (both None for live calls)
+MEWS_CASSETTE_RECORDER, MEWS_CASSETTE_PLAYER = cassette_from_config()
+
 def make_mews_request(endpoint, payload):
-    """Make a request to Mews API"""
+    """Make a request to Mews API (or to the cassette, see mews_cassette.py)"""
+    call_listener = MEWS_CALL_LISTENER.get()
+    if call_listener is not None:
+        call_listener(endpoint)
+
+    with span(f"mews {endpoint}", kind=SPAN_KIND_CLIENT, **{"mews.endpoint": endpoint}) as mews_span:
+        # Replay mode: answer from the recorded cassette, no network involved
+        if MEWS_CASSETTE_PLAYER is not None:
+            mews_span.set_attribute("mews.cassette", "replay")
+            return MEWS_CASSETTE_PLAYER.play(endpoint, payload)
+
+        payload.update({
+            "ClientToken": CLIENT_TOKEN,
+            "AccessToken": ACCESS_TOKEN
+        })
+
+        # Prefetch calls wait here while request calls are in flight (prefetch.py)
+        with UPSTREAM_BUDGET.slot():
+            started = time.perf_counter()
+            response_json = _post_to_mews(endpoint, payload)
+            elapsed = time.perf_counter() - started
+        MEWS_REQUEST_DURATION.observe(elapsed, endpoint=endpoint, outcome="ok" if response_json is not None else "error")
+        if response_json is None:
+            mews_span.set_error("Mews request failed")
+        if MEWS_CASSETTE_RECORDER is not None:
+            MEWS_CASSETTE_RECORDER.record(endpoint, payload, response_json, elapsed)
+        return response_json
+
+def _post_to_mews(endpoint, payload):
+    """POST a payload (tokens included) to a Mews endpoint; returns the JSON body or None on failure"""
     url = f"{MEWS_API_BASE_URL}/{endpoint}"
-    payload.update({
-        "ClientToken": CLIENT_TOKEN,
-        "AccessToken": ACCESS_TOKEN
-    })
 
     try:
         #logger.debug(f"Making request to: {url}")
         #logger.debug(f"Request payload: {payload}")
         
-        response = requests.post(url, json=payload)
+        response = MEWS_SESSION.post(url, json=payload)
         
         #logger.debug(f"Response status code: {response.status_code}")
         #logger.debug(f"Response headers: {dict(response.headers)}")
         
+        set_attributes({"http.status_code": response.status_code, "http.response_bytes": len(response.content)})
+
         # Try to get response body even on error
-        try:
-            response_json = response.json()
-            #logger.debug(f"Response body: {response_json}")
-        except:
-            #logger.debug(f"Response text: {response.text}")
-            response_json = None
+        with span("mews.decode_json"):
+            try:
+                response_json = response.json()
+                #logger.debug(f"Response body: {response_json}")
+            except:
+                #logger.debug(f"Response text: {response.text}")
+                response_json = None
         
         response.raise_for_status()
         return response_json
@@ -98,15 +184,31 @@ def make_mews_request(endpoint, payload):
         logger.error(f"Mews API HTTP error: {e}")
         logger.error(f"Status code: {response.status_code}")
         logger.error(f"Response: {response.text}")
+        if response.status_code == 429:
+            reason = "http_429"
+        elif response.status_code >= 500:
+            reason = "http_5xx"
+        else:
+            reason = "http_4xx"
+        MEWS_ERRORS.inc(endpoint=endpoint, reason=reason)
         return None
     except requests.exceptions.RequestException as e:
         logger.error(f"Mews API request error: {e}")
+        MEWS_ERRORS.inc(endpoint=endpoint, reason="network")
         return None
 
-@intense_experience_bp.route('/intense_experience-api/services', methods=['GET'])
-def get_services():
-    """Get available services (day/night)"""
-    result = make_mews_request("services/getAll", {})
+@intense_experience_bp.route('/intense_experience-api/ready', methods=['GET'])
+def readiness():
+    """Report whether the warm-up has completed (503 until then, for slot-swap health checks)"""
+    status = get_warm_up_status()
+    return jsonify({**status, "status": "ready" if status["ready"] else "warming_up"}), (200 if status["ready"] else 503)
+
+# The GET catalog/config routes below are also embedded in index.html by bootstrap.py, so each one
+# builds its body in a function: a dict, or (error_dict, status_code) like the bulk engines
+
+def build_services_response(make_mews_request_func):
+    """Body of /services: the reservable journée and nuitée services"""
+    result = fetch_services(make_mews_request_func)
 
     if result and "Services" in result:
         # Filter to only show NUITEE and JOURNEE services
@@ -114,26 +216,17 @@ def get_services():
                    if s.get("Type") == "Reservable" and
                    s.get("Id") in [DAY_SERVICE_ID, NIGHT_SERVICE_ID]]
 
-        return jsonify({"services": services, "status": "success"})
+        return {"services": services, "status": "success"}
 
     logger.error("Failed to fetch services or no services in response")
-    return jsonify({"error": "Failed to fetch services", "status": "error"}), 500
+    return {"error": "Failed to fetch services", "status": "error"}, 500
 
-@intense_experience_bp.route('/intense_experience-api/suites', methods=['GET'])
-def get_suites():
-    """Get available suites for a service"""
-    service_id = request.args.get('service_id')
+def build_suites_response(make_mews_request_func, service_id):
+    """Body of /suites?service_id=...: the bookable categories of a service"""
     if not service_id:
-        return jsonify({"error": "Service ID required", "status": "error"}), 400
-
-    payload = {
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "ServiceIds": [service_id],
-        "IncludeDefault": False,
-        "Limitation": {"Count": 100}
-    }
+        return {"error": "Service ID required", "status": "error"}, 400
 
-    result = make_mews_request("resourceCategories/getAll", payload)
+    result = fetch_resource_categories(make_mews_request_func, [service_id])
     if result and "ResourceCategories" in result:
         # Helper to check category name (case- and accent-insensitive)
         def is_excluded_category(cat):
@@ -164,42 +257,148 @@ def get_suites():
             suites = [cat for cat in result["ResourceCategories"]
                      if cat.get("IsActive")
                      and is_included_category(cat, False)]
-        return jsonify({"suites": suites, "status": "success"})
-    return jsonify({"error": "Failed to fetch suites", "status": "error"}), 500
+        return {"suites": suites, "status": "success"}
+    return {"error": "Failed to fetch suites", "status": "error"}, 500
 
-@intense_experience_bp.route('/intense_experience-api/suite-id-mapping', methods=['GET'])
-def get_suite_id_mapping():
-    """Get suite ID mapping between day and night services"""
-    return jsonify({
+def build_suite_id_mapping_response():
+    """Body of /suite-id-mapping"""
+    return {
         "mapping": SUITE_ID_MAPPING,
         "reverse_mapping": SUITE_ID_MAPPING_REVERSE,
         "status": "success"
-    })
+    }
+
+@intense_experience_bp.route('/intense_experience-api/services', methods=['GET'])
+def get_services():
+    """Get available services (day/night)"""
+    result = build_services_response(make_mews_request)
+    if isinstance(result, tuple):
+        return jsonify(result[0]), result[1]
+    return jsonify(result)
+
+@intense_experience_bp.route('/intense_experience-api/suites', methods=['GET'])
+def get_suites():
+    """Get available suites for a service"""
+    result = build_suites_response(make_mews_request, request.args.get('service_id'))
+    if isinstance(result, tuple):
+        return jsonify(result[0]), result[1]
+    return jsonify(result)
+
+@intense_experience_bp.route('/intense_experience-api/suite-id-mapping', methods=['GET'])
+def get_suite_id_mapping():
+    """Get suite ID mapping between day and night services"""
+    return jsonify(build_suite_id_mapping_response())
 
 @intense_experience_bp.route('/intense_experience-api/bulk-availability-journee', methods=['POST'])
 def bulk_availability_journee_route():
     """Check availability for day bookings (journée) - shows date as unavailable if no valid time slots remain"""
     data = request.json
-    result = check_bulk_availability_journee(make_mews_request, data)
+    # ?format=bitmask: one integer per suite and date over a shared slot table instead of slot dicts
+    bitmask = request.args.get('format') == 'bitmask'
+    key = view_key("journee", data, 'bitmask' if bitmask else None)
+    compute = cached_compute(key, lambda body: check_bulk_availability_journee(make_mews_request, body, bitmask=bitmask))
+    # With data["since"] (the "digests" of a previous response) only changed dates are returned (availability_versions.py)
+    result = versioned_availability(key, data, compute)
     if isinstance(result, tuple):
         # Error case: (error_dict, status_code)
         return jsonify(result[0]), result[1]
-    return jsonify(result)
+    # Compute the previous and next calendar months in the background (prefetch.py)
+    schedule_adjacent_months(key, "journee", data, compute, datetime.now(BELGIAN_TZ).date())
+    # Compressed JSON (responses.py), without ETag: the "since" deltas replace revalidation
+    return json_response(result, etag=False)
     
 
 @intense_experience_bp.route('/intense_experience-api/bulk-availability-nuitee', methods=['POST'])
 def bulk_availability_nuitee_route():
     """Check availability for multiple dates displayed in calendar, chunked into 4-day periods"""
     data = request.json
-    result = check_bulk_availability_nuitee(make_mews_request, data)
+    if data.get('include_stays'):
+        # Stays span several dates and are always recomputed in full
+        result = check_bulk_availability_nuitee(make_mews_request, data)
+    else:
+        key = view_key("nuitee", data)
+        compute = cached_compute(key, lambda body: check_bulk_availability_nuitee(make_mews_request, body))
+        # With data["since"] (the "digests" of a previous response) only changed dates are returned (availability_versions.py)
+        result = versioned_availability(key, data, compute)
+        if not isinstance(result, tuple):
+            # Compute the previous and next calendar months in the background (prefetch.py)
+            schedule_adjacent_months(key, "nuitee", data, compute, datetime.now(BELGIAN_TZ).date())
     if isinstance(result, tuple):
         # Error case: (error_dict, status_code)
         return jsonify(result[0]), result[1]
-    return jsonify(result)
+    # Compressed JSON (responses.py), without ETag: the "since" deltas replace revalidation
+    return json_response(result, etag=False)
     
 
 
+# Building blocks of /availability, shared with the /suite-cards route
+
+def fetch_availability_reservations(make_mews_request_func, start_dt, end_dt, booking_type):
+    """
+    Reservations of both services (for cross-service suite matching) around a stay, widened by the
+    cleaning buffer: before and after a night, after a day.
+
+    Returns:
+        dict: the reservations/getAll response, or None when Mews could not be reached
+    """
+    if booking_type == 'night':
+        # For nights: add buffer before and after
+        buffered_start = (start_dt - timedelta(hours=CLEANING_BUFFER_HOURS)).isoformat()
+        buffered_end = (end_dt + timedelta(hours=CLEANING_BUFFER_HOURS)).isoformat()
+    else:
+        # For days: add buffer after
+        buffered_start = start_dt.isoformat()
+        buffered_end = (end_dt + timedelta(hours=CLEANING_BUFFER_HOURS)).isoformat()
+
+    payload = {
+        "Client": "Intense Experience Booking",
+        "StartUtc": buffered_start,
+        "EndUtc": buffered_end,
+        "ServiceIds": [DAY_SERVICE_ID, NIGHT_SERVICE_ID]
+    }
+    return make_mews_request_func("reservations/getAll", payload)
+
+def fetch_availability_resource_blocks(make_mews_request_func, start_dt, end_dt):
+    """Active resource blocks around a stay (active blocks list, empty when the fetch failed)"""
+    # Fetch resource blocks with a wide range to catch multi-day blocks
+    # Use 7 days before/after to ensure we catch any blocks that extend into our time slot
+    blocks_query_start = (start_dt - timedelta(days=7)).isoformat()
+    blocks_query_end = (end_dt + timedelta(days=7)).isoformat()
+    return get_resource_blocks(make_mews_request_func, blocks_query_start, blocks_query_end)
+
+def suite_ids_for_availability(suite_id, booking_type):
+    """Category IDs a suite's availability depends on: for day bookings of a mapped suite, also its night twin (AND rule)"""
+    suite_ids_to_check = [suite_id]
+    if booking_type == 'day':
+        # Check if this suite has a corresponding night suite ID
+        night_suite_id = SUITE_ID_MAPPING.get(suite_id)
+        if night_suite_id:
+            suite_ids_to_check.append(night_suite_id)
+            logger.info(f"Day booking for mapped suite - checking both IDs: {suite_id} and {night_suite_id}")
+    return suite_ids_to_check
+
+def find_reservation_conflicts(reservations, records, suite_ids_to_check, start_dt, end_dt):
+    """
+    Reservations of the given categories overlapping a stay.
+
+    Args:
+        reservations: Mews reservations
+        records: parse_reservations(reservations), parsed once per response
+        suite_ids_to_check: suite_ids_for_availability() of the suite
+
+    Returns:
+        list: the conflicting Mews reservations
+    """
+    # Compare compact records (epoch seconds) against the suite IDs we need to check
+    categories_to_check = {category_index(sid) for sid in suite_ids_to_check}
+    start_ts = int(start_dt.timestamp())
+    end_ts = int(end_dt.timestamp())
+    # Check for overlap: new booking WITHOUT buffer vs existing reservation WITH buffer
+    return [reservations[record.source_index] for record in records
+            if record.category in categories_to_check and record.conflicts_with(start_ts, end_ts)]
+
 @intense_experience_bp.route('/intense_experience-api/availability', methods=['POST'])
+@traced("check_availability")
 def check_availability():
     """Check availability for a date range with cleaning buffers - considers both services for cross-service suite matching"""
     data = request.json
@@ -224,24 +423,7 @@ def check_availability():
     start_dt_brussels = start_dt.astimezone(brussels_tz)
     end_dt_brussels = end_dt.astimezone(brussels_tz)
 
-    if booking_type == 'night':
-        # For nights: add buffer before and after
-        buffered_start = (start_dt - timedelta(hours=CLEANING_BUFFER_HOURS)).isoformat()
-        buffered_end = (end_dt + timedelta(hours=CLEANING_BUFFER_HOURS)).isoformat()
-    else:
-        # For days: add buffer after
-        buffered_start = start_dt.isoformat()
-        buffered_end = (end_dt + timedelta(hours=CLEANING_BUFFER_HOURS)).isoformat()
-
-    # Fetch reservations from both services to handle cross-service suite matching
-    payload = {
-        "Client": "Intense Experience Booking",
-        "StartUtc": buffered_start,
-        "EndUtc": buffered_end,
-        "ServiceIds": [DAY_SERVICE_ID, NIGHT_SERVICE_ID]
-    }
-
-    result = make_mews_request("reservations/getAll", payload)
+    result = fetch_availability_reservations(make_mews_request, start_dt, end_dt, booking_type)
     if result is None:
         logger.error("Failed to get reservations from Mews API")
         return jsonify({"error": "Failed to check availability", "status": "error"}), 500
@@ -251,54 +433,26 @@ def check_availability():
     conflicting_reservations = []
 
     # Determine which suite IDs to check based on mapping (AND rule for day bookings)
-    suite_ids_to_check = []
-    if suite_id:
-        suite_ids_to_check.append(suite_id)
-        
-        # For day bookings with a mapped suite, check BOTH day and night IDs (AND rule)
-        if booking_type == 'day':
-            # Check if this suite has a corresponding night suite ID
-            night_suite_id = SUITE_ID_MAPPING.get(suite_id)
-            if night_suite_id:
-                suite_ids_to_check.append(night_suite_id)
-                logger.info(f"Day booking for mapped suite - checking both IDs: {suite_id} and {night_suite_id}")
+    suite_ids_to_check = suite_ids_for_availability(suite_id, booking_type) if suite_id else []
 
     if "Reservations" in result:
-        for reservation in result["Reservations"]:
-            res_requested_category = reservation.get('RequestedCategoryId')
-
-            if suite_ids_to_check:
-                # Check if reservation conflicts with any of the suite IDs we need to check
-                if res_requested_category in suite_ids_to_check:
-                    # Apply buffer to existing reservation times (1 hour before and 1 hour after)
-                    res_start_utc = datetime.fromisoformat(reservation.get('StartUtc', '').replace('Z', '+00:00'))
-                    res_end_utc = datetime.fromisoformat(reservation.get('EndUtc', '').replace('Z', '+00:00'))
-                    
-                    # Convert to Brussels timezone for comparison
-                    res_start = res_start_utc.astimezone(brussels_tz)
-                    res_end = res_end_utc.astimezone(brussels_tz)
-                    
-                    # Apply buffer to existing reservations (1 hour before and 1 hour after)
-                    res_start_buffered = res_start - timedelta(hours=CLEANING_BUFFER_HOURS)
-                    res_end_buffered = res_end + timedelta(hours=CLEANING_BUFFER_HOURS)
-                    
-                    # Check for overlap: new booking WITHOUT buffer vs existing reservation WITH buffer
-                    if not (end_dt_brussels <= res_start_buffered or start_dt_brussels >= res_end_buffered):
-                        conflicting_reservations.append(reservation)
-                        is_available = False
-            else:
-                # General availability check - any reservation blocks the time
-                conflicting_reservations.append(reservation)
+        reservations = result["Reservations"]
+        if suite_ids_to_check:
+            conflicting_reservations = find_reservation_conflicts(
+                reservations, parse_reservations(reservations), suite_ids_to_check, start_dt, end_dt
+            )
+            if conflicting_reservations:
+                is_available = False
+        else:
+            # General availability check - any reservation blocks the time
+            conflicting_reservations.extend(reservations)
+            if reservations:
                 is_available = False
 
     # Also check for resource block conflicts (if still available after reservation check)
     has_resource_block_conflict = False
     if is_available and suite_ids_to_check:
-        # Fetch resource blocks with a wide range to catch multi-day blocks
-        # Use 7 days before/after to ensure we catch any blocks that extend into our time slot
-        blocks_query_start = (start_dt - timedelta(days=7)).isoformat()
-        blocks_query_end = (end_dt + timedelta(days=7)).isoformat()
-        resource_blocks = get_resource_blocks(make_mews_request, blocks_query_start, blocks_query_end)
+        resource_blocks = fetch_availability_resource_blocks(make_mews_request, start_dt, end_dt)
         
         # Get all resource IDs for the suite categories we need to check (using static mapping)
         resource_ids_to_check = get_resource_ids_for_suites(suite_ids_to_check)
@@ -318,62 +472,383 @@ def check_availability():
         "status": "success"
     })
 
-@intense_experience_bp.route('/intense_experience-api/pricing', methods=['POST'])
-def get_pricing():
-    """Get pricing for a date range"""
-    data = request.json
-    rate_id = data.get('rate_id')
+def build_suite_cards_response(make_mews_request_func, data):
+    """
+    Body of /suite-cards: every suite of a service with its images, availability and price for a stay.
+
+    SuiteSelector.vue used to chain /suites, /resource-category-images, /images/get-urls, one
+    /availability per suite and /pricing. Here the reservations, resource blocks and pricing are
+    fetched concurrently while the suites and their images are resolved (mostly from memory, see
+    catalog_cache.py and image_cache.py), and the availability of every suite is checked against
+    the one reservations/getAll response with the same rules as /availability.
+
+    Args:
+        data: {"service_id", "start_date", "end_date", "booking_type"} - without dates the suites
+            are returned unavailable and without price, as the widget shows them before a selection
+
+    Returns:
+        dict: {"suites": [{"suite", "available", "has_resource_block_conflict", "images",
+            "pricing"}], "currency", "status"}, or (error_dict, status)
+    """
+    service_id = data.get('service_id')
     start_date = data.get('start_date')
     end_date = data.get('end_date')
-    suite_id = data.get('suite_id')
+    booking_type = data.get('booking_type') or ('day' if service_id == DAY_SERVICE_ID else 'night')
 
-    logger.info("=" * 80)
-    logger.info("PRICING REQUEST RECEIVED")
-    logger.info("=" * 80)
-    logger.info(f"Rate ID: {rate_id}")
-    logger.info(f"Start Date: {start_date}")
-    logger.info(f"End Date: {end_date}")
-    logger.info(f"Suite ID: {suite_id}")
+    if service_id not in (DAY_SERVICE_ID, NIGHT_SERVICE_ID):
+        return {"error": "Unknown service_id", "status": "error"}, 400
 
-    if not all([rate_id, start_date, end_date]):
-        return jsonify({"error": "Missing required parameters", "status": "error"}), 400
+    has_dates = bool(start_date and end_date)
+    if has_dates:
+        try:
+            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            return {"error": "Invalid start_date or end_date", "status": "error"}, 400
+        # Same rate choice as BookingWidget.getRateId: weekend rate for journées starting on Saturday or Sunday
+        if booking_type == 'night':
+            rate_id = RATE_ID_NUITEE
+        else:
+            rate_id = journee_rate_for_day(epoch_to_local(int(start_dt.timestamp()))[0])
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="suite-cards") as executor:
+        def submit(fn, *args):
+            # copy_context keeps the upstream calls in the request's trace
+            return executor.submit(contextvars.copy_context().run, fn, *args)
+
+        if has_dates:
+            reservations_future = submit(fetch_availability_reservations, make_mews_request_func, start_dt, end_dt, booking_type)
+            blocks_future = submit(fetch_availability_resource_blocks, make_mews_request_func, start_dt, end_dt)
+            pricing_future = submit(fetch_pricing, make_mews_request_func, rate_id, start_date, end_date)
+
+        suites = build_suites_response(make_mews_request_func, service_id)
+        if isinstance(suites, tuple):
+            return suites
+        suites = suites["suites"]
+        suite_ids = [suite["Id"] for suite in suites]
+
+        images = resolve_images(make_mews_request_func, suite_ids, [], IMAGE_DEFAULT_WIDTH, IMAGE_DEFAULT_HEIGHT, IMAGE_DEFAULT_RESIZE_MODE) if suite_ids else None
+        if images is None and suite_ids:
+            # Cards without images are still usable
+            logger.warning("Suite cards built without images")
+
+        if has_dates:
+            reservations_result = reservations_future.result()
+            resource_blocks = blocks_future.result()
+            pricing_result = pricing_future.result()
+
+    if has_dates and reservations_result is None:
+        logger.error("Failed to get reservations from Mews API")
+        return {"error": "Failed to check availability", "status": "error"}, 500
+
+    category_images = images["category_images"] if images else {}
+    prices = {}
+    currency = None
+    availability = {}
+    if has_dates:
+        if pricing_result and "CategoryPrices" in pricing_result:
+            prices = {category_price.get("CategoryId"): category_price for category_price in pricing_result["CategoryPrices"]}
+            currency = pricing_result.get("Currency")
+        else:
+            logger.warning("Suite cards built without pricing")
 
-    if rate_id == RATE_ID_NUITEE:
-        # Convert to timezone-aware datetimes
-        start_date_obj = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        end_date_obj = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        reservations = reservations_result.get("Reservations", [])
+        records = parse_reservations(reservations)
         brussels_tz = pytz.timezone(TIMEZONE)
+        start_dt_brussels = start_dt.astimezone(brussels_tz)
+        end_dt_brussels = end_dt.astimezone(brussels_tz)
+        for suite_id in suite_ids:
+            suite_ids_to_check = suite_ids_for_availability(suite_id, booking_type)
+            is_available = not find_reservation_conflicts(reservations, records, suite_ids_to_check, start_dt, end_dt)
+            has_resource_block_conflict = False
+            if is_available and check_resource_block_conflict(start_dt_brussels, end_dt_brussels, get_resource_ids_for_suites(suite_ids_to_check), resource_blocks):
+                is_available = False
+                has_resource_block_conflict = True
+            availability[suite_id] = (is_available, has_resource_block_conflict)
+
+    cards = [{
+        "suite": suite,
+        "available": availability.get(suite["Id"], (False, False))[0],
+        "has_resource_block_conflict": availability.get(suite["Id"], (False, False))[1],
+        "images": category_images.get(suite["Id"], []),
+        "pricing": prices.get(suite["Id"])
+    } for suite in suites]
+    logger.info("Suite cards built: %d suites, %d available", len(cards), sum(card['available'] for card in cards))
+    return {"suites": cards, "currency": currency, "status": "success"}
+
+@intense_experience_bp.route('/intense_experience-api/suite-cards', methods=['POST'])
+@traced("suite_cards")
+def get_suite_cards():
+    """
+    Get the suite cards of SuiteSelector.vue in one call (see build_suite_cards_response).
+
+    Expected JSON payload:
+    {
+        "service_id": "service_id",
+        "start_date": "2025-01-15T12:00:00Z",   // optional with end_date
+        "end_date": "2025-01-15T16:00:00Z",
+        "booking_type": "day" or "night"         // optional, derived from the service
+    }
+    """
+    result = build_suite_cards_response(make_mews_request, request.json or {})
+    if isinstance(result, tuple):
+        return jsonify(result[0]), result[1]
+    return jsonify(result)
+
+def build_alternatives_response(make_mews_request_func, data):
+    """
+    Body of /alternatives: the bookable stays nearest to a requested one, from one window fetch.
+
+    When /availability answers available: false the visitor used to go back to the calendar and
+    hunt for a slot by hand, one bulk request after the other. Here the reservations of the days
+    around the requested stay (ALTERNATIVES_WINDOW_DAYS on each side) are fetched in one
+    reservations/getAll call, together with the resource blocks, and two kinds of candidates are
+    checked against them:
+
+    - "other_suite": another suite of the service for the same times; for journées only suites
+      whose minimum duration (SPECIAL_MIN_DURATION_SUITES) allows the requested one
+    - "other_time": the same suite for the same duration at other times - the journée slots
+      (ARRIVAL_TIMES x DEPARTURE_TIMES) of the window, or the same nights moved by whole days
+
+    A candidate is free under the rules of /availability (cleaning buffer, AND rule of mapped
+    journée suites, resource blocks), and like in the calendar engines no building reservation
+    may overlap it. Past candidates and candidates beyond the booking horizon are left out.
+    Candidates are ranked by how far they move the stay, other suites first, then earliest first.
+
+    requested_available is what /availability answers for the requested stay itself: building
+    reservations are not applied and, for a journée, reservations ending before its start are not
+    seen (/availability only adds the cleaning buffer after a journée).
+
+    Args:
+        data: {"service_id", "suite_id", "start_date", "end_date", "booking_type" (optional,
+            derived from the service), "limit" (optional, ALTERNATIVES_DEFAULT_LIMIT)}
+
+    Returns:
+        dict: {"requested_available", "alternatives": [{"kind", "suite", "start_date",
+            "end_date", "shift_minutes"}], "status"}, or (error_dict, status)
+    """
+    service_id = data.get('service_id')
+    suite_id = data.get('suite_id')
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+    booking_type = data.get('booking_type') or ('day' if service_id == DAY_SERVICE_ID else 'night')
+    limit = data.get('limit', ALTERNATIVES_DEFAULT_LIMIT)
+
+    if service_id not in (DAY_SERVICE_ID, NIGHT_SERVICE_ID):
+        return {"error": "Unknown service_id", "status": "error"}, 400
+    if not all([suite_id, start_date, end_date]):
+        logger.error("Missing required parameters")
+        return {"error": "Missing required parameters", "status": "error"}, 400
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= ALTERNATIVES_MAX_LIMIT:
+        return {"error": f"limit must be between 1 and {ALTERNATIVES_MAX_LIMIT}", "status": "error"}, 400
+    try:
+        start_ts = parse_iso_epoch(start_date)
+        end_ts = parse_iso_epoch(end_date)
+    except (TypeError, ValueError):
+        return {"error": "Invalid start_date or end_date", "status": "error"}, 400
+    if end_ts <= start_ts:
+        return {"error": "end_date must be after start_date", "status": "error"}, 400
+
+    start_day, start_hour, start_minute = epoch_to_local(start_ts)
+    end_day, end_hour, end_minute = epoch_to_local(end_ts)
+    window_days = [start_day + timedelta(days=offset) for offset in range(-ALTERNATIVES_WINDOW_DAYS, ALTERNATIVES_WINDOW_DAYS + 1)]
+
+    def min_hours(candidate_suite_id):
+        return SPECIAL_MIN_HOURS if candidate_suite_id in SPECIAL_MIN_DURATION_SUITES else DAY_MIN_HOURS
+
+    # Same suite at other times: (start, end) epochs of the candidates
+    other_times = []
+    if booking_type == 'day':
+        if end_day != start_day:
+            return {"error": "A journée must end on the day it starts", "status": "error"}, 400
+        duration_minutes = (end_hour - start_hour) * 60 + end_minute - start_minute
+        duration_hours = duration_minutes / 60
+
+        def duration_allowed(candidate_suite_id):
+            return min_hours(candidate_suite_id) <= duration_hours <= DAY_MAX_HOURS
+
+        if duration_allowed(suite_id) and duration_minutes % 60 == 0:
+            for day in window_days:
+                for arrival_time in ARRIVAL_TIMES:
+                    arrival_hour, arrival_minute = (int(part) for part in arrival_time.split(':'))
+                    departure_hour = arrival_hour + duration_minutes // 60
+                    if f"{departure_hour:02d}:{arrival_minute:02d}" in DEPARTURE_TIMES:
+                        other_times.append((local_to_epoch(day, arrival_hour, arrival_minute),
+                                            local_to_epoch(day, departure_hour, arrival_minute)))
+    else:
+        nights = (end_day - start_day).days
+        if not 1 <= nights <= NIGHT_MAX_NIGHTS:
+            return {"error": f"A nuitée lasts 1 to {NIGHT_MAX_NIGHTS} nights", "status": "error"}, 400
+
+        def duration_allowed(candidate_suite_id):
+            return True
+
+        # Same nights moved by whole days, keeping the requested check-in and check-out hours
+        for day in window_days:
+            offset = day - start_day
+            other_times.append((local_to_epoch(day, start_hour, start_minute),
+                                local_to_epoch(end_day + offset, end_hour, end_minute)))
+
+    now_ts = int(time.time())
+    last_day = epoch_to_local(now_ts)[0] + timedelta(days=BOOKING_HORIZON_DAYS)
+    other_times = [(slot_start, slot_end) for slot_start, slot_end in other_times
+                   if slot_start != start_ts and slot_start >= now_ts and epoch_to_local(slot_start)[0] <= last_day]
+
+    # One window covering the requested stay and every candidate
+    window_start = min([start_ts] + [slot_start for slot_start, _ in other_times])
+    window_end = max([end_ts] + [slot_end for _, slot_end in other_times])
+    reservations_payload = {
+        "Client": "Intense Experience Booking",
+        "StartUtc": epoch_to_utc_iso(window_start - CLEANING_BUFFER_HOURS * 3600),
+        "EndUtc": epoch_to_utc_iso(window_end + CLEANING_BUFFER_HOURS * 3600),
+        "ServiceIds": [DAY_SERVICE_ID, NIGHT_SERVICE_ID]
+    }
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="alternatives") as executor:
+        # copy_context keeps the upstream calls in the request's trace
+        reservations_future = executor.submit(contextvars.copy_context().run, make_mews_request_func, "reservations/getAll", reservations_payload)
+        blocks_future = executor.submit(contextvars.copy_context().run, get_resource_blocks, make_mews_request_func,
+                                        epoch_to_utc_iso(window_start), epoch_to_utc_iso(window_end))
+
+        suites = build_suites_response(make_mews_request_func, service_id)
+        reservations_result = reservations_future.result()
+        resource_blocks = parse_resource_blocks(blocks_future.result())
+
+    if isinstance(suites, tuple):
+        return suites
+    suites = suites["suites"]
+    suite_order = {suite["Id"]: index for index, suite in enumerate(suites)}
+    if suite_id not in suite_order:
+        return {"error": f"Unknown suite_id {suite_id}", "status": "error"}, 400
+    if reservations_result is None:
+        logger.error("Failed to get reservations from Mews API")
+        return {"error": "Failed to check availability", "status": "error"}, 500
+
+    building_category = category_index(BUILDING_CATEGORY_ID) if BUILDING_CATEGORY_ID else None
+    records_by_category = {}
+    for record in parse_reservations(reservations_result.get("Reservations", [])):
+        records_by_category.setdefault(record.category, []).append(record)
+    building_records = records_by_category.pop(building_category, []) if building_category is not None else []
+
+    # {suite_id: (category indexes, resource IDs)} of the suites a candidate depends on (AND rule)
+    checked_ids = {}
+
+    def is_free(candidate_suite_id, slot_start, slot_end, as_availability=False):
+        if candidate_suite_id not in checked_ids:
+            suite_ids_to_check = suite_ids_for_availability(candidate_suite_id, booking_type)
+            checked_ids[candidate_suite_id] = ({category_index(sid) for sid in suite_ids_to_check},
+                                               get_resource_ids_for_suites(suite_ids_to_check))
+        categories, resource_ids = checked_ids[candidate_suite_id]
+        if not as_availability and any(record.conflicts_with(slot_start, slot_end) for record in building_records):
+            return False
+        # /availability fetches a journée's reservations from its start (fetch_availability_reservations)
+        seen_after = slot_start if as_availability and booking_type == 'day' else None
+        for category in categories:
+            if any(record.conflicts_with(slot_start, slot_end) and (seen_after is None or record.end > seen_after)
+                   for record in records_by_category.get(category, ())):
+                return False
+        return not check_resource_block_conflict_ts(slot_start, slot_end, resource_ids, resource_blocks)
+
+    candidates = [("other_time", suite_id, slot_start, slot_end) for slot_start, slot_end in other_times]
+    if start_ts >= now_ts:
+        candidates.extend(("other_suite", suite["Id"], start_ts, end_ts) for suite in suites
+                          if suite["Id"] != suite_id and duration_allowed(suite["Id"]))
+    # Nearest first; at equal distance other suites (same times), then the earlier stay
+    candidates.sort(key=lambda c: (abs(c[2] - start_ts), c[0] != "other_suite", c[2], suite_order[c[1]]))
+
+    suites_by_id = {suite["Id"]: suite for suite in suites}
+    alternatives = []
+    for kind, candidate_suite_id, slot_start, slot_end in candidates:
+        if len(alternatives) >= limit:
+            break
+        if is_free(candidate_suite_id, slot_start, slot_end):
+            alternatives.append({
+                "kind": kind,
+                "suite": suites_by_id[candidate_suite_id],
+                "start_date": epoch_to_utc_iso(slot_start),
+                "end_date": epoch_to_utc_iso(slot_end),
+                "shift_minutes": (slot_start - start_ts) // 60
+            })
+
+    requested_available = is_free(suite_id, start_ts, end_ts, as_availability=True)
+    set_attributes({"alternatives.candidates": len(candidates), "alternatives.found": len(alternatives)})
+    logger.info("Alternatives search completed - requested available: %s, %d alternatives from %d candidates",
+                requested_available, len(alternatives), len(candidates))
+    return {"requested_available": requested_available, "alternatives": alternatives, "status": "success"}
+
+@intense_experience_bp.route('/intense_experience-api/alternatives', methods=['POST'])
+@traced("alternatives")
+def get_alternatives():
+    """
+    Find the nearest bookable alternatives to an unavailable stay (see build_alternatives_response).
+
+    Expected JSON payload:
+    {
+        "service_id": "service_id",
+        "suite_id": "suite_id",
+        "start_date": "2025-01-15T12:00:00Z",
+        "end_date": "2025-01-15T16:00:00Z",
+        "booking_type": "day" or "night",   // optional, derived from the service
+        "limit": 5                           // optional
+    }
+    """
+    result = build_alternatives_response(make_mews_request, request.json or {})
+    if isinstance(result, tuple):
+        return jsonify(result[0]), result[1]
+    return jsonify(result)
+
+def fetch_pricing(make_mews_request_func, rate_id, start_date, end_date):
+    """
+    rates/getPricing of a rate for a stay (the /pricing route's lookup).
 
-        def to_time_unit_start_utc(dt):
+    Returns:
+        dict: the rates/getPricing response, or None when Mews could not be reached
+    """
+    if rate_id == RATE_ID_NUITEE:
+        def to_time_unit_start_utc(value):
             """Return Mews time-unit start in UTC for the local midnight of the date."""
-            local_dt = dt.astimezone(brussels_tz)
-            local_midnight = brussels_tz.localize(datetime.combine(local_dt.date(), datetime.min.time()))
-            utc_midnight = local_midnight.astimezone(timezone.utc).replace(microsecond=0)
-            return utc_midnight.isoformat().replace('+00:00', 'Z')
+            local_date, _, _ = epoch_to_local(parse_iso_epoch(value))
+            return epoch_to_utc_iso(local_to_epoch(local_date))
 
-        first_time_unit = to_time_unit_start_utc(start_date_obj)
-        last_time_unit = to_time_unit_start_utc(end_date_obj)
+        first_time_unit = to_time_unit_start_utc(start_date)
+        last_time_unit = to_time_unit_start_utc(end_date)
 
-        logger.info("PRICING: Nuitée detected - adjusting time units using timezone-aware midnight conversion")
-        logger.info(f"PRICING: Original start_date: {start_date}, adjusted UTC midnight: {first_time_unit}")
-        logger.info(f"PRICING: Original end_date: {end_date}, adjusted UTC midnight: {last_time_unit}")
+        logger.debug("Pricing (nuitée): time units moved to local midnight %s -> %s", first_time_unit, last_time_unit)
     else:
         # For day bookings, keep the original logic
         first_time_unit = start_date
         last_time_unit = end_date
-        logger.info(f"PRICING: Journée detected - using original time units")
+        logger.debug("Pricing (journée): original time units %s -> %s", first_time_unit, last_time_unit)
 
-    logger.info(f"PRICING: Final payload time units - FirstTimeUnitStartUtc: {first_time_unit}, LastTimeUnitStartUtc: {last_time_unit}")
+    # Answered from the cached price matrix when possible (price_calendar.py)
+    result = get_range_pricing(make_mews_request_func, rate_id, first_time_unit, last_time_unit)
+    if result is None:
+        payload = {
+            "EnterpriseIds": [ENTERPRISE_ID],
+            "Client": "Intense Experience Booking",
+            "RateId": rate_id,
+            "FirstTimeUnitStartUtc": first_time_unit,
+            "LastTimeUnitStartUtc": last_time_unit
+        }
+        result = make_mews_request_func("rates/getPricing", payload)
 
-    payload = {
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "Client": "Intense Experience Booking",
-        "RateId": rate_id,
-        "FirstTimeUnitStartUtc": first_time_unit,
-        "LastTimeUnitStartUtc": last_time_unit
-    }
+    return result
+
+@intense_experience_bp.route('/intense_experience-api/pricing', methods=['POST'])
+def get_pricing():
+    """Get pricing for a date range"""
+    data = request.json
+    rate_id = data.get('rate_id')
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+    suite_id = data.get('suite_id')
+
+    logger.info("Pricing request: rate %s, suite %s, %s -> %s", rate_id, suite_id, start_date, end_date)
 
-    result = make_mews_request("rates/getPricing", payload)
+    if not all([rate_id, start_date, end_date]):
+        return jsonify({"error": "Missing required parameters", "status": "error"}), 400
+
+    result = fetch_pricing(make_mews_request, rate_id, start_date, end_date)
     if result and "CategoryPrices" in result:
         # Find pricing for specific suite or return all
         if suite_id:
@@ -392,16 +867,47 @@ def get_pricing():
 
     return jsonify({"error": "Failed to fetch pricing", "status": "error"}), 500
 
+@intense_experience_bp.route('/intense_experience-api/price-calendar', methods=['GET'])
+def get_price_calendar():
+    """
+    Get the price of every date of a calendar month, to show prices on the calendar.
+
+    Query parameters:
+        service_id: journée or nuitée service
+        month: "YYYY-MM"
+        suite_id: only this suite's prices (optional)
+
+    Returns:
+        {"prices": {date: {suite_id: price}} (or {date: price} with suite_id), "unit": "hour" or
+        "night", "currency", "status": "success"} - journée dates carry the lowest hourly price
+        of the day at its weekday/weekend rate, nuitée dates the price of the night
+    """
+    service_id = request.args.get('service_id')
+    suite_id = request.args.get('suite_id')
+    month_param = request.args.get('month', '')
+
+    if service_id not in (DAY_SERVICE_ID, NIGHT_SERVICE_ID):
+        return jsonify({"error": "Unknown service_id", "status": "error"}), 400
+    try:
+        month = datetime.strptime(month_param, '%Y-%m').date()
+    except ValueError:
+        return jsonify({"error": "month must be formatted YYYY-MM", "status": "error"}), 400
+
+    result = month_prices(make_mews_request, service_id, month, datetime.now(BELGIAN_TZ).date(), suite_id)
+    if result is None:
+        return jsonify({"error": "Failed to fetch pricing", "status": "error"}), 500
+    currency, prices = result
+    return jsonify({
+        "prices": prices,
+        "unit": "night" if service_id == NIGHT_SERVICE_ID else "hour",
+        "currency": currency or DEFAULT_CURRENCY,
+        "status": "success"
+    })
+
 @intense_experience_bp.route('/intense_experience-api/rates', methods=['GET'])
 def get_rates():
     """Get available rates"""
-    payload = {
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "IncludeDefault": False,
-        "Limitation": {"Count": 100}
-    }
-
-    result = make_mews_request("rates/getAll", payload)
+    result = fetch_rates(make_mews_request)
     if result and "Rates" in result:
         return jsonify({"rates": result["Rates"], "status": "success"})
     return jsonify({"error": "Failed to fetch rates", "status": "error"}), 500
@@ -409,21 +915,12 @@ def get_rates():
 @intense_experience_bp.route('/intense_experience-api/products', methods=['GET'])
 def get_products():
     """Get available products (upsells/options)"""
-    service_ids = [DAY_SERVICE_ID, NIGHT_SERVICE_ID]
-
     def has_extra_name(product):
         names = [product.get("Name", "")]
         names.extend(product.get("Names", {}).values())
         return any("#extra" in str(name).lower() for name in names if name is not None)
 
-    payload = {
-        "ServiceIds": service_ids,
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "IncludeDefault": False,
-        "Limitation": {"Count": 100}
-    }
-
-    result = make_mews_request("products/getAll", payload)
+    result = fetch_products(make_mews_request)
     if result and "Products" in result:
         products = [
             product for product in result["Products"]
@@ -435,64 +932,74 @@ def get_products():
 
 @intense_experience_bp.route('/intense_experience-api/resource-category-images', methods=['POST'])
 def get_resource_category_images():
-    """Get image assignments for resource categories"""
+    """Get image assignments for resource categories (cached, see image_cache.py)"""
     data = request.json
     category_ids = data.get('category_ids', [])
 
     if not category_ids:
         return jsonify({"error": "No category IDs provided", "status": "error"}), 400
 
-    payload = {
-        "Client": "Intense Experience Booking",
-        "ResourceCategoryIds": category_ids,
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "Limitation": {"Count": 100}
-    }
-
-    result = make_mews_request("resourceCategoryImageAssignments/getAll", payload)
-    if result and "ResourceCategoryImageAssignments" in result:
-        return jsonify({"image_assignments": result["ResourceCategoryImageAssignments"], "status": "success"})
+    assignments = get_category_image_assignments(make_mews_request, category_ids)
+    if assignments is not None:
+        return jsonify({"image_assignments": assignments, "status": "success"})
     return jsonify({"error": "Failed to fetch image assignments", "status": "error"}), 500
 
 @intense_experience_bp.route('/intense_experience-api/images/get-urls', methods=['POST'])
 def get_image_urls():
-    """Get image URLs for given image IDs"""
+    """Get image URLs for given image IDs (cached, see image_cache.py)"""
     data = request.json
     image_ids = data.get('image_ids', [])
 
     if not image_ids:
         return jsonify({"error": "No image IDs provided", "status": "error"}), 400
 
-    # Prepare images array for Mews API
-    images = []
-    for image_id in image_ids:
-        images.append({
-            "ImageId": image_id,
-            "Width": 400,  # Reasonable size for product cards
-            "Height": 300,
-            "ResizeMode": "Fit"
-        })
+    # Reasonable size for product cards
+    image_urls = get_cached_image_urls(make_mews_request, image_ids, IMAGE_DEFAULT_WIDTH, IMAGE_DEFAULT_HEIGHT, IMAGE_DEFAULT_RESIZE_MODE)
+    if image_urls is not None:
+        return jsonify({"image_urls": image_urls, "status": "success"})
+    return jsonify({"error": "Failed to fetch image URLs", "status": "error"}), 500
 
-    payload = {
-        "Client": "Intense Experience Booking",
-        "Images": images
+@intense_experience_bp.route('/intense_experience-api/images/resolve', methods=['POST'])
+def resolve_image_urls():
+    """
+    Get the final image URLs of suites (resource categories) and/or products in one call.
+
+    Replaces the resource-category-images + images/get-urls sequence of the widget.
+
+    Expected JSON payload:
+    {
+        "category_ids": ["resource_category_id", ...],   // optional
+        "product_ids": ["product_id", ...],              // optional, at least one of the two lists
+        "width": 400, "height": 300, "resize_mode": "Fit" // optional
     }
 
-    result = make_mews_request("images/getUrls", payload)
-    if result and "ImageUrls" in result:
-        return jsonify({"image_urls": result["ImageUrls"], "status": "success"})
-    return jsonify({"error": "Failed to fetch image URLs", "status": "error"}), 500
+    Returns:
+        {"category_images": {id: [url, ...]}, "product_images": {id: [url, ...]}, "status": "success"}
+    """
+    data = request.json or {}
+    category_ids = data.get('category_ids') or []
+    product_ids = data.get('product_ids') or []
+
+    if not isinstance(category_ids, list) or not isinstance(product_ids, list) or not (category_ids or product_ids):
+        return jsonify({"error": "No category or product IDs provided", "status": "error"}), 400
+
+    width = data.get('width', IMAGE_DEFAULT_WIDTH)
+    height = data.get('height', IMAGE_DEFAULT_HEIGHT)
+    resize_mode = data.get('resize_mode', IMAGE_DEFAULT_RESIZE_MODE)
+    # Only the sizes the widget uses: every distinct size is a separate cache entry
+    if (width, height, resize_mode) not in IMAGE_ALLOWED_SIZES:
+        allowed = ', '.join(f"{w}x{h} {mode}" for w, h, mode in IMAGE_ALLOWED_SIZES)
+        return jsonify({"error": f"Unsupported image size, allowed: {allowed}", "status": "error"}), 400
+
+    images = resolve_images(make_mews_request, category_ids, product_ids, width, height, resize_mode)
+    if images is None:
+        return jsonify({"error": "Failed to fetch image URLs", "status": "error"}), 500
+    return jsonify({**images, "status": "success"})
 
 @intense_experience_bp.route('/intense_experience-api/age-categories', methods=['GET'])
 def get_age_categories():
     """Get available age categories for services"""
-    payload = {
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "IncludeDefault": False,
-        "Limitation": {"Count": 100}
-    }
-
-    result = make_mews_request("ageCategories/getAll", payload)
+    result = fetch_age_categories(make_mews_request)
     if result and "AgeCategories" in result:
         return jsonify({"age_categories": result["AgeCategories"], "status": "success"})
     return jsonify({"error": "Failed to fetch age categories", "status": "error"}), 500
@@ -541,13 +1048,7 @@ def create_customer():
 
 def get_adult_age_category_for_service(service_id):
     """Get the adult age category ID for a specific service"""
-    payload = {
-        "EnterpriseIds": [ENTERPRISE_ID],
-        "IncludeDefault": False,
-        "Limitation": {"Count": 100}
-    }
-
-    result = make_mews_request("ageCategories/getAll", payload)
+    result = fetch_age_categories(make_mews_request)
     if result and "AgeCategories" in result:
         for category in result["AgeCategories"]:
             if (category.get("ServiceId") == service_id and
@@ -564,6 +1065,7 @@ def get_adult_age_category_for_service(service_id):
     return AGE_CATEGORY_ADULT_NIGHT  # Default fallback
 
 @intense_experience_bp.route('/intense_experience-api/create-reservation', methods=['POST'])
+@traced("create_reservation")
 def create_reservation():
     """Create a reservation"""
     data = request.json
@@ -694,6 +1196,10 @@ def create_reservation():
         reservation_id = reservation.get('Id')
         identifier = reservation_wrapper.get('Identifier')
 
+        # The next calendar requests recompute the booked dates instead of serving them from memory
+        invalidate_dates(start_date, end_date)
+        invalidate_prefetched_dates(start_date, end_date)
+
         return jsonify({
             "reservation": reservation,
             "identifier": identifier,
@@ -765,17 +1271,14 @@ def get_payment_request_status(payment_request_id):
         return jsonify({"error": "Payment request not found", "status": "error"}), 404
 
 
-@intense_experience_bp.route('/intense_experience-api/booking-limits', methods=['GET'])
-def get_booking_limits():
-    """Get booking duration limits and available times"""
-    suite_id = request.args.get('suite_id')
-    
+def build_booking_limits_response(suite_id=None):
+    """Body of /booking-limits (the minimum duration depends on the suite)"""
     # Determine minimum hours based on suite
     min_hours = DAY_MIN_HOURS
     if suite_id and suite_id in SPECIAL_MIN_DURATION_SUITES:
         min_hours = SPECIAL_MIN_HOURS
     
-    return jsonify({
+    return {
         'booking_limits': {
             'day_min_hours': min_hours,
             'day_max_hours': DAY_MAX_HOURS
@@ -787,13 +1290,12 @@ def get_booking_limits():
         'special_min_duration_suites': SPECIAL_MIN_DURATION_SUITES,
         'special_min_hours': SPECIAL_MIN_HOURS,
         'status': 'success'
-    })
+    }
 
 
-@intense_experience_bp.route('/intense_experience-api/frontend-config', methods=['GET'])
-def get_frontend_config():
-    """Get all configuration values needed by the frontend"""
-    return jsonify({
+def build_frontend_config_response():
+    """Body of /frontend-config"""
+    return {
         # Service IDs
         'day_service_id': DAY_SERVICE_ID,
         'night_service_id': NIGHT_SERVICE_ID,
@@ -832,7 +1334,44 @@ def get_frontend_config():
         'client_name': CLIENT_NAME,
         
         'status': 'success'
-    })
+    }
+
+
+@intense_experience_bp.route('/intense_experience-api/booking-limits', methods=['GET'])
+def get_booking_limits():
+    """Get booking duration limits and available times"""
+    return jsonify(build_booking_limits_response(request.args.get('suite_id')))
+
+
+@intense_experience_bp.route('/intense_experience-api/frontend-config', methods=['GET'])
+def get_frontend_config():
+    """Get all configuration values needed by the frontend"""
+    return jsonify(build_frontend_config_response())
+
+@intense_experience_bp.route('/intense_experience-api/bulk-time-options-availability', methods=['POST'])
+def bulk_time_options_availability_route():
+    """
+    Check early check-in / late check-out availability for multiple dates and every mapped nuitée suite.
+
+    Expected JSON payload:
+    {
+        "dates": ["2025-01-15T00:00:00.000Z", ...],
+        "suite_id": "nuitee_suite_id"   // optional
+    }
+
+    For a stay, the early check-in flag of its check-in date and the late check-out flag of its
+    check-out date give the answer of /check-time-options-availability; suites without a journée
+    twin are left out (their options are always available).
+    """
+    data = request.json or {}
+    key = view_key("time_options", data)
+    compute = cached_compute(key, lambda body: check_bulk_time_options(make_mews_request, body))
+    # Same versioning ("since") and short-lived date cache as the bulk calendar routes
+    result = versioned_availability(key, data, compute)
+    if isinstance(result, tuple):
+        # Error case: (error_dict, status_code)
+        return jsonify(result[0]), result[1]
+    return json_response(result, etag=False)
 
 @intense_experience_bp.route('/intense_experience-api/check-time-options-availability', methods=['POST'])
 def check_time_options_availability():
@@ -916,31 +1455,27 @@ def check_time_options_availability():
     reservations = result.get("Reservations", [])
     logger.info(f"Found {len(reservations)} journée reservations to check")
     
-    for reservation in reservations:
+    journee_category = category_index(journee_suite_id)
+    early_checkin_start_ts = int(early_checkin_start.timestamp())
+    early_checkin_end_ts = int(early_checkin_end.timestamp())
+    late_checkout_start_ts = int(late_checkout_start.timestamp())
+    late_checkout_end_ts = int(late_checkout_end.timestamp())
+
+    for record in parse_reservations(reservations):
         # Only check reservations for the corresponding journée suite
-        if reservation.get('RequestedCategoryId') != journee_suite_id:
+        if record.category != journee_category:
             continue
+        reservation = reservations[record.source_index]
         
-        res_start_utc = datetime.fromisoformat(reservation.get('StartUtc', '').replace('Z', '+00:00'))
-        res_end_utc = datetime.fromisoformat(reservation.get('EndUtc', '').replace('Z', '+00:00'))
-        
-        # Convert to Brussels timezone for comparison
-        res_start = res_start_utc.astimezone(brussels_tz)
-        res_end = res_end_utc.astimezone(brussels_tz)
-        
-        # Apply buffer to existing reservations (1 hour before and 1 hour after)
-        res_start_buffered = res_start - timedelta(hours=CLEANING_BUFFER_HOURS)
-        res_end_buffered = res_end + timedelta(hours=CLEANING_BUFFER_HOURS)
-        
-        # Check if reservation overlaps with early check-in slot (hour before early check-in on check-in date)
-        if not (res_end_buffered <= early_checkin_start or res_start_buffered >= early_checkin_end):
+        # Check if reservation (with buffer) overlaps with early check-in slot (hour before early check-in on check-in date)
+        if record.conflicts_with(early_checkin_start_ts, early_checkin_end_ts):
             early_checkin_available = False
-            logger.info(f"Early check-in blocked by reservation from {res_start} to {res_end} (with buffer: {res_start_buffered} to {res_end_buffered})")
+            logger.info(f"Early check-in blocked by reservation from {reservation.get('StartUtc')} to {reservation.get('EndUtc')} (buffer: {CLEANING_BUFFER_HOURS}h)")
         
-        # Check if reservation overlaps with late check-out slot (12:00-13:00 on check-out date)
-        if not (res_end_buffered <= late_checkout_start or res_start_buffered >= late_checkout_end):
+        # Check if reservation (with buffer) overlaps with late check-out slot (12:00-13:00 on check-out date)
+        if record.conflicts_with(late_checkout_start_ts, late_checkout_end_ts):
             late_checkout_available = False
-            logger.info(f"Late check-out blocked by reservation from {res_start} to {res_end} (with buffer: {res_start_buffered} to {res_end_buffered})")
+            logger.info(f"Late check-out blocked by reservation from {reservation.get('StartUtc')} to {reservation.get('EndUtc')} (buffer: {CLEANING_BUFFER_HOURS}h)")
     
     # Also check for resource block conflicts (if still available after reservation check)
     if early_checkin_available or late_checkout_available:
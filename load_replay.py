@@ -0,0 +1,402 @@
+"""
+Load-test harness replaying frontend call sequences against the Flask app.
+
+The app runs in-process (Flask test client, one per simulated user) and talks to the local
+fake Mews server (fake_mews_server.py) started on a background thread, so nothing reaches Mews.
+
+Traces are JSONL, one user session per line:
+    {"session_id": "s1", "start_ms": 0, "steps": [
+        {"offset_ms": 0, "method": "GET", "path": "/intense_experience-api/frontend-config"},
+        {"offset_ms": 900, "method": "POST", "path": "/intense_experience-api/create-customer",
+         "json": {...}, "capture": {"customer_id": "customer.Id"}},
+        {"offset_ms": 2500, "method": "POST", "path": "/intense_experience-api/create-reservation",
+         "json": {"customer_id": "${customer_id}", ...}}
+    ]}
+- start_ms / offset_ms: when the session starts (relative to the replay) and when each step is sent
+  (relative to the session start); both are divided by --speedup
+- capture: values taken from the JSON response (dotted path) and substituted as ${name} in later steps
+- route: optional label for the report (defaults to the path without its query string)
+
+Without --traces, sessions are generated from the widget's call sequence
+(frontend-config -> services -> suites -> bulk-availability -> availability -> pricing -> products
+-> create-customer -> create-reservation -> payment-request); --generate writes them to a file.
+
+Reports throughput, latency percentiles per route and Mews calls per session.
+
+Usage:
+    python load_replay.py --sessions 50 --concurrency 10 --speedup 20 --latency lognormal:120:0.4
+    python load_replay.py --generate 200 --output traces.jsonl
+    python load_replay.py --traces traces.jsonl --concurrency 25 --report load_report.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+API = "/intense_experience-api"
+_PLACEHOLDER = re.compile(r"\$\{(\w+)\}")
+
+
+# =============================================================================
+# SESSION GENERATION
+# =============================================================================
+
+def _displayed_dates(today, month_offset):
+    """Non-past dates of the two months shown by CalendarSelector, as UTC-midnight ISO strings."""
+    first = date(today.year + (today.month - 1 + month_offset) // 12, (today.month - 1 + month_offset) % 12 + 1, 1)
+    dates = []
+    day = first
+    while len(dates) < 62 and (day.month - first.month) % 12 < 2:
+        if day >= today:
+            dates.append(f"{day.isoformat()}T00:00:00.000Z")
+        day += timedelta(days=1)
+    return dates
+
+
+def generate_sessions(count, seed=1, conversion_rate=0.15, arrival_rate=1.0):
+    """
+    Generate widget sessions following the frontend call sequence.
+
+    Args:
+        count: number of sessions
+        conversion_rate: share of sessions that go through customer/reservation/payment creation
+        arrival_rate: average new sessions per second (Poisson arrivals)
+
+    Returns:
+        list: session dicts in the trace format
+    """
+    # Imported here so --generate does not need the app configuration loaded first
+    from config import (
+        DAY_SERVICE_ID, NIGHT_SERVICE_ID, RATE_ID_NUITEE, RATE_ID_JOURNEE_SEMAINE,
+        SUITE_ID_MAPPING, SUITE_ID_MAPPING_REVERSE, ARRIVAL_TIMES
+    )
+    from local_time import local_to_epoch, epoch_to_utc_iso
+
+    rng = random.Random(seed)
+    today = date.today()
+    sessions = []
+    start_ms = 0.0
+
+    for index in range(count):
+        start_ms += rng.expovariate(arrival_rate) * 1000
+        night = rng.random() < 0.6
+        service_id = NIGHT_SERVICE_ID if night else DAY_SERVICE_ID
+        suites = sorted(SUITE_ID_MAPPING_REVERSE) if night else sorted(SUITE_ID_MAPPING)
+        selected_suite = rng.choice(suites) if suites and rng.random() < 0.4 else None
+        steps = []
+        clock = 0.0
+
+        def step(method, path, body=None, think_ms=(100, 600), **extra):
+            nonlocal clock
+            clock += rng.uniform(*think_ms)
+            entry = {"offset_ms": round(clock), "method": method, "path": path}
+            if body is not None:
+                entry["json"] = body
+            entry.update(extra)
+            steps.append(entry)
+
+        step("GET", f"{API}/frontend-config", think_ms=(0, 50))
+        step("GET", f"{API}/services", think_ms=(0, 50))
+        step("GET", f"{API}/suites?service_id={service_id}", think_ms=(0, 100))
+        step("GET", f"{API}/booking-limits" + (f"?suite_id={selected_suite}" if selected_suite else ""),
+             route=f"{API}/booking-limits")
+        step("GET", f"{API}/suite-id-mapping", think_ms=(0, 50))
+
+        bulk_path = f"{API}/bulk-availability-{'nuitee' if night else 'journee'}"
+        booking_type = "night" if night else "day"
+        # Browse the calendar: the first view plus a few month changes
+        for month_offset in range(1 + min(int(rng.expovariate(1.2)), 4)):
+            step("POST", bulk_path, {"service_id": service_id, "dates": _displayed_dates(today, month_offset),
+                                     "booking_type": booking_type, "suite_id": selected_suite},
+                 think_ms=(800, 4000))
+
+        # Pick a stay (local times converted like the widget does)
+        day = today + timedelta(days=rng.randrange(1, 60))
+        if night:
+            start_ts = local_to_epoch(day, 19)
+            end_ts = local_to_epoch(day, 24 * rng.randint(1, 2) + 10)
+        else:
+            arrival_hour = int(rng.choice(ARRIVAL_TIMES[:-2]).split(':')[0])
+            start_ts = local_to_epoch(day, arrival_hour)
+            end_ts = local_to_epoch(day, arrival_hour + 3)
+        start_date, end_date = epoch_to_utc_iso(start_ts), epoch_to_utc_iso(end_ts)
+
+        step("POST", f"{API}/resource-category-images", {"category_ids": suites}, think_ms=(50, 200))
+        # SuiteSelector checks every suite one by one unless a suite was preselected
+        for suite_id in ([selected_suite] if selected_suite else suites):
+            step("POST", f"{API}/availability", {"service_id": service_id, "suite_id": suite_id,
+                                                 "start_date": start_date, "end_date": end_date,
+                                                 "booking_type": booking_type}, think_ms=(0, 30))
+        rate_id = RATE_ID_NUITEE if night else RATE_ID_JOURNEE_SEMAINE
+        step("POST", f"{API}/pricing", {"rate_id": rate_id, "start_date": start_date, "end_date": end_date})
+
+        suite_id = selected_suite or (rng.choice(suites) if suites else None)
+        step("GET", f"{API}/products", think_ms=(1000, 5000))
+        if night and suite_id:
+            step("POST", f"{API}/check-time-options-availability",
+                 {"suite_id": suite_id, "check_in_date": start_date, "check_out_date": end_date})
+
+        if suite_id and rng.random() < conversion_rate:
+            step("POST", f"{API}/create-customer",
+                 {"first_name": "Load", "last_name": f"Test{index}", "email": f"load{index}@example.com",
+                  "phone": "+32000000000"},
+                 think_ms=(5000, 20000), capture={"customer_id": "customer.Id"})
+            step("POST", f"{API}/create-reservation",
+                 {"service_id": service_id, "customer_id": "${customer_id}", "suite_id": suite_id,
+                  "rate_id": rate_id, "start_date": start_date, "end_date": end_date, "person_count": 2},
+                 capture={"reservation_id": "reservation.Id"})
+            expiration = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat().replace('+00:00', 'Z')
+            step("POST", "/api/payment-request",
+                 {"PaymentRequests": [{"AccountId": "${customer_id}", "Amount": {"Currency": "EUR", "Value": 100},
+                                       "ReservationId": "${reservation_id}", "ExpirationUtc": expiration}]})
+
+        sessions.append({"session_id": f"s{index + 1}", "start_ms": round(start_ms), "steps": steps})
+    return sessions
+
+
+def load_sessions(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+def _substitute(value, captured):
+    """Replace ${name} placeholders (whole-string placeholders keep the captured value's type)."""
+    if isinstance(value, str):
+        match = _PLACEHOLDER.fullmatch(value)
+        if match:
+            return captured.get(match.group(1))
+        return _PLACEHOLDER.sub(lambda m: str(captured.get(m.group(1), "")), value)
+    if isinstance(value, dict):
+        return {key: _substitute(item, captured) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_substitute(item, captured) for item in value]
+    return value
+
+
+def _extract(body, dotted_path):
+    for key in dotted_path.split("."):
+        if not isinstance(body, dict):
+            return None
+        body = body.get(key)
+    return body
+
+
+class ReplayStats:
+    """Thread-safe collection of per-request and per-session measurements."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}        # {route: [seconds]}
+        self.statuses = {}         # {route: {status: count}}
+        self.sessions = []         # [{"session_id", "requests", "upstream_calls", "duration_seconds"}]
+
+    def record_request(self, route, status, seconds):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            route_statuses = self.statuses.setdefault(route, {})
+            route_statuses[status] = route_statuses.get(status, 0) + 1
+
+    def record_session(self, session_summary):
+        with self.lock:
+            self.sessions.append(session_summary)
+
+
+class UpstreamCounter:
+    """MEWS_CALL_LISTENER target counting Mews calls of one session (called from engine pool threads too)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def __call__(self, endpoint):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+
+def replay_session(app, session, stats, replay_started, speedup):
+    """Play one session's steps on its own test client, honouring (scaled) start and step offsets."""
+    from intense_experience import MEWS_CALL_LISTENER
+
+    counter = UpstreamCounter()
+    token = MEWS_CALL_LISTENER.set(counter)
+    client = app.test_client()
+    captured = {}
+    try:
+        session_start = replay_started + session.get("start_ms", 0) / 1000 / speedup
+        delay = session_start - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        session_start = time.perf_counter()
+
+        for step in session["steps"]:
+            delay = session_start + step.get("offset_ms", 0) / 1000 / speedup - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            route = step.get("route") or step["path"].split("?")[0]
+            body = _substitute(step.get("json"), captured)
+            started = time.perf_counter()
+            response = client.open(_substitute(step["path"], captured), method=step.get("method", "GET"), json=body)
+            stats.record_request(route, response.status_code, time.perf_counter() - started)
+
+            if step.get("capture"):
+                response_body = response.get_json(silent=True) or {}
+                for name, dotted_path in step["capture"].items():
+                    captured[name] = _extract(response_body, dotted_path)
+    finally:
+        MEWS_CALL_LISTENER.reset(token)
+
+    stats.record_session({
+        "session_id": session.get("session_id"),
+        "requests": len(session["steps"]),
+        "upstream_calls": sum(counter.calls.values()),
+        "upstream_calls_by_endpoint": counter.calls,
+        "duration_seconds": round(time.perf_counter() - session_start, 3)
+    })
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def build_report(stats, wall_seconds, fake_stats):
+    routes = {}
+    total_requests = 0
+    for route, latencies in sorted(stats.latencies.items()):
+        latencies = sorted(latencies)
+        total_requests += len(latencies)
+        routes[route] = {
+            "count": len(latencies),
+            "statuses": {str(status): count for status, count in sorted(stats.statuses[route].items())},
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p90_ms": round(_percentile(latencies, 0.90) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2)
+        }
+    upstream = [session["upstream_calls"] for session in stats.sessions]
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / wall_seconds, 2) if wall_seconds else None,
+        "routes": routes,
+        "upstream_calls_per_session": {
+            "mean": round(statistics.mean(upstream), 2) if upstream else None,
+            "median": statistics.median(upstream) if upstream else None,
+            "max": max(upstream) if upstream else None
+        },
+        "sessions": sorted(stats.sessions, key=lambda s: s["session_id"] or ""),
+        "fake_mews": fake_stats
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['wall_seconds']}s ({report['throughput_rps']} req/s)")
+    print(f"{'route':60} {'count':>6} {'p50':>9} {'p90':>9} {'p99':>9}  statuses")
+    for route, row in report["routes"].items():
+        print(f"{route:60} {row['count']:>6} {row['p50_ms']:>7.1f}ms {row['p90_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms  {row['statuses']}")
+    upstream = report["upstream_calls_per_session"]
+    print(f"Mews calls per session: mean={upstream['mean']} median={upstream['median']} max={upstream['max']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay frontend call sequences against the app backed by a fake Mews")
+    parser.add_argument("--traces", help="JSONL trace file (default: generated sessions)")
+    parser.add_argument("--sessions", type=int, default=20, help="sessions to generate when --traces is not given")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--arrival-rate", type=float, default=1.0, help="generated sessions started per second")
+    parser.add_argument("--generate", type=int, help="only write this many generated sessions to --output")
+    parser.add_argument("--output", default="traces.jsonl")
+    parser.add_argument("--concurrency", type=int, default=10, help="maximum simultaneous sessions")
+    parser.add_argument("--speedup", type=float, default=10.0, help="divide recorded think times by this factor")
+    parser.add_argument("--latency", default="lognormal:120:0.4", help="fake Mews latency distribution")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-timeout", type=float, default=0.0)
+    parser.add_argument("--days", type=int, default=120, help="days of synthetic reservations in the fake Mews")
+    parser.add_argument("--report", default=None, help="write the full report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.generate:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for session in generate_sessions(args.generate, args.seed, arrival_rate=args.arrival_rate):
+                f.write(json.dumps(session) + "\n")
+        print(f"Wrote {args.generate} sessions to {args.output}")
+        return
+
+    # config.py reads the base URL override at import time: choose the port and set it before
+    # anything imports config (the fake server included)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    os.environ["MEWS_API_BASE_URL"] = f"http://127.0.0.1:{port}/api/connector/v1"
+
+    from fake_mews_server import FakeMewsConfig, FakeMewsState, start_fake_mews_server
+
+    fake_state = FakeMewsState(seed=args.seed, days=args.days)
+    fake_config = FakeMewsConfig(latency=args.latency, rate_429=args.rate_429, rate_timeout=args.rate_timeout,
+                                 seed=args.seed)
+    server, base_url = start_fake_mews_server(port=port, state=fake_state, fake_config=fake_config)
+
+    from app import create_app
+    app = create_app()
+    # Keep logging out of the latency numbers
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    client = app.test_client()
+    while client.get(f"{API}/ready").status_code != 200:
+        time.sleep(0.1)
+
+    sessions = load_sessions(args.traces) if args.traces else generate_sessions(
+        args.sessions, args.seed, arrival_rate=args.arrival_rate)
+    print(f"Replaying {len(sessions)} sessions (concurrency {args.concurrency}, speed-up x{args.speedup}) against {base_url}")
+
+    stats = ReplayStats()
+    replay_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="replay") as executor:
+        futures = [executor.submit(replay_session, app, session, stats, replay_started, args.speedup)
+                   for session in sessions]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                logger.error(f"Session replay failed: {exc}")
+    wall_seconds = time.perf_counter() - replay_started
+
+    # Let the adjacent-month prefetches queued by the last sessions finish against the fake Mews
+    # before it stops (their calls are counted in the Mews stats)
+    from prefetch import drain as drain_prefetch
+    drain_prefetch()
+
+    with fake_state.lock:
+        fake_stats = json.loads(json.dumps(fake_state.request_counts))
+    server.shutdown()
+
+    report = build_report(stats, wall_seconds, fake_stats)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Precomputed UTC-offset table for the configured TIMEZONE (Europe/Brussels).
+
+The availability hot paths convert (local date, hour) pairs to instants thousands of times per
+request. Instead of calling pytz localize/astimezone each time, the offsets of every day of the
+bookable horizon are computed once at import, and conversions become integer arithmetic.
+Dates outside the table fall back to pytz.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytz
+
+from config import TIMEZONE, BOOKING_HORIZON_DAYS
+
+LOCAL_TZ = pytz.timezone(TIMEZONE)
+
+SECONDS_PER_DAY = 86400
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Days kept before today (dates already displayed in the calendar, pricing of ongoing stays)
+_TABLE_PAST_DAYS = 31
+
+
+def _utc_offset_seconds(day, hour):
+    """UTC offset (seconds) of a local wall-clock hour, resolved the same way as pytz localize()."""
+    return int(LOCAL_TZ.localize(datetime.combine(day, time(hour))).utcoffset().total_seconds())
+
+
+def _build_offset_table(first_day, days):
+    """
+    Build one (midnight_offset, switch_hour, switch_offset) entry per day.
+
+    switch_hour is the first local hour using switch_offset (24 when there is no DST change that day).
+    """
+    table = []
+    for day_index in range(days):
+        day = first_day + timedelta(days=day_index)
+        midnight_offset = _utc_offset_seconds(day, 0)
+        next_midnight_offset = _utc_offset_seconds(day + timedelta(days=1), 0)
+        switch_hour = 24
+        if next_midnight_offset != midnight_offset:
+            switch_hour = next(
+                hour for hour in range(1, 24) if _utc_offset_seconds(day, hour) == next_midnight_offset
+            )
+        table.append((midnight_offset, switch_hour, next_midnight_offset))
+    return table
+
+
+_TABLE_FIRST_ORDINAL = date.today().toordinal() - _TABLE_PAST_DAYS
+_OFFSET_TABLE = _build_offset_table(
+    date.fromordinal(_TABLE_FIRST_ORDINAL), _TABLE_PAST_DAYS + BOOKING_HORIZON_DAYS + 31
+)
+
+
+def local_to_epoch(day, hour=0, minute=0):
+    """
+    Epoch seconds of a local wall-clock time.
+
+    Args:
+        day: date object (local calendar date)
+        hour: local hour, may exceed 23 to address following days (e.g. 24 + 10 = next day 10:00)
+        minute: local minute
+
+    Returns:
+        int: epoch seconds
+    """
+    ordinal = day.toordinal() + hour // 24
+    hour = hour % 24
+    table_index = ordinal - _TABLE_FIRST_ORDINAL
+    if 0 <= table_index < len(_OFFSET_TABLE):
+        midnight_offset, switch_hour, switch_offset = _OFFSET_TABLE[table_index]
+        offset = midnight_offset if hour < switch_hour else switch_offset
+        return (ordinal - _EPOCH_ORDINAL) * SECONDS_PER_DAY + hour * 3600 + minute * 60 - offset
+
+    # Outside the precomputed horizon
+    local_dt = LOCAL_TZ.localize(datetime.combine(date.fromordinal(ordinal), time(hour, minute)))
+    return int(local_dt.timestamp())
+
+
+def epoch_to_local(epoch):
+    """
+    Local calendar date and wall-clock time of an instant.
+
+    Returns:
+        tuple: (date, hour, minute)
+    """
+    epoch = int(epoch)
+    utc_ordinal = epoch // SECONDS_PER_DAY + _EPOCH_ORDINAL
+    table_index = utc_ordinal - _TABLE_FIRST_ORDINAL
+    if not 1 <= table_index < len(_OFFSET_TABLE) - 1:
+        local_dt = datetime.fromtimestamp(epoch, timezone.utc).astimezone(LOCAL_TZ)
+        return local_dt.date(), local_dt.hour, local_dt.minute
+
+    # The local date is the UTC date or one of its neighbours: take the latest one already started
+    for ordinal in (utc_ordinal + 1, utc_ordinal, utc_ordinal - 1):
+        day = date.fromordinal(ordinal)
+        day_start = local_to_epoch(day)
+        if epoch < day_start:
+            continue
+        wall_seconds = epoch - day_start
+        switch_hour = _OFFSET_TABLE[ordinal - _TABLE_FIRST_ORDINAL][1]
+        if switch_hour < 24:
+            switch_epoch = local_to_epoch(day, switch_hour)
+            if epoch >= switch_epoch:
+                wall_seconds = switch_hour * 3600 + (epoch - switch_epoch)
+        return day, wall_seconds // 3600, (wall_seconds % 3600) // 60
+
+    local_dt = datetime.fromtimestamp(epoch, timezone.utc).astimezone(LOCAL_TZ)
+    return local_dt.date(), local_dt.hour, local_dt.minute
+
+
+def epoch_to_utc_iso(epoch):
+    """Format epoch seconds as a Mews UTC timestamp (e.g. 2025-11-14T23:00:00Z)."""
+    return datetime.fromtimestamp(int(epoch), timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def parse_iso_epoch(value):
+    """
+    Parse a Mews ISO timestamp (e.g. 2025-11-20T14:00:00Z) to integer epoch seconds.
+
+    Mews always answers in UTC with a 'Z' suffix, so the common shape is decoded by slicing;
+    anything else (explicit offsets) goes through datetime.fromisoformat.
+    """
+    if len(value) >= 20 and value[-1] == 'Z' and value[10] == 'T':
+        try:
+            ordinal = date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+            return ((ordinal - _EPOCH_ORDINAL) * SECONDS_PER_DAY
+                    + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19]))
+        except ValueError:
+            pass
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
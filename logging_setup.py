@@ -0,0 +1,167 @@
+"""
+Logging configuration for the app (replaces the DEBUG basicConfig of intense_experience.py).
+
+- Records are queued by a QueueHandler on the root logger and written by a QueueListener thread,
+  so stream I/O never happens on a request or chunk thread.
+- LOG_FORMAT=text keeps the usual "time - logger - level - [trace id] message" lines;
+  LOG_FORMAT=json writes one JSON object per line with the trace/span IDs and any `extra=` fields.
+- LOG_LEVEL sets the root level, LOG_LEVELS overrides it per logger ("bulk_availability=WARNING,urllib3=ERROR").
+- LOG_SAMPLE keeps 1 in N INFO/DEBUG records per logging call for noisy loggers
+  ("bulk_availability=10"); warnings and errors are never sampled.
+
+Hot paths log with %-style arguments (logger.info("... %s", value)) so the message is only
+built when the record is actually emitted.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+from config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_SAMPLE
+from tracing import TraceContextFilter
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s'
+
+# LogRecord attributes that are not `extra=` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id", "span_id"}
+
+_LISTENER = None
+
+
+def parse_levels(spec):
+    """Parse "name=LEVEL,name=LEVEL" into {name: level}; unknown levels are ignored."""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def parse_sample_rates(spec):
+    """Parse "name=N,name=N" into {name: N} (N >= 2)."""
+    rates = {}
+    for item in (spec or "").split(","):
+        name, _, every = item.partition("=")
+        if name.strip() and every.strip().isdigit() and int(every) > 1:
+            rates[name.strip()] = int(every)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if getattr(record, "trace_id", "-") != "-":
+            entry["trace_id"] = record.trace_id
+            entry["span_id"] = record.span_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Rendered by the queue handler on the emitting thread
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through 1 in N records per logging call (logger, file, line) below WARNING for the
+    configured loggers. Keyed by call site rather than message so f-string messages do not grow
+    the counts without bound.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        every = self.rates.get(record.name)
+        if every is None:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        with self.lock:
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        if count % every:
+            return False
+        record.sampled_every = every
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting (text or JSON) to the listener's handler."""
+
+    def prepare(self, record):
+        # Merge args and render the traceback in the calling thread (args may not be safe to
+        # format later), but keep the rest of the record for the listener's formatter
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging():
+    """
+    Install the queue-based root handler once per process.
+
+    Does nothing when the root logger already has handlers (a script configured logging itself),
+    like logging.basicConfig.
+    """
+    global _LISTENER
+    root = logging.getLogger()
+    if _LISTENER is not None or root.handlers:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    # Filters run on the emitting thread, where the trace context is available
+    sample_rates = parse_sample_rates(LOG_SAMPLE)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    queue_handler.addFilter(TraceContextFilter())
+
+    root.setLevel(parse_levels(f"root={LOG_LEVEL}").get("root", logging.INFO))
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+    root.addHandler(queue_handler)
+
+    _LISTENER = logging.handlers.QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(_LISTENER.stop)
+
+
+def reinit_after_fork():
+    """Restart the listener thread in a forked worker (threads do not survive a fork)."""
+    global _LISTENER
+    if _LISTENER is None:
+        return
+    queue_handler = next(h for h in logging.getLogger().handlers if isinstance(h, _QueueHandler))
+    # Fresh queue: the inherited one may hold records (and lock state) from the master
+    queue_handler.queue = queue.SimpleQueue()
+    _LISTENER = logging.handlers.QueueListener(queue_handler.queue, *_LISTENER.handlers, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(_LISTENER.stop)
@@ -0,0 +1,329 @@
+"""
+In-process metrics served in the Prometheus text exposition format (GET /metrics).
+
+Small dependency-free Counter / Gauge / Histogram types registered in REGISTRY, plus the
+metrics the app records:
+- route latency per Flask rule (app.py before/after_request hooks)
+- Mews latency per endpoint, upstream errors by reason (429, 4xx, 5xx, network)
+- bulk engine chunk counts, chunk durations, executor queue depth and chunks in flight
+- catalog and slot-table cache lookups, with the hit ratio computed at scrape time
+
+Values are recorded per process. With several gunicorn workers, each worker writes its values
+to METRICS_MULTIPROC_DIR/<pid>.json (at most every METRICS_SNAPSHOT_INTERVAL_SECONDS, when a
+request ends) and the worker answering /metrics adds up all the files: counters and histograms
+of every worker that ran since the master started, gauges of the workers still alive only.
+The route requires "Authorization: Bearer <METRICS_TOKEN>" (metrics_authorized()).
+"""
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+
+from config import METRICS_TOKEN, METRICS_MULTIPROC_DIR, METRICS_SNAPSHOT_INTERVAL_SECONDS
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def copy_values(self):
+        """{labelvalues tuple: value} snapshot of this process."""
+        with self.lock:
+            return dict(self._values)
+
+    def add_values(self, target, values):
+        """Add another process's values (copy_values()) into target."""
+        for key, value in values.items():
+            target[key] = target.get(key, 0) + value
+
+    def _samples(self, collected):
+        """Return [(suffix, labelvalues, extra_label, value)] for the exposition."""
+        return [("", key, None, value) for key, value in sorted(collected.get(self.name, {}).items())]
+
+    def render(self, collected):
+        """Exposition lines; collected maps metric names to their {labelvalues: value}."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for suffix, labelvalues, extra, value in self._samples(collected):
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labelvalues, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; with a callback, the values are computed at scrape time."""
+    metric_type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        # callback(collected) -> {labelvalues tuple: value}, from the values of the other metrics
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self, collected):
+        if self.callback is not None:
+            return [("", tuple(str(v) for v in key), None, value) for key, value in sorted(self.callback(collected).items())]
+        return super()._samples(collected)
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds (seconds by convention)."""
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def copy_values(self):
+        with self.lock:
+            return {key: [[*state[0]], state[1], state[2]] for key, state in self._values.items()}
+
+    def add_values(self, target, values):
+        for key, (bucket_counts, total, count) in values.items():
+            state = target.get(key)
+            if state is None:
+                state = target[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0] = [a + b for a, b in zip(state[0], bucket_counts)]
+            state[1] += total
+            state[2] += count
+
+    def _samples(self, collected):
+        samples = []
+        for key, (bucket_counts, total, count) in sorted(collected.get(self.name, {}).items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, ("le", _format_value(upper_bound)), cumulative))
+            samples.append(("_sum", key, None, total))
+            samples.append(("_count", key, None, count))
+        return samples
+
+
+# =============================================================================
+# MULTIPROCESS COLLECTION
+# =============================================================================
+
+_snapshot_lock = threading.Lock()
+_last_snapshot = 0.0
+
+
+def _local_values():
+    return {metric.name: metric.copy_values() for metric in REGISTRY if getattr(metric, "callback", None) is None}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot(force=False):
+    """
+    Write this process's values to METRICS_MULTIPROC_DIR/<pid>.json for /metrics to add up.
+
+    Args:
+        force: write even if the last write is less than METRICS_SNAPSHOT_INTERVAL_SECONDS old
+
+    Returns:
+        None (no-op without METRICS_MULTIPROC_DIR)
+    """
+    global _last_snapshot
+    if not METRICS_MULTIPROC_DIR:
+        return
+    with _snapshot_lock:
+        now = time.monotonic()
+        if not force and now - _last_snapshot < METRICS_SNAPSHOT_INTERVAL_SECONDS:
+            return
+        _last_snapshot = now
+        snapshot = {name: [[list(key), value] for key, value in values.items()] for name, values in _local_values().items()}
+        path = os.path.join(METRICS_MULTIPROC_DIR, f"{os.getpid()}.json")
+        os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+        # Write then rename so a concurrent scrape never reads half a file
+        with open(path + ".tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+
+
+def _collect_all_processes():
+    """Values of every worker from METRICS_MULTIPROC_DIR, this process included."""
+    write_snapshot(force=True)
+    metrics_by_name = {metric.name: metric for metric in REGISTRY}
+    collected = {}
+    for path in glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "*.json")):
+        try:
+            pid = int(os.path.basename(path)[:-len(".json")])
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (ValueError, OSError):
+            continue
+        # A dead worker's counters and histograms still count; its gauges (in flight, queue depth) do not
+        alive = _pid_alive(pid)
+        for name, items in snapshot.items():
+            metric = metrics_by_name.get(name)
+            if metric is None or (metric.metric_type == "gauge" and not alive):
+                continue
+            metric.add_values(collected.setdefault(name, {}), {tuple(key): value for key, value in items})
+    return collected
+
+
+def render_metrics():
+    """All registered metrics in the Prometheus text format (version 0.0.4), summed over the workers."""
+    collected = _collect_all_processes() if METRICS_MULTIPROC_DIR else _local_values()
+    return "\n".join(metric.render(collected) for metric in REGISTRY) + "\n"
+
+
+def metrics_authorized(headers):
+    """True if the request carries "Authorization: Bearer <METRICS_TOKEN>" (never when the token is unset)."""
+    header = headers.get("Authorization", "")
+    if not METRICS_TOKEN or not header.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(header[len("Bearer "):].encode(), METRICS_TOKEN.encode())
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# =============================================================================
+# APPLICATION METRICS
+# =============================================================================
+
+HTTP_REQUEST_DURATION = Histogram(
+    "ie_http_request_duration_seconds", "Flask request latency per route",
+    ("route", "method", "status")
+)
+
+MEWS_REQUEST_DURATION = Histogram(
+    "ie_mews_request_duration_seconds", "Mews Connector API call latency per endpoint",
+    ("endpoint", "outcome")
+)
+MEWS_IN_FLIGHT = Gauge(
+    "ie_mews_in_flight", "Mews Connector API calls in progress by priority (request, prefetch)",
+    ("priority",)
+)
+MEWS_ERRORS = Counter(
+    "ie_mews_errors_total", "Failed Mews Connector API calls by reason (http_429, http_4xx, http_5xx, network)",
+    ("endpoint", "reason")
+)
+
+BULK_CHUNKS = Counter(
+    "ie_bulk_chunks_total", "Bulk availability chunks processed by engine and outcome (ok, failed, exception)",
+    ("engine", "outcome")
+)
+BULK_CHUNK_DURATION = Histogram(
+    "ie_bulk_chunk_duration_seconds", "Bulk availability chunk processing time (Mews fetch included)",
+    ("engine",)
+)
+BULK_QUEUE_DEPTH = Gauge(
+    "ie_bulk_executor_queue_depth", "Bulk availability chunks submitted but not yet started",
+    ("engine",)
+)
+BULK_CHUNKS_IN_FLIGHT = Gauge(
+    "ie_bulk_chunks_in_flight", "Bulk availability chunks currently running",
+    ("engine",)
+)
+
+PREFETCH_JOBS = Counter(
+    "ie_prefetch_jobs_total", "Adjacent-month availability prefetches by outcome (done, dropped, yielded, failed)",
+    ("engine", "outcome")
+)
+
+CACHE_LOOKUPS = Counter(
+    "ie_cache_lookups_total", "Cache lookups by cache and result (hit, miss)",
+    ("cache", "result")
+)
+
+
+def _cache_hit_ratios(collected):
+    values = collected.get(CACHE_LOOKUPS.name, {})
+    ratios = {}
+    for cache in sorted({cache for cache, _ in values}):
+        hits = values.get((cache, "hit"), 0)
+        total = hits + values.get((cache, "miss"), 0)
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+
+CACHE_HIT_RATIO = Gauge(
+    "ie_cache_hit_ratio", "Share of cache lookups served from memory since the workers started",
+    ("cache",), callback=_cache_hit_ratios
+)
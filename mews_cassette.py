@@ -0,0 +1,244 @@
+"""
+Record/replay ("cassette") layer for Mews Connector calls.
+
+Record mode appends one gzip member per Mews call, holding one JSON line:
+    {"endpoint", "digest", "response", "latency_ms", "recorded_at"}
+Every process writes its own file (MEWS_CASSETTE_PATH with the PID inserted, e.g.
+mews_cassette.1234.jsonl.gz), so gunicorn workers never interleave their writes. A member is
+complete once written, so a killed worker loses at most the call it was writing, and a truncated
+last member is skipped when reading. Replay reads MEWS_CASSETTE_PATH if it exists, otherwise
+every per-process file recorded for it.
+The digest is a SHA-256 of the endpoint and the payload without the access tokens; the payload
+itself is not stored. Responses are stored as returned (None for failed calls), so a cassette
+recorded in production contains reservation and customer data: keep it out of the repository.
+
+Replay mode answers each call from the cassette without any network:
+- calls are matched by digest and served in recorded order (the last response repeats once the
+  recorded ones are used up), optionally sleeping the recorded latency
+- reservations/getAll and resourceBlocks/getAll calls whose digest was not recorded are answered
+  from the union of every recorded reservation / block overlapping the requested range, so the
+  engines can run over arbitrary dates with the captured densities (see benchmark_bulk_availability.py)
+- any other unknown call returns None, exactly like a failed Mews request
+
+Enabled for the app with MEWS_CASSETTE_MODE=record|replay and MEWS_CASSETTE_PATH (see config.py).
+"""
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from local_time import parse_iso_epoch
+
+logger = logging.getLogger(__name__)
+
+# Payload keys never part of the digest (added by make_mews_request, differ per environment)
+TOKEN_KEYS = ("ClientToken", "AccessToken")
+
+# Endpoints answerable from pooled records when the exact call was not recorded
+RANGE_ENDPOINTS = {
+    "reservations/getAll": "Reservations",
+    "resourceBlocks/getAll": "ResourceBlocks",
+}
+
+
+def payload_digest(endpoint, payload):
+    """Stable digest of a Mews call, ignoring the access tokens."""
+    stripped = {key: value for key, value in payload.items() if key not in TOKEN_KEYS}
+    canonical = json.dumps([endpoint, stripped], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def pid_path(path, pid):
+    """Cassette file of one process: mews_cassette.jsonl.gz -> mews_cassette.<pid>.jsonl.gz"""
+    directory, name = os.path.split(path)
+    stem, dot, extensions = name.partition(".")
+    return os.path.join(directory, f"{stem}.{pid}{dot}{extensions}")
+
+
+def cassette_paths(path):
+    """Files holding a cassette: the path itself, or the per-process files recorded for it."""
+    if os.path.exists(path):
+        return [path]
+    return sorted(glob.glob(pid_path(path, "*")))
+
+
+def read_cassette(path):
+    """
+    Yield the entries of a cassette (multi-member gzip, one JSON object per line), from the file
+    itself or from the per-process files recorded for it (cassette_paths).
+
+    A truncated last member (process killed while writing) is skipped with a warning.
+    """
+    paths = cassette_paths(path)
+    if not paths:
+        raise FileNotFoundError(f"No cassette at {path} or recorded for it")
+    for file_path in paths:
+        with gzip.open(file_path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            except (EOFError, json.JSONDecodeError):
+                logger.warning(f"Cassette {file_path} ends with a truncated entry, skipped")
+
+
+class CassetteRecorder:
+    """Appends Mews calls to a per-process cassette file (thread-safe)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._file = None
+        self._pid = None
+        self.count = 0
+        atexit.register(self.close)
+
+    def record(self, endpoint, payload, response, latency_seconds):
+        entry = {
+            "endpoint": endpoint,
+            "digest": payload_digest(endpoint, payload),
+            "response": response,
+            "latency_ms": round(latency_seconds * 1000, 2),
+            "recorded_at": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        }
+        # One complete gzip member per entry: gzip.open reads consecutive members back as one stream
+        member = gzip.compress((json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+        with self.lock:
+            pid = os.getpid()
+            if self._pid != pid:
+                if self._file is not None:
+                    # Inherited from the master before the fork: only releases this process's descriptor
+                    self._file.close()
+                self._file = open(pid_path(self.path, pid), "ab")
+                self._pid = pid
+            self._file.write(member)
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._pid = None
+
+
+class CassettePlayer:
+    """Serves Mews calls from a cassette file."""
+
+    def __init__(self, path, original_timing=False):
+        self.path = path
+        self.original_timing = original_timing
+        self.lock = threading.Lock()
+        self._entries = {}      # {digest: deque of entries}
+        self._last_entry = {}   # {digest: last served entry}, repeated once the queue is empty
+        # {endpoint: {record Id: (start_ts, end_ts, record)}} pooled for range queries
+        self._pool = {endpoint: {} for endpoint in RANGE_ENDPOINTS}
+        self.hits = 0
+        self.range_hits = 0
+        self.misses = 0
+
+        for entry in read_cassette(path):
+            self._entries.setdefault(entry["digest"], deque()).append(entry)
+            collection = RANGE_ENDPOINTS.get(entry["endpoint"])
+            if collection and entry.get("response"):
+                pool = self._pool[entry["endpoint"]]
+                for record in entry["response"].get(collection, []):
+                    if record.get("StartUtc") and record.get("EndUtc"):
+                        key = record.get("Id") or f"{record.get('AssignedResourceId')}:{record['StartUtc']}"
+                        pool[key] = (parse_iso_epoch(record["StartUtc"]), parse_iso_epoch(record["EndUtc"]), record)
+        logger.info(f"Loaded cassette {path}: {sum(len(q) for q in self._entries.values())} calls, "
+                    f"{len(self._pool['reservations/getAll'])} reservations, {len(self._pool['resourceBlocks/getAll'])} blocks")
+
+    def recorded_range(self):
+        """(start_ts, end_ts) covered by the pooled reservations, or None if there are none."""
+        records = self._pool["reservations/getAll"].values()
+        if not records:
+            return None
+        return min(r[0] for r in records), max(r[1] for r in records)
+
+    def _answer_range(self, endpoint, payload):
+        if endpoint == "resourceBlocks/getAll":
+            window = payload.get("CollidingUtc", {})
+        else:
+            window = payload
+        start_ts = parse_iso_epoch(window["StartUtc"])
+        end_ts = parse_iso_epoch(window["EndUtc"])
+        service_ids = payload.get("ServiceIds")
+        records = [record for record_start, record_end, record in self._pool[endpoint].values()
+                   if record_start < end_ts and record_end > start_ts
+                   and (not service_ids or record.get("ServiceId") in service_ids or "ServiceId" not in record)]
+        return {RANGE_ENDPOINTS[endpoint]: records}
+
+    def play(self, endpoint, payload, range_only=False):
+        """
+        Answer one call.
+
+        Args:
+            range_only: answer reservations/resourceBlocks from the pooled records even when the
+                exact call was recorded (used to run engines over arbitrary date sets)
+
+        Returns:
+            dict or None: recorded response
+        """
+        if range_only and endpoint in RANGE_ENDPOINTS:
+            with self.lock:
+                self.range_hits += 1
+            return self._answer_range(endpoint, payload)
+
+        digest = payload_digest(endpoint, payload)
+        with self.lock:
+            queue = self._entries.get(digest)
+            if queue:
+                entry = queue.popleft()
+                self._last_entry[digest] = entry
+                self.hits += 1
+            else:
+                entry = self._last_entry.get(digest)
+                if entry is not None:
+                    self.hits += 1
+                elif endpoint in RANGE_ENDPOINTS:
+                    self.range_hits += 1
+                else:
+                    self.misses += 1
+
+        if entry is None:
+            if endpoint in RANGE_ENDPOINTS:
+                return self._answer_range(endpoint, payload)
+            logger.warning(f"Cassette miss for {endpoint} (digest {digest[:12]})")
+            return None
+
+        if self.original_timing and entry.get("latency_ms"):
+            time.sleep(entry["latency_ms"] / 1000)
+        return entry["response"]
+
+    def as_request_func(self, range_only=False):
+        """make_mews_request_func-compatible callable backed by this cassette."""
+        return lambda endpoint, payload: self.play(endpoint, payload, range_only=range_only)
+
+
+def cassette_from_config():
+    """
+    Build the recorder or player selected by MEWS_CASSETTE_MODE.
+
+    Returns:
+        tuple: (recorder or None, player or None)
+    """
+    from config import MEWS_CASSETTE_MODE, MEWS_CASSETTE_PATH, MEWS_CASSETTE_REPLAY_TIMING
+
+    if MEWS_CASSETTE_MODE == "record":
+        logger.warning(f"Recording Mews calls to cassette {MEWS_CASSETTE_PATH}")
+        return CassetteRecorder(MEWS_CASSETTE_PATH), None
+    if MEWS_CASSETTE_MODE == "replay":
+        logger.warning(f"Replaying Mews calls from cassette {MEWS_CASSETTE_PATH} (no network)")
+        return None, CassettePlayer(MEWS_CASSETTE_PATH, original_timing=MEWS_CASSETTE_REPLAY_TIMING)
+    if MEWS_CASSETTE_MODE:
+        logger.error(f"Unknown MEWS_CASSETTE_MODE '{MEWS_CASSETTE_MODE}', calling Mews live")
+    return None, None
@@ -0,0 +1,326 @@
+"""
+Speculative prefetch of the calendar months next to the one being viewed.
+
+Users browse the calendar month by month and every navigation used to pay the full chunk
+fan-out. After a bulk availability request for the grids of months M and M+1, the dates of the
+neighbouring views (M+1/M+2 and M-1/M) are computed in the background and kept for
+PREFETCH_TTL_SECONDS, together with the dates the request itself just computed, so the next
+navigation is answered from memory.
+
+- cached_compute() wraps an engine call: dates found in the cache are not sent to the engine.
+- schedule_adjacent_months() queues the background work on one low-priority thread; pending work
+  is capped at PREFETCH_MAX_PENDING jobs, extra ones are dropped.
+- Every Mews call takes a slot from UPSTREAM_BUDGET (make_mews_request). Calls made for a request
+  never wait. A prefetch job only starts once no Mews call is in flight (it is skipped if that
+  does not happen within PREFETCH_UPSTREAM_WAIT_SECONDS), and each of its calls then waits until
+  no request call is in flight and fewer than PREFETCH_MAX_UPSTREAM_IN_FLIGHT prefetch calls are
+  (again at most PREFETCH_UPSTREAM_WAIT_SECONDS). A call that gets no headroom in time raises
+  UpstreamBusy: the job's remaining calls fail at once and its result is discarded.
+- create_reservation drops the cached dates a booking touches (invalidate_dates).
+"""
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from availability_versions import booking_days, calendar_day
+from config import (
+    PREFETCH_TTL_SECONDS,
+    PREFETCH_MAX_PENDING,
+    PREFETCH_MAX_UPSTREAM_IN_FLIGHT,
+    PREFETCH_UPSTREAM_WAIT_SECONDS,
+    PREFETCH_CACHE_MAX_DATES
+)
+from metrics import CACHE_LOOKUPS, MEWS_IN_FLIGHT, PREFETCH_JOBS
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# The running job's "abandoned" event in the prefetch thread (and the engine's chunk threads it
+# starts, via copy_context); None in request threads
+_BACKGROUND = contextvars.ContextVar("prefetch_background", default=None)
+
+
+class UpstreamBusy(Exception):
+    """A prefetch Mews call found no idle upstream capacity in time; its job is abandoned."""
+
+
+class UpstreamBudget:
+    """Mews calls in flight in this worker; prefetch calls wait until no request call is."""
+
+    def __init__(self, background_limit, wait_seconds):
+        self.background_limit = background_limit
+        self.wait_seconds = wait_seconds
+        self.foreground = 0
+        self.background = 0
+        self.condition = threading.Condition()
+
+    def _has_headroom(self):
+        return self.foreground == 0 and self.background < self.background_limit
+
+    def wait_until_idle(self):
+        """Wait (at most wait_seconds) for no Mews call at all; returns False if the upstream stayed busy."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.foreground == 0 and self.background == 0, timeout=self.wait_seconds)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Hold a slot for one Mews call. Request calls never wait; prefetch calls wait for headroom,
+        at most wait_seconds, and raise UpstreamBusy (abandoning their job) if none appears.
+        """
+        abandoned = _BACKGROUND.get()
+        background = abandoned is not None
+        with self.condition:
+            if background:
+                if abandoned.is_set() or not self.condition.wait_for(self._has_headroom, timeout=self.wait_seconds):
+                    abandoned.set()
+                    raise UpstreamBusy("No idle Mews capacity for the prefetch call")
+                self.background += 1
+            else:
+                self.foreground += 1
+            self._report()
+        try:
+            yield
+        finally:
+            with self.condition:
+                if background:
+                    self.background -= 1
+                else:
+                    self.foreground -= 1
+                self._report()
+                self.condition.notify_all()
+
+    def _report(self):
+        MEWS_IN_FLIGHT.set(self.foreground, priority="request")
+        MEWS_IN_FLIGHT.set(self.background, priority="prefetch")
+
+
+UPSTREAM_BUDGET = UpstreamBudget(PREFETCH_MAX_UPSTREAM_IN_FLIGHT, PREFETCH_UPSTREAM_WAIT_SECONDS)
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+_CACHE_LOCK = threading.Lock()
+# {(view_key, date_str): (expires_at_monotonic, calendar day, value)}, oldest first
+_CACHE = OrderedDict()
+# {view_key: response keys besides availability (format, slot_table...)}
+_META = {}
+
+
+def _store(key, result, now):
+    expires_at = now + PREFETCH_TTL_SECONDS
+    with _CACHE_LOCK:
+        _META[key] = {k: v for k, v in result.items() if k not in ("availability", "stays")}
+        for date_str, value in result["availability"].items():
+            _CACHE[(key, date_str)] = (expires_at, calendar_day(date_str), value)
+            _CACHE.move_to_end((key, date_str))
+        while len(_CACHE) > PREFETCH_CACHE_MAX_DATES:
+            _CACHE.popitem(last=False)
+
+
+def _cached_dates(key, dates, now):
+    """{date_str: value} of the dates cached and not expired."""
+    found = {}
+    with _CACHE_LOCK:
+        for date_str in dates:
+            entry = _CACHE.get((key, date_str))
+            if entry is not None and entry[0] > now:
+                found[date_str] = entry[2]
+    return found
+
+
+def cached_compute(key, compute):
+    """
+    Wrap an engine call so dates cached for the view are not recomputed.
+
+    Args:
+        key: view_key() of the request (availability_versions.py)
+        compute: function(data) running the engine, returns a response dict or (error_dict, status)
+
+    Returns:
+        function(data): same contract as compute; computed dates are added to the cache
+    """
+    def compute_with_cache(data):
+        dates = data.get('dates') or []
+        now = time.monotonic()
+        found = _cached_dates(key, dates, now)
+        CACHE_LOOKUPS.inc(len(found), cache="prefetch", result="hit")
+        CACHE_LOOKUPS.inc(len(dates) - len(found), cache="prefetch", result="miss")
+
+        missing = [date_str for date_str in dates if date_str not in found]
+        # Requests without dates go to the engine, which rejects them
+        if dates and not missing:
+            with _CACHE_LOCK:
+                meta = _META.get(key)
+            if meta is not None:
+                return {**meta, "availability": found}
+            missing = dates
+
+        result = compute({**data, 'dates': missing})
+        if isinstance(result, tuple):
+            return result
+        _store(key, result, now)
+        return {**result, "availability": {**found, **result["availability"]}}
+
+    return compute_with_cache
+
+
+def invalidate_dates(start_utc, end_utc):
+    """Drop the cached dates (availability_versions.booking_days) a booking touches."""
+    days = booking_days(start_utc, end_utc)
+    if days is None:
+        return
+    first_day, last_day = days
+    with _CACHE_LOCK:
+        for cache_key in [k for k, entry in _CACHE.items() if entry[1] is not None and first_day <= entry[1] <= last_day]:
+            del _CACHE[cache_key]
+
+
+# =============================================================================
+# BACKGROUND PREFETCH
+# =============================================================================
+
+_EXECUTOR = None
+_PENDING = set()
+_PENDING_LOCK = threading.Lock()
+
+
+def calendar_grid_dates(months, today):
+    """
+    Dates of the 6-week calendar grids (Monday first) of the given months, from today on, as the
+    UTC-midnight ISO strings CalendarSelector.vue sends.
+
+    Args:
+        months: first days of the months shown
+        today: first date that is not in the past
+    """
+    days = set()
+    for month in months:
+        grid_start = month - timedelta(days=month.weekday())
+        for offset in range(42):
+            day = grid_start + timedelta(days=offset)
+            if day >= today:
+                days.add(day)
+    return [day.strftime('%Y-%m-%dT00:00:00.000Z') for day in sorted(days)]
+
+
+def _add_months(month, count):
+    index = month.month - 1 + count
+    return month.replace(year=month.year + index // 12, month=index % 12 + 1, day=1)
+
+
+def adjacent_views(dates, today):
+    """
+    Date lists of the calendar views next to a bulk request's (one month back, one forward).
+
+    The calendar shows two months and requests both grids; the months whose last day is in the
+    request are the months shown. Requests that are not a calendar view (single dates) have none.
+    """
+    days = {day for day in map(calendar_day, dates) if day is not None}
+    shown = sorted({day.replace(day=1) for day in days if (day + timedelta(days=1)).day == 1})
+    if not shown:
+        return []
+    first, last = shown[0], shown[-1]
+    views = [
+        calendar_grid_dates((_add_months(first, 1), _add_months(last, 1)), today),
+        calendar_grid_dates((_add_months(first, -1), _add_months(last, -1)), today)
+    ]
+    return [view for view in views if view]
+
+
+def _get_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        # One low-priority thread per worker, created on first use (never in a preloaded master)
+        _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+    return _EXECUTOR
+
+
+def _run_prefetch(job, key, engine, data, compute):
+    abandoned = threading.Event()
+    _BACKGROUND.set(abandoned)
+    try:
+        # Only start while the upstream is idle; under steady request traffic the job is skipped
+        if not UPSTREAM_BUDGET.wait_until_idle():
+            PREFETCH_JOBS.inc(engine=engine, outcome="yielded")
+            return
+        now = time.monotonic()
+        missing = [date_str for date_str in data['dates'] if date_str not in _cached_dates(key, data['dates'], now)]
+        if not missing:
+            PREFETCH_JOBS.inc(engine=engine, outcome="done")
+            return
+        with span("prefetch.adjacent_view", **{"prefetch.engine": engine, "prefetch.dates": len(missing)}):
+            result = compute({**data, 'dates': missing})
+        # Request traffic came back during the job: the engine saw failed calls, drop its result
+        if abandoned.is_set():
+            PREFETCH_JOBS.inc(engine=engine, outcome="yielded")
+            return
+        if isinstance(result, tuple):
+            PREFETCH_JOBS.inc(engine=engine, outcome="failed")
+            return
+        # Expiry counts from the start of the computation, like for request results
+        _store(key, result, now)
+        PREFETCH_JOBS.inc(engine=engine, outcome="done")
+        logger.debug("Prefetched %d dates of %s", len(result["availability"]), engine)
+    except UpstreamBusy:
+        PREFETCH_JOBS.inc(engine=engine, outcome="yielded")
+    except Exception as e:
+        PREFETCH_JOBS.inc(engine=engine, outcome="failed")
+        logger.warning(f"Availability prefetch failed: {e}")
+    finally:
+        with _PENDING_LOCK:
+            _PENDING.discard(job)
+
+
+def schedule_adjacent_months(key, engine, data, compute, today):
+    """
+    Queue the background computation of the calendar views next to a bulk request's dates.
+
+    Args:
+        key: view_key() of the request
+        engine: "journee" or "nuitee" (metrics label)
+        data: the request body (service, suite, booking type, dates)
+        compute: function(data) running the engine for the request's view
+        today: first date that is not in the past (local time)
+    """
+    if PREFETCH_MAX_PENDING <= 0 or _BACKGROUND.get() is not None:
+        return
+    for dates in adjacent_views(data.get('dates') or [], today):
+        job = (key, dates[0], dates[-1])
+        with _PENDING_LOCK:
+            if job in _PENDING:
+                continue
+            if len(_PENDING) >= PREFETCH_MAX_PENDING:
+                PREFETCH_JOBS.inc(engine=engine, outcome="dropped")
+                return
+            _PENDING.add(job)
+        body = {k: v for k, v in data.items() if k not in ('dates', 'since')}
+        body['dates'] = dates
+        # Fresh context: the prefetch is not part of the request's trace and outlives it
+        _get_executor().submit(contextvars.Context().run, _run_prefetch, job, key, engine, body, compute)
+
+
+def drain():
+    """Wait for the queued and running prefetch jobs (load_replay.py, before stopping the fake Mews)."""
+    global _EXECUTOR
+    executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def reinit_after_fork():
+    """Fresh locks, counters and prefetch thread in a forked worker."""
+    global _EXECUTOR, _CACHE_LOCK, _PENDING_LOCK
+    UPSTREAM_BUDGET.condition = threading.Condition()
+    UPSTREAM_BUDGET.foreground = UPSTREAM_BUDGET.background = 0
+    _EXECUTOR = None
+    _CACHE_LOCK = threading.Lock()
+    _PENDING_LOCK = threading.Lock()
+    _PENDING.clear()
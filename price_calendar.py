@@ -0,0 +1,317 @@
+"""
+Per-day price matrix of the three rates, so prices are summed locally instead of asked from Mews.
+
+BookingWidget.vue calls /pricing on every selection change and each call used to be a fresh
+rates/getPricing for one range. The matrix holds, per rate, the price of every time unit (hours
+for the journée rates, nights starting at local midnight for RATE_ID_NUITEE) and every category
+over the booking horizon:
+
+- prices are fetched in chunks (one rates/getPricing per rate and chunk) of
+  PRICE_CALENDAR_NIGHT_CHUNK_DAYS days for the nightly rate and PRICE_CALENDAR_HOUR_CHUNK_DAYS
+  days (about 96 hourly time units) for the journée rates, primed by the warm-up (the horizon for the
+  nightly rate, the first PRICE_CALENDAR_PRIME_HOUR_DAYS days for the hourly ones) and refreshed
+  once older than PRICE_CALENDAR_TTL_SECONDS
+- get_range_pricing() builds the rates/getPricing answer for any range from the matrix; the
+  /pricing route falls back to a live call for ranges it cannot cover (past dates, beyond the
+  horizon, time units not on the hour)
+- month_prices() backs the /price-calendar route: the price of every date of a calendar month grid
+"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from availability_versions import calendar_day
+from bulk_availability import BELGIAN_TZ
+from config import (
+    ENTERPRISE_ID,
+    NIGHT_SERVICE_ID,
+    RATE_ID_NUITEE,
+    RATE_ID_JOURNEE_SEMAINE,
+    RATE_ID_JOURNEE_WEEKEND,
+    ARRIVAL_TIMES,
+    DEPARTURE_TIMES,
+    BOOKING_HORIZON_DAYS,
+    PRICE_CALENDAR_TTL_SECONDS,
+    PRICE_CALENDAR_NIGHT_CHUNK_DAYS,
+    PRICE_CALENDAR_HOUR_CHUNK_DAYS,
+    PRICE_CALENDAR_PRIME_HOUR_DAYS,
+    PRICE_CALENDAR_MAX_CONCURRENT
+)
+from local_time import local_to_epoch, epoch_to_local, epoch_to_utc_iso, parse_iso_epoch
+from metrics import CACHE_LOOKUPS
+from prefetch import calendar_grid_dates
+
+logger = logging.getLogger(__name__)
+
+RATE_IDS = (RATE_ID_NUITEE, RATE_ID_JOURNEE_SEMAINE, RATE_ID_JOURNEE_WEEKEND)
+
+# {(rate_id, chunk_first_day): _Chunk}
+_CHUNKS = {}
+_CHUNKS_LOCK = threading.Lock()
+# One lock per chunk key: a chunk being fetched is waited for instead of fetched again
+_FETCH_LOCKS = {}
+
+
+class _Chunk:
+    __slots__ = ("expires_at", "currency", "category_ids", "unit_index", "prices", "amount_prices")
+
+    def __init__(self, expires_at, currency, category_ids, unit_index, prices, amount_prices):
+        self.expires_at = expires_at
+        self.currency = currency
+        # Categories in Mews order
+        self.category_ids = category_ids
+        # {time unit start epoch: index in the price lists}
+        self.unit_index = unit_index
+        # {category_id: [price per time unit]}
+        self.prices = prices
+        self.amount_prices = amount_prices
+
+
+def _is_nightly(rate_id):
+    return rate_id == RATE_ID_NUITEE
+
+
+def _chunk_days(rate_id):
+    """Days covered by one rates/getPricing call of a rate."""
+    return PRICE_CALENDAR_NIGHT_CHUNK_DAYS if _is_nightly(rate_id) else PRICE_CALENDAR_HOUR_CHUNK_DAYS
+
+
+def _chunk_first_day(rate_id, day):
+    """First day of the rate's chunk holding a day (chunks are aligned on fixed ordinals)."""
+    ordinal = day.toordinal()
+    return date.fromordinal(ordinal - ordinal % _chunk_days(rate_id))
+
+
+def _time_units(rate_id, first_day, last_day):
+    """Time unit start epochs of a rate from first_day to last_day (local dates, inclusive)."""
+    if _is_nightly(rate_id):
+        return [local_to_epoch(first_day + timedelta(days=offset))
+                for offset in range((last_day - first_day).days + 1)]
+    return list(range(local_to_epoch(first_day), local_to_epoch(last_day + timedelta(days=1)), 3600))
+
+
+def _fetch_chunk(make_mews_request_func, rate_id, first_day):
+    last_day = first_day + timedelta(days=_chunk_days(rate_id) - 1)
+    units = _time_units(rate_id, first_day, last_day)
+    payload = {
+        "EnterpriseIds": [ENTERPRISE_ID],
+        "Client": "Intense Experience Booking",
+        "RateId": rate_id,
+        "FirstTimeUnitStartUtc": epoch_to_utc_iso(units[0]),
+        "LastTimeUnitStartUtc": epoch_to_utc_iso(units[-1])
+    }
+    started = time.monotonic()
+    result = make_mews_request_func("rates/getPricing", payload)
+    if not result or "CategoryPrices" not in result:
+        return None
+
+    unit_starts = result.get("TimeUnitStartsUtc") or result.get("DatesUtc") or []
+    unit_index = {parse_iso_epoch(unit): index for index, unit in enumerate(unit_starts)}
+    prices, amount_prices, category_ids = {}, {}, []
+    for category_price in result["CategoryPrices"]:
+        category_id = category_price.get("CategoryId")
+        category_ids.append(category_id)
+        prices[category_id] = category_price.get("Prices") or []
+        amount_prices[category_id] = category_price.get("AmountPrices") or []
+    # Expiry counts from the request start, like the catalog cache
+    return _Chunk(started + PRICE_CALENDAR_TTL_SECONDS, result.get("Currency"), category_ids, unit_index, prices, amount_prices)
+
+
+def _get_chunk(make_mews_request_func, rate_id, first_day):
+    """The cached chunk, fetched when missing or expired; None when Mews could not be reached."""
+    key = (rate_id, first_day)
+    with _CHUNKS_LOCK:
+        chunk = _CHUNKS.get(key)
+        fetch_lock = _FETCH_LOCKS.setdefault(key, threading.Lock())
+    if chunk is not None and chunk.expires_at > time.monotonic():
+        CACHE_LOOKUPS.inc(cache="price_calendar", result="hit")
+        return chunk
+
+    with fetch_lock:
+        # Another request may have fetched it while we waited
+        with _CHUNKS_LOCK:
+            chunk = _CHUNKS.get(key)
+        if chunk is not None and chunk.expires_at > time.monotonic():
+            CACHE_LOOKUPS.inc(cache="price_calendar", result="hit")
+            return chunk
+        CACHE_LOOKUPS.inc(cache="price_calendar", result="miss")
+        chunk = _fetch_chunk(make_mews_request_func, rate_id, first_day)
+        if chunk is not None:
+            with _CHUNKS_LOCK:
+                _CHUNKS[key] = chunk
+        return chunk
+
+
+def _in_horizon(day, today):
+    return today <= day <= today + timedelta(days=BOOKING_HORIZON_DAYS)
+
+
+def _get_chunks(make_mews_request_func, keys):
+    """{(rate_id, first_day): chunk or None}, fetching several chunks concurrently."""
+    keys = list(dict.fromkeys(keys))
+    if len(keys) <= 1:
+        return {key: _get_chunk(make_mews_request_func, *key) for key in keys}
+    with ThreadPoolExecutor(max_workers=min(len(keys), PRICE_CALENDAR_MAX_CONCURRENT)) as executor:
+        futures = {key: executor.submit(contextvars.copy_context().run, _get_chunk, make_mews_request_func, *key)
+                   for key in keys}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def get_range_pricing(make_mews_request_func, rate_id, first_time_unit, last_time_unit):
+    """
+    rates/getPricing answer for a range, built from the price matrix.
+
+    Args:
+        rate_id: one of RATE_IDS
+        first_time_unit, last_time_unit: UTC ISO starts of the first and last time units (local
+            midnights for RATE_ID_NUITEE, whole hours for the journée rates), both included
+
+    Returns:
+        dict: {"Currency", "TimeUnitStartsUtc", "CategoryPrices": [{"CategoryId", "Prices",
+            "AmountPrices"}]}, or None when the matrix cannot answer (the caller asks Mews)
+    """
+    if rate_id not in RATE_IDS:
+        return None
+    try:
+        first_epoch = parse_iso_epoch(first_time_unit)
+        last_epoch = parse_iso_epoch(last_time_unit)
+    except (TypeError, ValueError):
+        return None
+    if last_epoch < first_epoch:
+        return None
+
+    first_day = epoch_to_local(first_epoch)[0]
+    last_day = epoch_to_local(last_epoch)[0]
+    today = datetime.now(BELGIAN_TZ).date()
+    if not (_in_horizon(first_day, today) and _in_horizon(last_day, today)):
+        return None
+    if _is_nightly(rate_id):
+        units = _time_units(rate_id, first_day, last_day)
+        if units[0] != first_epoch:
+            return None
+    else:
+        if first_epoch % 3600:
+            return None
+        units = list(range(first_epoch, last_epoch + 1, 3600))
+
+    unit_chunks = [(rate_id, _chunk_first_day(rate_id, epoch_to_local(unit)[0])) for unit in units]
+    chunks = _get_chunks(make_mews_request_func, unit_chunks)
+    if any(chunk is None for chunk in chunks.values()):
+        return None
+
+    first_chunk = chunks[unit_chunks[0]]
+    category_prices = []
+    for category_id in first_chunk.category_ids:
+        prices, amount_prices = [], []
+        for unit, chunk_key in zip(units, unit_chunks):
+            chunk = chunks[chunk_key]
+            index = chunk.unit_index.get(unit)
+            if index is None or index >= len(chunk.prices.get(category_id, ())):
+                return None
+            prices.append(chunk.prices[category_id][index])
+            amounts = chunk.amount_prices.get(category_id, ())
+            if index < len(amounts):
+                amount_prices.append(amounts[index])
+        category_prices.append({"CategoryId": category_id, "Prices": prices, "AmountPrices": amount_prices})
+
+    return {
+        "Currency": first_chunk.currency,
+        "TimeUnitStartsUtc": [epoch_to_utc_iso(unit) for unit in units],
+        "CategoryPrices": category_prices
+    }
+
+
+def journee_rate_for_day(day):
+    """Rate of a journée starting on a local date: weekend rate on Saturdays and Sundays (as BookingWidget.vue)."""
+    return RATE_ID_JOURNEE_WEEKEND if day.weekday() >= 5 else RATE_ID_JOURNEE_SEMAINE
+
+
+def _bookable_hours():
+    """Hours a journée can cover: from the first arrival time to the last departure time."""
+    return int(ARRIVAL_TIMES[0].split(':')[0]), int(DEPARTURE_TIMES[-1].split(':')[0])
+
+
+def month_prices(make_mews_request_func, service_id, month, today, suite_id=None):
+    """
+    Price of every date of a month's calendar grid, for showing prices on the calendar.
+
+    For the nuitée service the price of the night starting on each date; for journées the lowest
+    hourly price between the first arrival and the last departure time, at that day's rate.
+
+    Args:
+        service_id: DAY_SERVICE_ID or NIGHT_SERVICE_ID
+        month: first day of the month
+        today: first date that is not in the past (local time)
+        suite_id: only return this category's prices (optional)
+
+    Returns:
+        tuple: (currency, {date_str: {category_id: price}} or {date_str: price} with suite_id), or
+            None when Mews could not be reached. Dates outside the horizon are left out.
+    """
+    nightly = service_id == NIGHT_SERVICE_ID
+    days = [calendar_day(date_str) for date_str in calendar_grid_dates((month,), today)]
+    days = [day for day in days if _in_horizon(day, today)]
+
+    def rate_for(day):
+        return RATE_ID_NUITEE if nightly else journee_rate_for_day(day)
+
+    chunks = _get_chunks(make_mews_request_func, [(rate_for(day), _chunk_first_day(rate_for(day), day)) for day in days])
+    if any(chunk is None for chunk in chunks.values()):
+        return None
+
+    first_hour, last_hour = _bookable_hours()
+    currency = None
+    prices = {}
+    for day in days:
+        chunk = chunks[(rate_for(day), _chunk_first_day(rate_for(day), day))]
+        currency = currency or chunk.currency
+        if nightly:
+            units = [local_to_epoch(day)]
+        else:
+            units = [local_to_epoch(day, hour) for hour in range(first_hour, last_hour)]
+        indexes = [chunk.unit_index[unit] for unit in units if unit in chunk.unit_index]
+        if not indexes:
+            continue
+        day_prices = {}
+        for category_id in chunk.category_ids:
+            if suite_id and category_id != suite_id:
+                continue
+            values = [chunk.prices[category_id][index] for index in indexes if index < len(chunk.prices[category_id])]
+            if values:
+                day_prices[category_id] = min(values)
+        date_str = day.strftime('%Y-%m-%dT00:00:00.000Z')
+        if suite_id:
+            if suite_id in day_prices:
+                prices[date_str] = day_prices[suite_id]
+        else:
+            prices[date_str] = day_prices
+    return currency, prices
+
+
+def prime_price_calendar(make_mews_request_func, days=BOOKING_HORIZON_DAYS, hour_days=PRICE_CALENDAR_PRIME_HOUR_DAYS):
+    """
+    Fetch the price matrix of the nightly rate over the horizon and of the hourly rates over
+    their first hour_days days (warm-up); later dates are fetched on first use.
+
+    Returns:
+        tuple: (number of chunks fetched, list of failures)
+    """
+    today = datetime.now(BELGIAN_TZ).date()
+    keys = []
+    for rate_id in RATE_IDS:
+        rate_days = days if _is_nightly(rate_id) else min(days, hour_days)
+        keys.extend(sorted({(rate_id, _chunk_first_day(rate_id, today + timedelta(days=offset))) for offset in range(rate_days + 1)}))
+    chunks = _get_chunks(make_mews_request_func, keys)
+    errors = [f"Price calendar fetch failed: rate {rate_id} from {first_day}"
+              for (rate_id, first_day), chunk in chunks.items() if chunk is None]
+    return len(chunks) - len(errors), errors
+
+
+def reinit_after_fork():
+    """Fresh locks in a forked worker (a fetch in flight in the master never finishes here)."""
+    global _CHUNKS_LOCK
+    _CHUNKS_LOCK = threading.Lock()
+    _FETCH_LOCKS.clear()
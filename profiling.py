@@ -0,0 +1,251 @@
+"""
+On-demand sampling profiler for single Flask requests.
+
+A request is profiled when it carries the admin header `X-Profile: <PROFILING_ADMIN_TOKEN>`
+or is drawn by PROFILING_SAMPLE_RATE (see config.py). A daemon thread then samples the stacks
+of the request thread and of the bulk engine chunk threads working for that request
+(profiled_thread() in bulk_availability.py) every PROFILING_INTERVAL_MS, with line numbers so
+the hot parts of process_chunk stand out.
+
+When the request ends, two files are written to PROFILING_OUTPUT_DIR:
+- <name>.collapsed: "thread;frame;frame count" lines for flamegraph.pl / speedscope / inferno
+- <name>.speedscope.json: one sampled profile per thread label (open at https://www.speedscope.app)
+and one line describing the request (route, parameters, samples) is appended to index.jsonl.
+The file name is returned in the X-Profile response header.
+"""
+import contextvars
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import (
+    PROFILING_ADMIN_TOKEN,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_OUTPUT_DIR,
+    PROFILING_INTERVAL_MS,
+    PROFILING_MAX_SECONDS,
+    PROFILING_MAX_CONCURRENT
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+# JSON body fields copied into the profile tags (never customer details)
+PROFILE_PARAM_KEYS = ("service_id", "suite_id", "dates", "start_date", "end_date", "booking_type", "include_stays")
+
+_ACTIVE_PROFILE = contextvars.ContextVar("active_profile", default=None)
+_RUNNING = set()
+_RUNNING_LOCK = threading.Lock()
+
+
+class RequestProfile:
+    """Samples the registered threads until stop() is called, then writes the output files."""
+
+    def __init__(self, name, tags, interval_seconds=PROFILING_INTERVAL_MS / 1000):
+        self.name = name
+        self.tags = tags
+        self.interval_seconds = interval_seconds
+        self.lock = threading.Lock()
+        self.threads = {}   # {thread ident: label} currently working for the request
+        self.samples = {}   # {label: {stack tuple: count}}, pool threads share one label
+        self.sample_count = 0
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def add_thread(self, ident, label):
+        with self.lock:
+            self.threads[ident] = label
+
+    def remove_thread(self, ident):
+        with self.lock:
+            self.threads.pop(ident, None)
+
+    def _sample(self):
+        with self.lock:
+            threads = dict(self.threads)
+        frames = sys._current_frames()
+        for ident, label in threads.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()
+            counts = self.samples.setdefault(label, {})
+            key = tuple(stack)
+            counts[key] = counts.get(key, 0) + 1
+            self.sample_count += 1
+
+    def _run(self):
+        deadline = self.started_at + PROFILING_MAX_SECONDS
+        try:
+            while not self._stop.wait(self.interval_seconds):
+                self._sample()
+                if time.perf_counter() > deadline:
+                    logger.warning(f"Profile {self.name} stopped after {PROFILING_MAX_SECONDS}s")
+                    break
+            self.duration = time.perf_counter() - self.started_at
+            self._write()
+        except Exception as e:
+            logger.error(f"Failed to write profile {self.name}: {e}")
+        finally:
+            with _RUNNING_LOCK:
+                _RUNNING.discard(self)
+
+    def _write(self):
+        os.makedirs(PROFILING_OUTPUT_DIR, exist_ok=True)
+        base = os.path.join(PROFILING_OUTPUT_DIR, self.name)
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        with open(f"{base}.speedscope.json", "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(), f, separators=(",", ":"))
+        with open(os.path.join(PROFILING_OUTPUT_DIR, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "name": self.name,
+                **self.tags,
+                "duration_ms": round(self.duration * 1000, 1),
+                "samples": self.sample_count,
+                "interval_ms": self.interval_seconds * 1000
+            }) + "\n")
+        logger.info(f"Wrote profile {base} ({self.sample_count} samples)")
+
+    def collapsed(self):
+        """Folded stacks, one "thread;frame;...;frame count" line per distinct stack."""
+        lines = []
+        for label, counts in sorted(self.samples.items()):
+            for stack, count in counts.items():
+                frames = ";".join(_frame_label(*frame) for frame in stack)
+                lines.append(f"{label};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self):
+        """Speedscope file-format document, one sampled profile per thread label."""
+        frame_index = {}
+        frames = []
+        profiles = []
+        weight = self.interval_seconds * 1000
+        for label, counts in sorted(self.samples.items()):
+            samples = []
+            weights = []
+            for stack, count in counts.items():
+                indexes = []
+                for name, filename, line in stack:
+                    key = (name, filename, line)
+                    if key not in frame_index:
+                        frame_index[key] = len(frames)
+                        frames.append({"name": f"{name}:{line}", "file": filename, "line": line})
+                    indexes.append(frame_index[key])
+                samples.append(indexes)
+                weights.append(count * weight)
+            profiles.append({
+                "type": "sampled",
+                "name": label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.tags.get('method')} {self.tags.get('route')} {self.tags.get('params')}",
+            "exporter": "intense-experience profiling.py",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles
+        }
+
+
+def _frame_label(name, filename, line):
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _describe_params(args, body):
+    """Short, file-name friendly summary of the query string and the PROFILE_PARAM_KEYS of the body."""
+    parts = [f"{key}={value}" for key, value in sorted(args.items())]
+    if isinstance(body, dict):
+        for key, value in sorted((key, body[key]) for key in PROFILE_PARAM_KEYS if key in body):
+            if isinstance(value, list):
+                if value and all(isinstance(v, str) for v in value):
+                    parts.append(f"{key}={value[0][:10]}..{value[-1][:10]}({len(value)})")
+                else:
+                    parts.append(f"{key}=[{len(value)}]")
+            elif isinstance(value, (str, int, float, bool)) or value is None:
+                parts.append(f"{key}={value}")
+    return " ".join(parts)
+
+
+def _slug(text, limit=60):
+    return re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-")[:limit] or "root"
+
+
+def should_profile(headers):
+    """True if the admin header matches PROFILING_ADMIN_TOKEN or the request is sampled."""
+    header = headers.get(PROFILE_HEADER)
+    if header and PROFILING_ADMIN_TOKEN and hmac.compare_digest(header, PROFILING_ADMIN_TOKEN):
+        return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+def start_request_profile(method, route, args, body):
+    """
+    Start profiling the current request thread (call should_profile first).
+
+    Returns:
+        tuple: (profile, token) for stop_request_profile, or None when too many profiles are running
+    """
+    with _RUNNING_LOCK:
+        if len(_RUNNING) >= PROFILING_MAX_CONCURRENT:
+            logger.warning(f"Skipping profile of {method} {route}: {len(_RUNNING)} profiles already running")
+            return None
+        params = _describe_params(args, body)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{method}_{_slug(route)}_{_slug(params, 80)}"
+        profile = RequestProfile(name, {"method": method, "route": route, "params": params,
+                                        "started_at": datetime.now().isoformat()})
+        _RUNNING.add(profile)
+    profile.add_thread(threading.get_ident(), "request")
+    profile.start()
+    return profile, _ACTIVE_PROFILE.set(profile)
+
+
+def stop_request_profile(profile, token):
+    """Stop sampling; the profiler thread writes the files in the background."""
+    _ACTIVE_PROFILE.reset(token)
+    profile.stop()
+
+
+@contextmanager
+def profiled_thread(label):
+    """
+    Sample the current thread while the block runs if the (copied) context belongs to a profiled
+    request; used around work handed to thread pools. Threads with the same label are merged.
+    """
+    profile = _ACTIVE_PROFILE.get()
+    if profile is None:
+        yield
+        return
+    ident = threading.get_ident()
+    profile.add_thread(ident, label)
+    try:
+        yield
+    finally:
+        profile.remove_thread(ident)
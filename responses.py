@@ -0,0 +1,114 @@
+"""
+Optimised JSON responses for the large availability payloads.
+
+json_response() replaces jsonify on the bulk routes:
+- serialises with orjson when installed (stdlib json otherwise), keys sorted like jsonify
+- adds a weak ETag computed from the serialised body and answers 304 Not Modified, without
+  a body, when the client sends the same value in If-None-Match (etag=True; the bulk routes
+  pass etag=False since their "since" deltas, see availability_versions.py, replace revalidation)
+- compresses bodies above RESPONSE_COMPRESSION_MIN_BYTES with brotli (when installed) or gzip,
+  following the request's Accept-Encoding
+
+The availability maps are highly repetitive (the same slot dicts for every suite of every date),
+so gzip/brotli typically shrink them by 90% or more.
+"""
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+from config import RESPONSE_COMPRESSION_MIN_BYTES
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Speed over ratio: these bodies are built per request
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def dumps(data):
+    """Serialise to compact UTF-8 JSON bytes with sorted keys."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def compute_etag(body):
+    """Weak ETag for a serialised body (weak: the same value is valid for every content encoding)."""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _choose_encoding(accept_encoding):
+    """Pick "br", "gzip" or None from an Accept-Encoding header (q=0 entries are refused)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def json_response(data, status=200, etag=True):
+    """
+    Build a JSON response for the current request.
+
+    Args:
+        data: JSON-serialisable object
+        status: HTTP status code; ETags and 304s are only used for 200 responses
+        etag: add an ETag and honour If-None-Match
+
+    Returns:
+        Response: JSON, 304 Not Modified, or compressed JSON
+    """
+    body = dumps(data)
+    headers = {"Vary": "Accept-Encoding"}
+
+    if etag and status == 200:
+        headers["ETag"] = compute_etag(body)
+        # Revalidation must be explicit: the availability routes are POSTs, which browsers never cache
+        headers["Cache-Control"] = "no-cache"
+        if _etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            return Response(status=304, headers=headers)
+
+    encoding = _choose_encoding(request.headers.get("Accept-Encoding")) if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(body, status=status, headers=headers, mimetype="application/json")
@@ -0,0 +1,332 @@
+"""
+Lightweight in-process tracing for the availability and booking pipeline.
+
+Spans are plain objects kept in a context variable, so nested `with span(...)` blocks build a
+parent/child tree and chunk work submitted with contextvars.copy_context() stays in the
+request's trace. Every request gets a trace ID (taken from an incoming W3C `traceparent`
+header when present), which is added to log records by TraceContextFilter (installed by
+logging_setup.py) and returned in the X-Trace-Id response header.
+
+Finished spans are exported in the OpenTelemetry OTLP/JSON format, in batches, by a background
+thread (see config.py, TRACING_EXPORTER):
+- "file": one {"resourceSpans": [...]} document per line in TRACING_EXPORT_PATH, the layout of
+  the OpenTelemetry collector file exporter
+- "otlp": POST to TRACING_COLLECTOR_URL (an OTLP/HTTP collector, or /v1/traces on fake_mews_server.py)
+- empty: spans only carry IDs for the logs, nothing is recorded or exported
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+
+import requests
+
+from config import (
+    TRACING_EXPORTER,
+    TRACING_EXPORT_PATH,
+    TRACING_COLLECTOR_URL,
+    TRACING_SAMPLE_RATE
+)
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "intense-experience-booking"
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 2.0
+
+# OTLP span kinds / status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+_CURRENT_SPAN = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; `recording` is False when the trace is not sampled or export is off."""
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message", "recording")
+
+    def __init__(self, name, trace_id, parent_span_id, recording, kind=SPAN_KIND_INTERNAL, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes) if recording and attributes else {}
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.recording = recording
+
+    def set_attribute(self, key, value):
+        if self.recording:
+            self.attributes[key] = value
+
+    def set_error(self, message):
+        self.status = STATUS_ERROR
+        self.status_message = str(message)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def parse_traceparent(header):
+    """
+    Parse a W3C traceparent header ("00-<trace id>-<parent id>-<flags>").
+
+    Returns:
+        tuple: (trace_id, parent_span_id, sampled) or None if the header is missing or malformed
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def start_span(name, kind=SPAN_KIND_INTERNAL, traceparent=None, **attributes):
+    """
+    Start a span as a child of the current one (or a new trace) and make it current.
+
+    Args:
+        traceparent: incoming W3C header used as the parent when there is no current span
+
+    Returns:
+        tuple: (span, token) to pass to end_span
+    """
+    parent = _CURRENT_SPAN.get()
+    if parent is not None:
+        trace_id, parent_span_id, recording = parent.trace_id, parent.span_id, parent.recording
+    else:
+        remote = parse_traceparent(traceparent)
+        if remote:
+            trace_id, parent_span_id, sampled = remote
+        else:
+            trace_id, parent_span_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < TRACING_SAMPLE_RATE
+        recording = sampled and _EXPORTER is not None
+    span = Span(name, trace_id, parent_span_id, recording, kind, attributes)
+    return span, _CURRENT_SPAN.set(span)
+
+
+def end_span(span, token, error=None):
+    """Finish a span started with start_span, restore its parent and queue it for export."""
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.set_error(error)
+    _CURRENT_SPAN.reset(token)
+    if span.recording:
+        _EXPORTER.submit(span)
+
+
+class span:
+    """Context manager: `with span("name", key=value) as s:` (records exceptions as errors)."""
+    __slots__ = ("_args", "_span", "_token")
+
+    def __init__(self, name, kind=SPAN_KIND_INTERNAL, **attributes):
+        self._args = (name, kind, attributes)
+        self._span = self._token = None
+
+    def __enter__(self):
+        name, kind, attributes = self._args
+        self._span, self._token = start_span(name, kind, **attributes)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        end_span(self._span, self._token, error=exc if exc_type is not None else None)
+        return False
+
+
+def traced(name):
+    """Decorator running the function inside a span named `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """The active span, or None outside any span."""
+    return _CURRENT_SPAN.get()
+
+
+def current_trace_id():
+    current = _CURRENT_SPAN.get()
+    return current.trace_id if current is not None else None
+
+
+def is_recording():
+    """True when the active span is sampled and exported (worth collecting detailed attributes)."""
+    current = _CURRENT_SPAN.get()
+    return current is not None and current.recording
+
+
+def set_attributes(attributes):
+    """Add attributes to the active span (no-op when it is not recording)."""
+    current = _CURRENT_SPAN.get()
+    if current is not None and current.recording:
+        current.attributes.update(attributes)
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds trace_id / span_id ("-" outside a span) to every record for the log format."""
+
+    def filter(self, record):
+        current = _CURRENT_SPAN.get()
+        record.trace_id = current.trace_id if current is not None else "-"
+        record.span_id = current.span_id if current is not None else "-"
+        return True
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+def otlp_document(spans):
+    """Wrap finished spans in an OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "tracing"},
+                "spans": [s.to_otlp() for s in spans]
+            }]
+        }]
+    }
+
+
+class _BatchExporter:
+    """Queues finished spans and writes them in batches from a daemon thread."""
+
+    def __init__(self, write_batch):
+        self.write_batch = write_batch
+        self.queue = queue.Queue(maxsize=EXPORT_BATCH_SIZE * 20)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, finished_span):
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(finished_span)
+        except queue.Full:
+            # Never block a request on the exporter
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _drain(self, first=None):
+        batch = [first] if first is not None else []
+        while len(batch) < EXPORT_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=EXPORT_INTERVAL_SECONDS)
+            except queue.Empty:
+                continue
+            # Give the rest of the request a moment to finish so a trace usually lands in one batch
+            time.sleep(0.05)
+            self._write(self._drain(first))
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self.write_batch(otlp_document(batch))
+        except Exception as e:
+            logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    def flush(self):
+        """Write out everything still queued (called at exit)."""
+        while not self.queue.empty():
+            self._write(self._drain())
+
+
+def _write_to_file(document):
+    with open(TRACING_EXPORT_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(document, separators=(",", ":")) + "\n")
+
+
+def _post_to_collector(document):
+    response = requests.post(TRACING_COLLECTOR_URL, json=document, timeout=5)
+    response.raise_for_status()
+
+
+def _exporter_from_config():
+    if TRACING_EXPORTER == "file":
+        logger.info(f"Exporting trace spans to {TRACING_EXPORT_PATH}")
+        return _BatchExporter(_write_to_file)
+    if TRACING_EXPORTER == "otlp":
+        logger.info(f"Exporting trace spans to {TRACING_COLLECTOR_URL}")
+        return _BatchExporter(_post_to_collector)
+    if TRACING_EXPORTER:
+        logger.error(f"Unknown TRACING_EXPORTER '{TRACING_EXPORTER}', spans are not exported")
+    return None
+
+
+_EXPORTER = _exporter_from_config()
+if _EXPORTER is not None:
+    atexit.register(_EXPORTER.flush)
+
+
+def reinit_after_fork():
+    """Give a forked worker its own export queue; the export thread restarts on the next span."""
+    if _EXPORTER is not None:
+        _EXPORTER.queue = queue.Queue(maxsize=EXPORT_BATCH_SIZE * 20)
+        _EXPORTER._thread = None
+        _EXPORTER._lock = threading.Lock()
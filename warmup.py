@@ -0,0 +1,126 @@
+"""
+Warm-up routine run when a worker boots, before it reports itself ready for traffic.
+
+After an Azure slot swap real users land on a freshly started worker. Without warm-up the
+first calendar views pay for slot table construction, catalog and price fetches and TLS
+handshakes towards Mews. The readiness endpoint only reports ready once everything below is done.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from bulk_availability import BELGIAN_TZ, get_precomputed_slots, _get_valid_slots
+from catalog_cache import CATALOG_LOOKUPS
+from config import DAY_MIN_HOURS, SPECIAL_MIN_HOURS, BOOKING_HORIZON_DAYS
+from price_calendar import prime_price_calendar
+
+logger = logging.getLogger(__name__)
+
+_WARM_UP_STATUS = {
+    "ready": False,
+    "started_at": None,
+    "completed_at": None,
+    "duration_seconds": None,
+    "slot_days": 0,
+    "catalog_lookups": 0,
+    "price_chunks": 0,
+    "errors": []
+}
+_WARM_UP_LOCK = threading.Lock()
+_warm_up_thread = None
+
+
+def precompute_slot_tables(days=BOOKING_HORIZON_DAYS):
+    """Populate the valid-slot and per-date slot caches for the bookable horizon."""
+    for min_hours in (DAY_MIN_HOURS, SPECIAL_MIN_HOURS):
+        _get_valid_slots(min_hours)
+
+    today = datetime.now(BELGIAN_TZ).date()
+    for offset in range(days + 1):
+        get_precomputed_slots(today + timedelta(days=offset))
+    return days + 1
+
+
+def prime_catalog(make_mews_request_func):
+    """
+    Fetch every catalog lookup concurrently.
+
+    Running them in parallel also opens several pooled connections towards Mews at once.
+    Returns the number of lookups that succeeded and the list of failures.
+    """
+    errors = []
+    with ThreadPoolExecutor(max_workers=len(CATALOG_LOOKUPS)) as executor:
+        results = list(executor.map(lambda lookup: lookup[1](make_mews_request_func), CATALOG_LOOKUPS))
+    for (name, _), result in zip(CATALOG_LOOKUPS, results):
+        if result is None:
+            errors.append(f"Catalog lookup failed: {name}")
+    return len(results) - len(errors), errors
+
+
+def warm_up(make_mews_request_func):
+    """Run the full warm-up synchronously and mark the worker ready when done."""
+    started = time.monotonic()
+    with _WARM_UP_LOCK:
+        _WARM_UP_STATUS["started_at"] = datetime.utcnow().isoformat() + "Z"
+
+    errors = []
+    try:
+        slot_days = precompute_slot_tables()
+    except Exception as exc:
+        logger.error(f"Slot table precomputation failed: {exc}")
+        errors.append(f"Slot tables: {exc}")
+        slot_days = 0
+
+    try:
+        catalog_lookups, catalog_errors = prime_catalog(make_mews_request_func)
+        errors.extend(catalog_errors)
+    except Exception as exc:
+        logger.error(f"Catalog priming failed: {exc}")
+        errors.append(f"Catalog: {exc}")
+        catalog_lookups = 0
+
+    try:
+        price_chunks, price_errors = prime_price_calendar(make_mews_request_func)
+        errors.extend(price_errors)
+    except Exception as exc:
+        logger.error(f"Price calendar priming failed: {exc}")
+        errors.append(f"Price calendar: {exc}")
+        price_chunks = 0
+
+    duration = time.monotonic() - started
+    with _WARM_UP_LOCK:
+        _WARM_UP_STATUS.update({
+            # Upstream failures are reported but do not keep the worker out of rotation:
+            # the routes fall back to live Mews calls exactly as before warm-up existed
+            "ready": True,
+            "completed_at": datetime.utcnow().isoformat() + "Z",
+            "duration_seconds": round(duration, 3),
+            "slot_days": slot_days,
+            "catalog_lookups": catalog_lookups,
+            "price_chunks": price_chunks,
+            "errors": errors
+        })
+    logger.info(f"Warm-up completed in {duration:.2f}s ({slot_days} slot days, {catalog_lookups} catalog lookups, {price_chunks} price chunks, {len(errors)} errors)")
+
+
+def start_warm_up(make_mews_request_func):
+    """Start the warm-up in a background thread (no-op if already started)."""
+    global _warm_up_thread
+    with _WARM_UP_LOCK:
+        if _warm_up_thread is not None:
+            return _warm_up_thread
+        _warm_up_thread = threading.Thread(
+            target=warm_up, args=(make_mews_request_func,), name="warm-up", daemon=True
+        )
+    _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def get_warm_up_status():
+    """Return a copy of the current warm-up status."""
+    with _WARM_UP_LOCK:
+        status = dict(_WARM_UP_STATUS)
+        status["errors"] = list(_WARM_UP_STATUS["errors"])
+    return status
@@ -0,0 +1,22 @@
+"""
+Production WSGI entry point: gunicorn --config gunicorn.conf.py wsgi:app
+
+Importing this module builds the app and runs the fork-safe part of the warm-up (config,
+imports, slot tables for the booking horizon). With preload_app (gunicorn.conf.py) that happens
+once in the master and the workers share the result copy-on-write; catalog priming and the Mews
+connection pool are per worker and started by reinit_after_fork() in the post_fork hook.
+
+Served by any other WSGI server (no gunicorn.conf.py), the full warm-up starts here.
+"""
+import os
+
+from app import create_app
+from warmup import precompute_slot_tables
+
+# Set by gunicorn.conf.py: the warm-up thread is started in each worker after the fork
+WARM_UP_AFTER_FORK = os.environ.get("WARM_UP_AFTER_FORK") == "1"
+
+app = create_app(warm_up=not WARM_UP_AFTER_FORK)
+
+if WARM_UP_AFTER_FORK:
+    precompute_slot_tables()